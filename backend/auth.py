@@ -0,0 +1,140 @@
+"""Admin password hashing and the cache of verified bearer tokens.
+
+bcrypt is imported on the first hash or check rather than when a worker
+boots, and runs in a small dedicated thread pool so a login never stalls the
+event loop. ``AdminTokenCache`` remembers recently verified tokens so most
+admin requests skip decoding the JWT and looking the admin up.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+def hash_password(password: str, rounds: int) -> str:
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop in a small dedicated thread pool.
+
+    A bcrypt call takes 100ms+ of CPU; running it inline would stall every
+    other request on the worker. The pool bounds the CPU spent on hashing and
+    the queue bound turns a login burst into fast 503s.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.rounds = rounds
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.busy_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts, please try again",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.busy_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if the hash was made with a different cost than ``rounds``"""
+        # bcrypt hashes look like $2b$<cost>$<salt+hash>
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_ms": round(self.busy_seconds / self.completed * 1000, 1) if self.completed else 0,
+        }
+
+
+class AdminTokenCache:
+    """Small TTL + LRU cache of verified bearer tokens -> admin (anything with a ``username``)"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[object]:
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, admin, token_expires_at: Optional[float] = None):
+        expires = time.monotonic() + self.ttl
+        if token_expires_at is not None:
+            # Never outlive the token itself
+            expires = min(expires, time.monotonic() + token_expires_at - time.time())
+        self._entries[token] = (expires, admin)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, username: str):
+        """Forget every cached token of ``username`` (deleted admin, new password)"""
+        stale = [token for token, (_, admin) in self._entries.items() if admin.username == username]
+        for token in stale:
+            del self._entries[token]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,265 @@
+"""Negotiated Brotli/gzip compression of API responses.
+
+Brotli is used when the ``brotli`` package is installed and the client
+accepts it, gzip otherwise. Bodies below a minimum size, types that are
+already compressed (images) and excluded path prefixes are sent as is, as
+is any response that sets its own Content-Encoding; an endpoint can opt out
+by setting ``Content-Encoding: identity``.
+
+Responses carrying an ETag (the cached content and catalog endpoints) are
+compressed once and then served from a small in-memory LRU keyed by a
+digest of the body, so repeat hits only pay for hashing it. A compressed
+response is a different representation, so its ETag gets the encoding
+appended (``"abc"`` becomes ``"abc-gzip"``), as the static file server does
+for precompressed files; ``strip_etag_encoding`` undoes that when the
+application compares an If-None-Match against its own ETag.
+"""
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Bodies compressed once and cached can afford a slower, denser setting
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts: "br", "gzip" or None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in (("br",) if brotli else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the ``encoding``-compressed representation: the suffix goes inside the quotes"""
+    return f"{etag[:-1]}-{encoding}\"" if etag.endswith('"') else etag
+
+
+def strip_etag_encoding(etag: str) -> str:
+    """The application's ETag behind one sent for a compressed representation"""
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed bodies, flushed after every chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (body digest, encoding), bounded in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: Tuple[bytes, str], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = body
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        excluded_paths: Iterable[str] = (),
+        cache: Optional[CompressedBodyCache] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.excluded_paths = tuple(excluded_paths)
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        if_none_match = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif key == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+        responder = _CompressingResponder(self, choose_encoding(accept_encoding), if_none_match, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], if_none_match: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self._send = send
+        self.start_message = None
+        self.started = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.started:
+            if self.stream is not None and message["type"] == "http.response.body":
+                data = self.stream.chunk(message.get("body", b""))
+                if not message.get("more_body", False):
+                    data += self.stream.finish()
+                message = {**message, "body": data}
+            await self._send(message)
+            return
+
+        self.started = True
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = [(key.lower(), value) for key, value in self.start_message["headers"]]
+        header_map = dict(headers)
+        content_type = header_map.get(b"content-type", b"").decode("latin-1")
+        compressible = (
+            self.start_message["status"] not in (204, 206, 304)
+            and b"content-encoding" not in header_map
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+        if compressible:
+            headers = self._add_vary(headers)
+        if self.start_message["status"] == 304 and self.encoding is not None:
+            headers = self._revalidated_etag(headers)
+        if not compressible or self.encoding is None or (not more_body and len(body) < self.middleware.minimum_size):
+            await self._send({**self.start_message, "headers": headers})
+            await self._send(message)
+            return
+
+        headers = [
+            (key, encoded_etag(value.decode("latin-1"), self.encoding).encode("latin-1") if key == b"etag" else value)
+            for key, value in headers
+            if key != b"content-length"
+        ]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if more_body:
+            self.stream = _StreamCompressor(self.encoding)
+            await self._send({**self.start_message, "headers": headers})
+            await self._send({**message, "body": self.stream.chunk(body)})
+            return
+
+        compressed = self._compress_complete(body, header_map)
+        headers.append((b"content-length", str(len(compressed)).encode()))
+        await self._send({**self.start_message, "headers": headers})
+        await self._send({**message, "body": compressed})
+
+    def _compress_complete(self, body: bytes, header_map: dict) -> bytes:
+        cache = self.middleware.cache
+        if cache is None or b"etag" not in header_map or self.start_message["status"] != 200:
+            return compress(body, self.encoding)
+        key = (hashlib.blake2b(body, digest_size=16).digest(), self.encoding)
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(body, self.encoding, cached=True)
+            cache.put(key, compressed)
+        return compressed
+
+    def _revalidated_etag(self, headers: list) -> list:
+        # A 304 confirms the representation the client holds; when that is the
+        # compressed one, answer with the ETag it was sent under
+        held = {tag.strip().removeprefix("W/") for tag in self.if_none_match.split(",")}
+        revalidated = []
+        for key, value in headers:
+            if key == b"etag":
+                etag = encoded_etag(value.decode("latin-1"), self.encoding)
+                if etag.removeprefix("W/") in held:
+                    value = etag.encode("latin-1")
+            revalidated.append((key, value))
+        return revalidated
+
+    @staticmethod
+    def _add_vary(headers: list) -> list:
+        for index, (key, value) in enumerate(headers):
+            if key == b"vary":
+                if b"accept-encoding" not in value.lower():
+                    headers[index] = (key, value + b", Accept-Encoding")
+                return headers
+        return headers + [(b"vary", b"Accept-Encoding")]
@@ -0,0 +1,289 @@
+"""Serving of locally stored uploads at /uploads.
+
+Upload names are content hashes, so every response can be cached for a year
+as immutable. Beyond what StaticFiles does, this answers Range and If-Range
+requests, prefers precompressed ``.br``/``.gz`` siblings for compressible
+types, hands file bodies to the server through the ASGI zero-copy/pathsend
+extensions when it offers them and can keep small hot files in memory.
+"""
+import asyncio
+import mimetypes
+import os
+import stat
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+CHUNK_SIZE = 256 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Types worth sending compressed; JPEG/PNG/WebP/GIF already are
+COMPRESSIBLE_TYPES = {
+    "image/svg+xml",
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/plain",
+}
+# Accept-Encoding token and sibling file suffix, most preferred first
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class FileCache:
+    """LRU of small file bodies, bounded by their total size in bytes.
+
+    Entries remember the file's mtime and size and are dropped when either
+    changes, so a replaced or recreated file is never served stale.
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, st: os.stat_result) -> Optional[bytes]:
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == st.st_mtime_ns and len(entry[1]) == st.st_size:
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, path: str, st: os.stat_result, body: bytes):
+        if len(body) > self.max_file_bytes:
+            return
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self._bytes -= len(old[1])
+        self._entries[path] = (st.st_mtime_ns, body)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def parse_range(value: str, size: int) -> Union[None, bool, Tuple[int, int]]:
+    """Byte range requested by a Range header, as inclusive (start, end).
+
+    Returns None when the header should be ignored and the whole file sent
+    (other units, bad syntax, several ranges) and False when the range
+    cannot be satisfied.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix < 0:
+                return None
+            if suffix == 0 or size == 0:
+                return False
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _stat_file(path: Path) -> Optional[os.stat_result]:
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def _read_range(path: Path, offset: int, count: int) -> bytes:
+    with open(path, "rb") as f:
+        return os.pread(f.fileno(), count, offset)
+
+
+class UploadsFileServer:
+    """ASGI app serving the flat directory of uploaded files.
+
+    ``cache_bytes`` enables the in-memory LRU for files up to
+    ``cache_max_file_bytes``; 0 turns it off.
+    """
+
+    def __init__(self, directory: Path, cache_bytes: int = 0, cache_max_file_bytes: int = 256 * 1024):
+        self.directory = directory
+        self.cache = FileCache(cache_bytes, cache_max_file_bytes) if cache_bytes > 0 else None
+        self.responses = {"200": 0, "206": 0, "304": 0, "404": 0, "416": 0}
+
+    def stats(self) -> dict:
+        return {
+            "responses": dict(self.responses),
+            "memory_cache": self.cache.stats() if self.cache else None,
+        }
+
+    def _file_name(self, scope) -> Optional[str]:
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        name = path.lstrip("/")
+        # Uploads are flat; this also keeps out the .tmp directory and partial files
+        if not name or "/" in name or "\\" in name or "\x00" in name or name.startswith("."):
+            return None
+        return name
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        loop = asyncio.get_running_loop()
+        name = self._file_name(scope)
+        st = await loop.run_in_executor(None, _stat_file, self.directory / name) if name else None
+        if st is None:
+            self.responses["404"] += 1
+            await self._send_empty(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+            return
+
+        request_headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        path = self.directory / name
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        compressible = media_type in COMPRESSIBLE_TYPES
+        encoding = None
+        if compressible:
+            accepted = {
+                token.split(";")[0].strip().lower()
+                for token in request_headers.get("accept-encoding", "").split(",")
+                if not token.replace(" ", "").endswith(";q=0")
+            }
+            for token, suffix in PRECOMPRESSED_ENCODINGS:
+                if token in accepted:
+                    sibling = path.with_name(path.name + suffix)
+                    sibling_st = await loop.run_in_executor(None, _stat_file, sibling)
+                    if sibling_st is not None:
+                        path, st, encoding = sibling, sibling_st, token
+                        break
+
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}{"-" + encoding if encoding else ""}"'
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        headers = [
+            (b"etag", etag.encode()),
+            (b"last-modified", last_modified.encode()),
+            (b"cache-control", IMMUTABLE_CACHE_CONTROL.encode()),
+        ]
+        if compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if self._not_modified(request_headers, etag, st):
+            self.responses["304"] += 1
+            await self._send_empty(send, 304, headers)
+            return
+
+        headers += [(b"content-type", media_type.encode()), (b"accept-ranges", b"bytes")]
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+
+        size = st.st_size
+        start, end, status = 0, size - 1, 200
+        range_header = request_headers.get("range")
+        if range_header and self._if_range_matches(request_headers.get("if-range"), etag, last_modified):
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                self.responses["416"] += 1
+                await self._send_empty(send, 416, headers + [(b"content-range", f"bytes */{size}".encode())])
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+        length = end - start + 1
+        headers.append((b"content-length", str(length).encode()))
+        self.responses[str(status)] += 1
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = None
+        if self.cache is not None and size <= self.cache.max_file_bytes:
+            body = self.cache.get(str(path), st)
+            if body is None:
+                body = await loop.run_in_executor(None, _read_range, path, 0, size)
+                self.cache.put(str(path), st, body)
+        if body is not None:
+            await send({"type": "http.response.body", "body": body[start:end + 1]})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopy" in extensions:
+            f = await loop.run_in_executor(None, open, path, "rb")
+            try:
+                await send({"type": "http.response.zerocopy", "file": f, "offset": start, "count": length})
+            finally:
+                await loop.run_in_executor(None, f.close)
+        elif status == 200 and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(path)})
+        else:
+            f = await loop.run_in_executor(None, open, path, "rb")
+            try:
+                offset = start
+                while offset <= end:
+                    chunk = await loop.run_in_executor(
+                        None, partial(os.pread, f.fileno(), min(CHUNK_SIZE, end + 1 - offset), offset)
+                    )
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": offset <= end})
+                if offset <= end:
+                    # File shrank underneath us; close the body short
+                    await send({"type": "http.response.body", "body": b""})
+            finally:
+                await loop.run_in_executor(None, f.close)
+
+    @staticmethod
+    def _not_modified(request_headers: dict, etag: str, st: os.stat_result) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+        # Without If-Range the range always applies; with it, only if the validator still matches
+        return if_range is None or if_range.strip() in (etag, last_modified)
+
+    @staticmethod
+    async def _send_empty(send, status: int, headers: list, body: bytes = b""):
+        if status != 304:
+            headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
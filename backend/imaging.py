@@ -0,0 +1,77 @@
+"""Image derivative generation for uploaded product and service photos.
+
+Kept separate from server.py so process-pool workers only import Pillow,
+not the whole API app.
+"""
+from pathlib import Path
+
+# Longest side in pixels of each generated size; images are never upscaled
+VARIANT_SIZES = {
+    "thumb": 320,
+    "medium": 800,
+    "full": 1600,
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# The full-size original is re-encoded too, only to drop its metadata
+ORIGINAL_QUALITY = 95
+
+
+def _write_original(opened, image, path: Path):
+    """Full-size copy of the upload in the format its name implies, without metadata.
+
+    Pillow only writes EXIF, XMP and comments when they are passed to
+    ``save``, so saving the decoded pixels leaves them out. Animated GIFs
+    keep their frames.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".gif":
+        # From the opened file, so animated GIFs keep their frames
+        opened.save(path, "GIF", save_all=True, comment=b"")
+    elif suffix in (".jpg", ".jpeg"):
+        image.convert("RGB").save(path, "JPEG", quality=ORIGINAL_QUALITY, optimize=True)
+    elif suffix == ".webp":
+        image.save(path, "WEBP", quality=ORIGINAL_QUALITY)
+    else:
+        image.save(path, "PNG", optimize=True)
+
+
+def generate_variants(source: str, out_dir: str, stem: str, original: str) -> dict:
+    """Write WebP and JPEG versions of ``source`` for every VARIANT_SIZES entry,
+    and a sanitized full-size copy of it named ``original``.
+
+    EXIF orientation is applied to the pixels and all metadata (EXIF, GPS,
+    comments) is dropped by re-encoding; the original is served too, so it
+    must not keep the camera's metadata either. Returns the original
+    dimensions and, per size, the generated file names and dimensions.
+    Raises ValueError if ``source`` is not a readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+            _write_original(opened, image, Path(out_dir) / original)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Not a valid image: {e}")
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    variants = {}
+    for name, max_side in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        webp_name = f"{stem}_{name}.webp"
+        jpeg_name = f"{stem}_{name}.jpg"
+        resized.save(Path(out_dir) / webp_name, "WEBP", quality=WEBP_QUALITY, method=4)
+        # JPEG has no alpha channel
+        resized.convert("RGB").save(Path(out_dir) / jpeg_name, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[name] = {
+            "webp": webp_name,
+            "jpeg": jpeg_name,
+            "width": resized.width,
+            "height": resized.height,
+        }
+    return {"width": image.width, "height": image.height, "variants": variants}
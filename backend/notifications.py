@@ -0,0 +1,228 @@
+"""Outgoing WhatsApp notifications, queued durably in MongoDB.
+
+Requests only insert into the ``notifications`` collection; the outbox's
+background worker delivers them and retries failures with backoff. twilio
+is imported on the first real send, so workers boot without it and with
+Twilio disabled it is never loaded at all.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class TwilioWhatsAppSender:
+    """Sends WhatsApp messages through Twilio (blocking HTTP call).
+
+    twilio.rest takes a long time to import, so the client is created on
+    the first send instead of when the worker boots.
+    """
+
+    def __init__(self, account_sid: Optional[str], auth_token: Optional[str], from_number: Optional[str]):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self._client = None
+
+    def send(self, to: str, body: str) -> str:
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        message = self._client.messages.create(body=body, from_=self.from_number, to=to)
+        return message.sid
+
+
+class LoggingWhatsAppSender:
+    """Stand-in used when Twilio is disabled: just logs the message"""
+
+    def send(self, to: str, body: str) -> str:
+        logger.info(f"[MOCK WhatsApp] Message to {to}:\n{body}")
+        return f"mock-{uuid.uuid4()}"
+
+
+class NotificationOutbox:
+    """Durable queue of outgoing WhatsApp messages in ``collection``.
+
+    Requests only insert a document; a background worker claims pending
+    documents in batches, hands them to ``sender`` in a thread (the Twilio
+    client is synchronous) and retries failures with exponential backoff.
+    Claims are leases, so a message held by a crashed worker is picked up
+    again once its lease expires. ``sender`` is any object with a
+    ``send(to, body) -> message id`` method, which makes it easy to swap in
+    a stub.
+
+    Enqueueing is a write of its own, so a request can stop between its own
+    write and the enqueue. ``recover``, if given, is awaited by the worker
+    every RECOVER_SECONDS to queue what such requests missed; it returns how
+    many messages it queued.
+    """
+
+    LEASE_SECONDS = 60
+    RECOVER_SECONDS = 60
+
+    def __init__(
+        self,
+        collection,
+        sender,
+        batch_size: int,
+        max_attempts: int,
+        poll_interval: float,
+        backoff: float,
+        recover: Optional[Callable[[], Awaitable[int]]] = None,
+    ):
+        self.collection = collection
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.recover = recover
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.recovered = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, to: str, body: str, once_for: Optional[dict] = None, **metadata) -> str:
+        """Queue a message and return its id.
+
+        With ``once_for`` (e.g. ``{"appointment_id": ...}``, backed by a
+        unique index) at most one message is ever queued for it; enqueueing
+        again returns the id of the existing one.
+        """
+        now = datetime.now(timezone.utc)
+        doc = {
+            "id": str(uuid.uuid4()),
+            "channel": "whatsapp",
+            "to": to,
+            "body": body,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            **metadata,
+        }
+        if once_for is None:
+            await self.collection.insert_one(doc)
+        else:
+            doc.update(once_for)
+            try:
+                queued = await self.collection.find_one_and_update(
+                    once_for, {"$setOnInsert": doc}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # A concurrent enqueue for the same key won the upsert
+                queued = await self.collection.find_one(once_for)
+            doc = queued
+        self._wake.set()
+        return doc["id"]
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "locked_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": "sending", "locked_until": now + timedelta(seconds=self.LEASE_SECONDS)}},
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _deliver(self, doc: dict):
+        attempts = doc["attempts"] + 1
+        try:
+            sid = await asyncio.get_running_loop().run_in_executor(None, self.sender.send, doc["to"], doc["body"])
+        except Exception as e:
+            now = datetime.now(timezone.utc)
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                update = {"status": "failed", "failed_at": now}
+                logger.error(f"WhatsApp notification {doc['id']} failed after {attempts} attempts: {e}")
+            else:
+                self.retried += 1
+                delay = self.backoff * 2 ** (attempts - 1)
+                update = {"status": "pending", "next_attempt_at": now + timedelta(seconds=delay)}
+                logger.warning(f"WhatsApp notification {doc['id']} failed, retrying in {delay:.0f}s: {e}")
+            update.update({"attempts": attempts, "last_error": str(e), "locked_until": None})
+            await self.collection.update_one({"id": doc["id"]}, {"$set": update})
+            return
+        self.sent += 1
+        await self.collection.update_one({"id": doc["id"]}, {"$set": {
+            "status": "sent",
+            "attempts": attempts,
+            "sid": sid,
+            "sent_at": datetime.now(timezone.utc),
+            "locked_until": None,
+        }})
+        logger.info(f"WhatsApp sent: {sid}")
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch; returns how many messages were attempted"""
+        batch = []
+        while len(batch) < self.batch_size:
+            doc = await self._claim()
+            if doc is None:
+                break
+            batch.append(doc)
+        await asyncio.gather(*(self._deliver(doc) for doc in batch))
+        return len(batch)
+
+    async def _recover(self):
+        try:
+            recovered = await self.recover()
+        except Exception as e:
+            logger.error(f"Recovering missed notifications failed: {e!r}")
+            return
+        if recovered:
+            self.recovered += recovered
+            logger.warning(f"Queued {recovered} notifications missed by interrupted requests")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_recovery = loop.time()
+        while True:
+            self._wake.clear()
+            if self.recover is not None and loop.time() >= next_recovery:
+                await self._recover()
+                next_recovery = loop.time() + self.RECOVER_SECONDS
+            try:
+                processed = await self.run_once()
+            except PyMongoError as e:
+                logger.warning(f"Notification outbox poll failed: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def stats(self) -> dict:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        counts = await self.collection.aggregate(pipeline).to_list(None)
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "queue": {row["_id"]: row["count"] for row in counts},
+        }
@@ -0,0 +1,101 @@
+"""Appointment slots: working hours, the slot grid and per-day occupancy.
+
+Working hours are read from the free-text ``ContactInfo.working_hours``,
+e.g. "Pazartesi - Cumartesi: 08:00 - 17:00" or "Hafta içi: 09:00 - 18:00,
+Cumartesi: 09:00 - 14:00, Pazar: Kapalı". Days without hours are closed.
+
+The day is cut into slots of a fixed length counted from midnight. An
+appointment occupies every slot its service duration overlaps, and the
+``appointment_days`` collection keeps one document per date with the number
+of active appointments in each occupied slot:
+
+    {"_id": "2026-05-04", "slots": {"480": 2, "540": 1}}
+
+keyed by the slot's start minute. Availability for a range of dates is then
+a single ``_id`` range query, however many appointments there are, and a
+booking is one conditional update of one document.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from search import fold
+
+WEEKDAYS = {
+    "pazartesi": 0, "sali": 1, "carsamba": 2, "persembe": 3, "cuma": 4, "cumartesi": 5, "pazar": 6,
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+DAY_GROUPS = {
+    "hafta ici": [0, 1, 2, 3, 4],
+    "hafta sonu": [5, 6],
+    "her gun": [0, 1, 2, 3, 4, 5, 6],
+}
+HOURS_PATTERN = re.compile(
+    r"(?P<days>[^\d]+?)\s*:?\s*(?P<open>\d{1,2}[:.]\d{2})\s*[-–—]\s*(?P<close>\d{1,2}[:.]\d{2})"
+)
+
+
+def parse_clock(value: str) -> Optional[int]:
+    """Minute of the day for "HH:MM" (or "H.MM"), None if it is not a time"""
+    match = re.fullmatch(r"(\d{1,2})[:.](\d{2})", value.strip())
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if minutes > 59 or hours * 60 + minutes > 24 * 60:
+        return None
+    return hours * 60 + minutes
+
+
+def format_clock(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _parse_days(text: str) -> List[int]:
+    days = []
+    for part in re.split(r",|&|\bve\b", text):
+        ends = [end for end in (fold(end) for end in re.split(r"[-–—]", part)) if end]
+        if len(ends) == 1:
+            if ends[0] in DAY_GROUPS:
+                days += DAY_GROUPS[ends[0]]
+            elif ends[0] in WEEKDAYS:
+                days.append(WEEKDAYS[ends[0]])
+        elif len(ends) == 2 and ends[0] in WEEKDAYS and ends[1] in WEEKDAYS:
+            first, last = WEEKDAYS[ends[0]], WEEKDAYS[ends[1]]
+            days += [(first + offset) % 7 for offset in range((last - first) % 7 + 1)]
+    return days
+
+
+@lru_cache(maxsize=16)
+def parse_working_hours(text: str) -> Dict[int, Tuple[int, int]]:
+    """Weekday (Monday = 0) -> (opening, closing) minute; missing days are closed"""
+    hours = {}
+    for match in HOURS_PATTERN.finditer(text or ""):
+        opening, closing = parse_clock(match.group("open")), parse_clock(match.group("close"))
+        if opening is None or closing is None or closing <= opening:
+            continue
+        for day in _parse_days(match.group("days")):
+            hours.setdefault(day, (opening, closing))
+    return hours
+
+
+def slot_count(duration: int, slot_minutes: int) -> int:
+    return max(1, -(-duration // slot_minutes))
+
+
+def slot_starts(hours: Tuple[int, int], duration: int, slot_minutes: int) -> List[int]:
+    """Start minutes on the slot grid where an appointment of ``duration`` fits the opening hours"""
+    opening, closing = hours
+    first = -(-opening // slot_minutes) * slot_minutes
+    length = slot_count(duration, slot_minutes) * slot_minutes
+    return list(range(first, closing - length + 1, slot_minutes))
+
+
+def covered_slots(start: int, duration: int, slot_minutes: int) -> List[int]:
+    """Start minutes of the slots occupied by an appointment starting at ``start``"""
+    first = start // slot_minutes * slot_minutes
+    last = start + max(duration, 1)
+    return list(range(first, last, slot_minutes))
+
+
+def remaining_capacity(occupancy: Dict[str, int], slots: List[int], capacity: int) -> int:
+    return max(0, capacity - max((occupancy.get(str(slot), 0) for slot in slots), default=0))
@@ -0,0 +1,100 @@
+"""Text folding and the in-memory index behind /api/search.
+
+Products and blog posts store a ``search`` field with their title and body
+text folded by ``fold``: lowercased, Turkish letters mapped to ASCII (İ/I/ı
+to i, ş to s, ğ to g, ç to c, ö to o, ü to u) and punctuation dropped.
+Queries are folded the same way, so "PARÇA", "parça" and "parca" all match.
+MongoDB's text index over that field uses language "none" (no stemming or
+stop words, which it only knows for English-like languages anyway).
+
+``InvertedIndex`` ranks the same fields without MongoDB, for catalogues
+small enough to keep in memory; it also matches the last query word as a
+prefix, so results show up while a customer is still typing.
+"""
+import math
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i",
+    "Ş": "s", "ş": "s",
+    "Ğ": "g", "ğ": "g",
+    "Ç": "c", "ç": "c",
+    "Ö": "o", "ö": "o",
+    "Ü": "u", "ü": "u",
+    "Â": "a", "â": "a",
+    "Î": "i", "î": "i",
+    "Û": "u", "û": "u",
+})
+WORD = re.compile(r"\w+")
+# A title match counts this many times as much as a body match
+TITLE_WEIGHT = 5
+# Prefix matches on the last query word score less than whole words
+PREFIX_WEIGHT = 0.5
+
+
+def fold(text) -> str:
+    return " ".join(WORD.findall(str(text or "").translate(TURKISH_FOLD).lower()))
+
+
+def search_fields(title, body_parts: Iterable) -> dict:
+    """The ``search`` field stored on a document"""
+    return {
+        "title": fold(title),
+        "body": fold(" ".join(str(part) for part in body_parts if part is not None)),
+    }
+
+
+class InvertedIndex:
+    """Token -> document postings over folded title and body text.
+
+    Scores are tf-idf: each occurrence of a query word in the title counts
+    TITLE_WEIGHT, in the body 1, damped logarithmically and scaled by how
+    rare the word is across the index.
+    """
+
+    def __init__(self):
+        self.documents: List[dict] = []
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+    def add(self, document: dict, fields: dict):
+        doc_id = len(self.documents)
+        self.documents.append(document)
+        weights: Dict[str, float] = defaultdict(float)
+        for token in fields.get("title", "").split():
+            weights[token] += TITLE_WEIGHT
+        for token in fields.get("body", "").split():
+            weights[token] += 1
+        for token, weight in weights.items():
+            self._postings[token][doc_id] = weight
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _matches(self, term: str, prefix: bool) -> List[Tuple[str, float]]:
+        matches = [(term, 1.0)] if term in self._postings else []
+        if prefix:
+            matches += [
+                (token, PREFIX_WEIGHT) for token in self._postings
+                if token != term and token.startswith(term)
+            ]
+        return matches
+
+    def search(self, query: str, predicate: Optional[Callable[[dict], bool]] = None) -> List[Tuple[float, dict]]:
+        """Documents matching any word of ``query``, best first"""
+        terms = fold(query).split()
+        scores: Dict[int, float] = defaultdict(float)
+        total = len(self.documents)
+        for position, term in enumerate(terms):
+            for token, match_weight in self._matches(term, prefix=position == len(terms) - 1):
+                postings = self._postings[token]
+                idf = math.log(1 + total / len(postings))
+                for doc_id, weight in postings.items():
+                    scores[doc_id] += match_weight * (1 + math.log(weight)) * idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            (round(score, 4), self.documents[doc_id])
+            for doc_id, score in ranked
+            if predicate is None or predicate(self.documents[doc_id])
+        ]
@@ -1,26 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, File, UploadFile
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status, File, UploadFile, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, DeleteMany, IndexModel, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
 import os
+import asyncio
+import hashlib
+import base64
+import json
+from functools import lru_cache, partial
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, computed_field
+from pydantic_core import to_json
+from typing import Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 import uuid
 from datetime import datetime, timezone, timedelta
-import jwt
-import bcrypt
-import shutil
+import tempfile
+
+from auth import AdminTokenCache, PasswordHasher
+from notifications import LoggingWhatsAppSender, NotificationOutbox, TwilioWhatsAppSender
+from storage import DirectUploadStorage, LocalStorage, S3Storage, UploadStorage
+from uploads import UploadManager, UploadSizeLimit, sha256_file, upload_response
+from file_serving import UploadsFileServer
+from compression import CompressedBodyCache, CompressionMiddleware, strip_etag_encoding
+from search import InvertedIndex, fold, search_fields
+from scheduling import (
+    covered_slots, format_clock, parse_clock, parse_working_hours, remaining_capacity, slot_starts,
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Dates come back as timezone-aware UTC datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -28,17 +45,100 @@ JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key')
 JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
 security = HTTPBearer()
 
+# Password hashing: bcrypt cost factor and the thread pool it runs in.
+# Requests beyond workers + queue are rejected with 503 instead of piling up.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '16'))
+
+# Verified admin tokens are remembered for a short while to skip the
+# per-request admin lookup. The TTL also bounds how long another worker
+# keeps accepting a token after an admin is removed.
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_CACHE_TTL_SECONDS', '60'))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '256'))
+
 # Twilio Configuration
 TWILIO_ENABLED = os.environ.get('TWILIO_ENABLED', 'false').lower() == 'true'
-if TWILIO_ENABLED:
-    from twilio.rest import Client
-    TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
-    TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
-    TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM')
-    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
+TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
+TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM')
+
+# Uploaded images
+UPLOADS_DIR = Path(os.environ.get('UPLOADS_DIR', '/app/backend/uploads'))
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5MB
+# In-memory LRU for the hottest small files served at /uploads (0 disables it)
+UPLOADS_MEMORY_CACHE_BYTES = int(os.environ.get('UPLOADS_MEMORY_CACHE_BYTES', '0'))
+UPLOADS_MEMORY_CACHE_MAX_FILE_BYTES = int(os.environ.get('UPLOADS_MEMORY_CACHE_MAX_FILE_BYTES', str(256 * 1024)))
+# Processes generating resized WebP/JPEG variants of uploaded images
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+# Uploads no product or service uses are deleted once they have not been
+# uploaded for this long, so an image uploaded into a form that was never
+# saved does not stay forever; the sweep runs every UPLOAD_SWEEP_SECONDS (0 disables it)
+UPLOAD_ORPHAN_GRACE_SECONDS = float(os.environ.get('UPLOAD_ORPHAN_GRACE_SECONDS', str(24 * 3600)))
+UPLOAD_SWEEP_SECONDS = float(os.environ.get('UPLOAD_SWEEP_SECONDS', '3600'))
+# Where uploads are stored: "local" (UPLOADS_DIR, served at /uploads) or
+# "s3" (any S3-compatible bucket; S3_ENDPOINT_URL targets MinIO/moto)
+UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local').lower()
+S3_BUCKET = os.environ.get('S3_BUCKET')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+S3_REGION = os.environ.get('S3_REGION')
+S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')
+ALLOWED_IMAGE_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/jpg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
 
 BD_GARAJ_WHATSAPP = os.environ.get('BD_GARAJ_WHATSAPP', 'whatsapp:+905326832603')
 
+# Notification outbox worker
+NOTIFY_BATCH_SIZE = int(os.environ.get('NOTIFY_BATCH_SIZE', '10'))
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '6'))
+NOTIFY_POLL_SECONDS = float(os.environ.get('NOTIFY_POLL_SECONDS', '5'))
+NOTIFY_BACKOFF_SECONDS = float(os.environ.get('NOTIFY_BACKOFF_SECONDS', '10'))
+
+# Response compression: bodies smaller than this are sent uncompressed, and
+# compressed bodies of ETag'd responses are kept in a byte-bounded LRU
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_CACHE_BYTES = int(os.environ.get('COMPRESSION_CACHE_BYTES', str(8 * 1024 * 1024)))
+
+# Search backend: "mongo" queries the text indexes, "memory" keeps an
+# inverted index of the products and blog posts in each worker (fine for a
+# few thousand documents) and also matches the last word as a prefix
+SEARCH_MODE = os.environ.get('SEARCH_MODE', 'mongo').lower()
+
+# Appointment booking: length of a slot on the day's grid, appointments the
+# workshop takes at the same time, how many days ahead customers can book
+# and the shop's UTC offset (Turkey stays on UTC+3 all year)
+APPOINTMENT_SLOT_MINUTES = int(os.environ.get('APPOINTMENT_SLOT_MINUTES', '60'))
+APPOINTMENT_CAPACITY = int(os.environ.get('APPOINTMENT_CAPACITY', '2'))
+APPOINTMENT_BOOKING_DAYS = int(os.environ.get('APPOINTMENT_BOOKING_DAYS', '90'))
+SHOP_TIMEZONE = timezone(timedelta(hours=float(os.environ.get('SHOP_UTC_OFFSET_HOURS', '3'))))
+
+# Documents converted per batch by the background timestamp migration
+TIMESTAMP_MIGRATION_BATCH_SIZE = int(os.environ.get('TIMESTAMP_MIGRATION_BATCH_SIZE', '500'))
+# Documents read and updated per batch by the seed backfills of derived fields
+BACKFILL_BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', '500'))
+
+# Cross-worker cache sync: "auto" tries change streams and falls back to
+# polling the version counters, "poll" always polls, "off" disables it
+CACHE_SYNC_MODE = os.environ.get('CACHE_SYNC_MODE', 'auto').lower()
+CACHE_SYNC_POLL_SECONDS = float(os.environ.get('CACHE_SYNC_POLL_SECONDS', '2'))
+
+upload_storage: UploadStorage
+if UPLOAD_STORAGE == "s3":
+    upload_storage = S3Storage(
+        S3_BUCKET,
+        Path(tempfile.gettempdir()) / "bd-garaj-uploads",
+        endpoint_url=S3_ENDPOINT_URL,
+        region=S3_REGION,
+        public_url=S3_PUBLIC_URL,
+    )
+else:
+    upload_storage = LocalStorage(UPLOADS_DIR)
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -90,6 +190,34 @@ class AppointmentUpdate(BaseModel):
     status: Optional[str] = None
     notes: Optional[str] = None
 
+class AppointmentDayCount(BaseModel):
+    date: str
+    count: int
+
+class AppointmentServiceCount(BaseModel):
+    service: str
+    count: int
+
+class AppointmentStats(BaseModel):
+    total: int
+    by_status: Dict[str, int] = {}
+    by_day: List[AppointmentDayCount] = []
+    by_service: List[AppointmentServiceCount] = []
+
+class AvailabilitySlot(BaseModel):
+    time: str  # HH:MM
+    remaining: int  # appointments that can still be booked at this time
+
+class AvailabilityDay(BaseModel):
+    date: str  # YYYY-MM-DD
+    slots: List[AvailabilitySlot] = []  # empty when closed or past
+
+class Availability(BaseModel):
+    duration_minutes: int
+    slot_minutes: int
+    capacity: int
+    days: List[AvailabilityDay] = []
+
 class BlogPost(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -100,6 +228,17 @@ class BlogPost(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class BlogPostSummary(BaseModel):
+    """Listing view of a blog post: no content, just the stored excerpt"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    title: str
+    author: str = "BD Garaj"
+    image_url: Optional[str] = ""
+    excerpt: str = ""
+    created_at: datetime
+    updated_at: datetime
+
 class BlogPostCreate(BaseModel):
     title: str
     content: str
@@ -112,6 +251,12 @@ class BlogPostUpdate(BaseModel):
     author: Optional[str] = None
     image_url: Optional[str] = None
 
+class ImageVariant(BaseModel):
+    url: str  # WebP
+    jpeg_url: str
+    width: int
+    height: int
+
 class Service(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -119,6 +264,24 @@ class Service(BaseModel):
     description: str
     icon: str
     image_url: Optional[str] = ""
+    image_variants: Dict[str, ImageVariant] = {}  # thumb/medium/full of image_url
+    duration_minutes: int = 60  # workshop time an appointment for this service takes
+
+class ServiceRating(BaseModel):
+    """Totals of the approved comments' ratings for one service (service_rating_stats)"""
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(exclude=True)  # the service id
+    count: int = 0
+    sum: int = 0
+    histogram: Dict[str, int] = {}  # "1".."5" stars -> comments
+
+    @computed_field
+    @property
+    def average(self) -> Optional[float]:
+        return round(self.sum / self.count, 2) if self.count else None
+
+class ServiceWithRating(Service):
+    rating: Optional[ServiceRating] = None
 
 class Feature(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -222,9 +385,24 @@ class Product(BaseModel):
     contact_phone: Optional[str] = ""
     contact_email: Optional[str] = ""
     specs: Optional[dict] = {}  # Additional specs like year, km, brand, etc
+    image_variants: Dict[str, Dict[str, ImageVariant]] = {}  # image url -> thumb/medium/full
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class ProductSummary(BaseModel):
+    """Listing view of a product: first image and excerpt instead of the full details"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    category: str
+    title: str
+    excerpt: str = ""
+    price: float
+    currency: str = "TRY"
+    thumbnail: Optional[str] = None  # small variant of the first image when available
+    status: str = "active"
+    specs: Optional[dict] = {}
+    created_at: datetime
+
 class ProductCreate(BaseModel):
     category: str
     title: str
@@ -249,6 +427,37 @@ class ProductUpdate(BaseModel):
     contact_email: Optional[str] = None
     specs: Optional[dict] = None
 
+class SearchHit(BaseModel):
+    type: str  # product, blog
+    score: float
+    item: Union[ProductSummary, BlogPostSummary]
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class FacetBucket(BaseModel):
+    min: int
+    max: Optional[int] = None  # exclusive; None for the open-ended last bucket
+    count: int
+
+class PriceRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ProductFacets(BaseModel):
+    total: int
+    brands: List[FacetCount] = []
+    years: List[FacetBucket] = []
+    km: List[FacetBucket] = []
+    price: PriceRange = PriceRange()
+
+class DirectUploadRequest(BaseModel):
+    content_type: str
+
+class DirectUploadComplete(BaseModel):
+    upload_id: str
+
 class Comment(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -258,7 +467,7 @@ class Comment(BaseModel):
     comment_text: str
     rating: Optional[int] = Field(default=5, ge=1, le=5)  # 1-5 yıldız
     status: str = "pending"  # pending, approved, rejected
-    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CommentCreate(BaseModel):
     service_id: str
@@ -272,39 +481,56 @@ class CommentUpdate(BaseModel):
 
 # ==================== HELPER FUNCTIONS ====================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# PyJWT (which pulls in cryptography) is imported where it is used, keeping
+# it off the worker's cold-start import path
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, BCRYPT_ROUNDS)
+
+EXCERPT_LENGTH = 160
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> str:
+    """Plain-text preview of ``text`` cut at a word boundary"""
+    text = " ".join((text or "").split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=24)):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
+    import jwt
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+admin_token_cache = AdminTokenCache(TOKEN_CACHE_TTL_SECONDS, TOKEN_CACHE_SIZE)
+
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    cached_admin = admin_token_cache.get(token)
+    if cached_admin is not None:
+        return cached_admin
+    import jwt
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        admin = await db.admins.find_one({"username": username}, {"_id": 0})
-        if admin is None:
-            raise HTTPException(status_code=401, detail="Admin not found")
-        return Admin(**admin)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    username: str = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    admin = await db.admins.find_one({"username": username}, {"_id": 0})
+    if admin is None:
+        raise HTTPException(status_code=401, detail="Admin not found")
+    current_admin = Admin(**admin)
+    admin_token_cache.put(token, current_admin, payload.get("exp"))
+    return current_admin
 
-async def send_whatsapp_notification(appointment: Appointment):
-    """Send WhatsApp notification to BD Garaj"""
-    message = f"""🏍️ YENİ RANDEVU!
+def format_appointment_message(appointment: Appointment) -> str:
+    return f"""🏍️ YENİ RANDEVU!
 
 👤 Müşteri: {appointment.customer_name}
 📞 Telefon: {appointment.phone}
@@ -316,21 +542,980 @@ async def send_whatsapp_notification(appointment: Appointment):
 
 Randevu ID: {appointment.id}"""
 
-    if TWILIO_ENABLED:
+# ==================== NOTIFICATION OUTBOX ====================
+
+async def queue_appointment_notification(appointment: Appointment):
+    """Queue the shop's WhatsApp message about a new appointment, once.
+
+    Appointments are inserted with ``notification_pending`` set, and the
+    flag is cleared once the message is queued, so an appointment whose
+    request stopped in between is found again by the outbox worker.
+    """
+    await notification_outbox.enqueue(
+        BD_GARAJ_WHATSAPP,
+        format_appointment_message(appointment),
+        once_for={"appointment_id": appointment.id},
+    )
+    await db.appointments.update_one({"id": appointment.id}, {"$unset": {"notification_pending": ""}})
+
+async def queue_missed_appointment_notifications() -> int:
+    missed = await db.appointments.find({"notification_pending": True}, {"_id": 0}).to_list(None)
+    for doc in missed:
+        await queue_appointment_notification(Appointment(**doc))
+    return len(missed)
+
+notification_outbox = NotificationOutbox(
+    db.notifications,
+    TwilioWhatsAppSender(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_FROM)
+    if TWILIO_ENABLED else LoggingWhatsAppSender(),
+    batch_size=NOTIFY_BATCH_SIZE,
+    max_attempts=NOTIFY_MAX_ATTEMPTS,
+    poll_interval=NOTIFY_POLL_SECONDS,
+    backoff=NOTIFY_BACKOFF_SECONDS,
+    recover=queue_missed_appointment_notifications,
+)
+
+# ==================== CONTENT CACHE ====================
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+class CollectionCache(Generic[ModelT]):
+    """In-process copy of a small CMS collection.
+
+    Loaded once at startup and kept current by the admin write handlers
+    (write-through), so public reads never go to MongoDB. Every change bumps
+    ``version`` so derived payloads (e.g. the homepage bundle) know when to
+    rebuild.
+    """
+
+    def __init__(self, collection: str, model: Type[ModelT], sort_field: Optional[str] = None):
+        self.collection = collection
+        self.model = model
+        self.sort_field = sort_field
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+        self._items: Dict[str, ModelT] = {}
+        self._sorted: Optional[List[ModelT]] = None
+        self._json: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def reload(self):
+        async with self._lock:
+            docs = await db[self.collection].find({}, {"_id": 0}).to_list(None)
+            self._items = {doc["id"]: self.model(**doc) for doc in docs}
+            self.loaded = True
+            self._changed()
+
+    async def _ensure_loaded(self):
+        if self.loaded:
+            self.hits += 1
+        else:
+            self.misses += 1
+            await self.reload()
+
+    async def list(self) -> List[ModelT]:
+        await self._ensure_loaded()
+        return self._ordered()
+
+    def _ordered(self) -> List[ModelT]:
+        if self._sorted is None:
+            items = list(self._items.values())
+            if self.sort_field:
+                items.sort(key=lambda item: getattr(item, self.sort_field))
+            self._sorted = items
+        return self._sorted
+
+    def json(self) -> bytes:
+        """The ordered list serialized once per version, sent as is by list endpoints"""
+        if self._json is None:
+            self._json = to_json(self._ordered())
+        return self._json
+
+    def etag(self) -> str:
+        """Content hash of the cached collection, identical on every worker"""
+        if self._etag is None:
+            self._etag = make_etag(self.collection, self.json())
+        return self._etag
+
+    async def get(self, item_id: str) -> Optional[ModelT]:
+        await self._ensure_loaded()
+        return self._items.get(item_id)
+
+    def put(self, item: ModelT) -> ModelT:
+        """Store a freshly written document and return it"""
+        self._items[item.id] = item
+        self._changed()
+        return item
+
+    def remove(self, item_id: str):
+        if self._items.pop(item_id, None) is not None:
+            self._changed()
+
+    def _changed(self):
+        self._sorted = None
+        self._json = None
+        self._etag = None
+        self.version += 1
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "items": len(self._items),
+            "loaded": self.loaded,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+class ContentCache:
+    def __init__(self):
+        self.services = CollectionCache("services", Service)
+        self.features = CollectionCache("features", Feature, sort_field="order")
+        self.testimonials = CollectionCache("testimonials", Testimonial, sort_field="order")
+        self.faqs = CollectionCache("faqs", FAQ, sort_field="order")
+        self.contact_info = CollectionCache("contact_info", ContactInfo)
+        self.cta_section = CollectionCache("cta_section", CTASection)
+        self.service_ratings = CollectionCache("service_rating_stats", ServiceRating)
+        # Collections that are synced across workers but not cached here;
+        # only their version is tracked
+        self._uncached_versions: Dict[str, int] = {"blog_posts": 0, "products": 0, "comments": 0}
+
+    @property
+    def collections(self) -> List[CollectionCache]:
+        return [
+            self.services, self.features, self.testimonials,
+            self.faqs, self.contact_info, self.cta_section,
+            self.service_ratings,
+        ]
+
+    @property
+    def synced_collections(self) -> List[str]:
+        return [cache.collection for cache in self.collections] + list(self._uncached_versions)
+
+    def get_cache(self, collection: str) -> Optional[CollectionCache]:
+        for cache in self.collections:
+            if cache.collection == collection:
+                return cache
+        return None
+
+    def version(self, collection: str) -> int:
+        cache = self.get_cache(collection)
+        if cache is not None:
+            return cache.version
+        return self._uncached_versions[collection]
+
+    def versions(self) -> tuple:
+        return tuple(cache.version for cache in self.collections)
+
+    async def refresh(self, collection: str):
+        """Reload a cached collection, or just bump the version of an uncached one"""
+        cache = self.get_cache(collection)
+        if cache is not None:
+            await cache.reload()
+        else:
+            self._uncached_versions[collection] += 1
+
+    async def reload(self):
+        await asyncio.gather(*(cache.reload() for cache in self.collections))
+        for collection in self._uncached_versions:
+            self._uncached_versions[collection] += 1
+
+    def stats(self) -> dict:
+        stats = {cache.collection: cache.stats() for cache in self.collections}
+        for collection, version in self._uncached_versions.items():
+            stats[collection] = {"version": version}
+        return stats
+
+content_cache = ContentCache()
+
+# ==================== CROSS-WORKER CACHE SYNC ====================
+
+# Change streams need a replica set; on a standalone mongod this error code
+# means "not supported" and we fall back to polling
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+class CacheSync:
+    """Keeps this worker's content cache in step with writes made by other workers.
+
+    Every write to a synced collection increments a counter in the
+    ``_cache_versions`` collection. Where change streams are available the
+    watcher patches cache entries straight from the change events; otherwise
+    the counters are polled and changed collections are reloaded.
+    """
+
+    def __init__(self, mode: str, poll_interval: float):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.active_mode: Optional[str] = None
+        self.events = 0
+        self._seen: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def prime(self):
+        """Record the current counters; call before the initial cache load"""
+        docs = await db._cache_versions.find({}).to_list(None)
+        self._seen = {doc["_id"]: doc["version"] for doc in docs}
+
+    async def record_write(self, collection: str):
+        doc = await db._cache_versions.find_one_and_update(
+            {"_id": collection},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Our own write is already applied locally, so skip it when polling
+        if doc["version"] == self._seen.get(collection, 0) + 1:
+            self._seen[collection] = doc["version"]
+
+    def start(self):
+        if self.mode != "off":
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        if self.mode != "poll":
+            try:
+                self.active_mode = "changestream"
+                await self._watch()
+                return
+            except OperationFailure as e:
+                # _watch only gives up when change streams are not supported
+                logger.info(f"Change streams unavailable, polling cache versions instead: {e}")
+        self.active_mode = "poll"
+        await self._poll()
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": content_cache.synced_collections}}}]
+        resume_token = None
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        try:
+                            await self._apply_change(change)
+                        except Exception as e:
+                            # e.g. a document the model no longer accepts; one bad
+                            # event must not stop syncing for the worker's lifetime
+                            collection = change.get("ns", {}).get("coll")
+                            logger.error(f"Could not apply change to {collection}, reloading it: {e!r}")
+                            await self._refresh(collection)
+            except OperationFailure as e:
+                if resume_token is not None:
+                    # Resume point lost (e.g. oplog rolled over): start afresh
+                    logger.warning(f"Change stream restarted, reloading content cache: {e}")
+                    resume_token = None
+                    for collection in content_cache.synced_collections:
+                        await self._refresh(collection)
+                elif e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                else:
+                    # Authentication, permissions and the like: polling would
+                    # hide the problem, so keep retrying and say so loudly
+                    logger.error(f"Change stream failed (code {e.code}), retrying: {e}")
+                    await asyncio.sleep(self.poll_interval)
+            except PyMongoError as e:
+                logger.warning(f"Change stream interrupted: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _apply_change(self, change: dict):
+        self.events += 1
+        collection = change["ns"]["coll"]
+        cache = content_cache.get_cache(collection)
+        document = change.get("fullDocument")
+        if cache is not None and change["operationType"] in ("insert", "update", "replace") and document:
+            document.pop("_id", None)
+            cache.put(cache.model(**document))
+        else:
+            # Deletes only carry the Mongo _id, so reload the (small) collection
+            await content_cache.refresh(collection)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                docs = await db._cache_versions.find({}).to_list(None)
+            except PyMongoError as e:
+                logger.warning(f"Cache version poll failed: {e}")
+                continue
+            for doc in docs:
+                collection, version = doc["_id"], doc["version"]
+                if self._seen.get(collection) == version:
+                    continue
+                if collection in content_cache.synced_collections:
+                    self.events += 1
+                    # Left unseen when the reload fails, so the next poll retries it
+                    if not await self._refresh(collection):
+                        continue
+                self._seen[collection] = version
+
+    async def _refresh(self, collection: str) -> bool:
+        """Reload one synced collection; failures are logged rather than raised"""
         try:
-            message_response = twilio_client.messages.create(
-                body=message,
-                from_=TWILIO_WHATSAPP_FROM,
-                to=BD_GARAJ_WHATSAPP
-            )
-            logger.info(f"WhatsApp sent: {message_response.sid}")
+            await content_cache.refresh(collection)
             return True
         except Exception as e:
-            logger.error(f"WhatsApp error: {str(e)}")
+            logger.error(f"Reloading {collection} for cache sync failed: {e!r}")
             return False
-    else:
-        logger.info(f"[MOCK WhatsApp] Message to {BD_GARAJ_WHATSAPP}:\n{message}")
+
+    def stats(self) -> dict:
+        return {"mode": self.active_mode or self.mode, "events": self.events}
+
+cache_sync = CacheSync(CACHE_SYNC_MODE, CACHE_SYNC_POLL_SECONDS)
+
+async def notify_collection_changed(collection: str):
+    """Tell the other workers that a synced collection was written"""
+    if content_cache.get_cache(collection) is None:
+        # Cached collections are bumped by put()/remove(); the others here
+        await content_cache.refresh(collection)
+    await cache_sync.record_write(collection)
+
+# ==================== HTTP CACHING ====================
+
+# Cache-Control policies for the public GET endpoints. Every response also
+# carries an ETag, so once max-age runs out clients revalidate cheaply.
+CACHE_CONTROL_CONTENT = "public, max-age=60, stale-while-revalidate=300"
+CACHE_CONTROL_CATALOG = "public, max-age=30, stale-while-revalidate=120"
+CACHE_CONTROL_COMMENTS = "public, no-cache"
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
         return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix, and the
+    # compression middleware's encoding suffix names the same resource version
+    candidates = [strip_etag_encoding(tag.strip().removeprefix("W/")) for tag in if_none_match.split(",")]
+    return etag in candidates
+
+def apply_cache_validators(request: Request, response: Response, etag: str, cache_control: str):
+    """Set ETag/Cache-Control, or answer 304 before the body is built"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+async def collection_etag(collection: str) -> str:
+    """ETag for list endpoints of uncached collections, from the shared version counter"""
+    doc = await db._cache_versions.find_one({"_id": collection})
+    return make_etag(collection, doc["version"] if doc else 0)
+
+# ==================== JSON RESPONSES ====================
+
+# Documents read back from MongoDB were written by this API through the
+# same models, so list endpoints send them straight to pydantic_core's JSON
+# serializer instead of revalidating every item against response_model
+# (which stays on the route for the OpenAPI schema). The projection limits
+# each document to the model's fields and defaults fill fields that older
+# documents lack.
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+@lru_cache(maxsize=None)
+def model_defaults(model: Type[BaseModel]) -> Dict[str, object]:
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+def json_response(response: Response, content: Union[bytes, list, dict], model: Optional[Type[BaseModel]] = None) -> Response:
+    """Serialize trusted data (or send pre-serialized bytes) with the headers set on ``response``"""
+    if model is not None:
+        defaults = model_defaults(model)
+        content = [{**defaults, **doc} for doc in content]
+    if not isinstance(content, bytes):
+        content = to_json(content)
+    headers = {key: value for key, value in response.headers.items() if key not in ("content-length", "content-type")}
+    return Response(content=content, media_type="application/json", headers=headers)
+
+# ==================== PAGINATION ====================
+
+# Page size when no limit is given, and the largest one accepted
+MAX_PAGE_SIZE = 1000
+
+def sort_value(doc: dict, field: str):
+    """Value of a possibly dotted ``field`` in ``doc``, None when missing"""
+    for key in field.split("."):
+        doc = doc.get(key) if isinstance(doc, dict) else None
+    return doc
+
+def encode_cursor(doc: dict, field: str = "created_at") -> str:
+    """Opaque keyset cursor pointing just after ``doc`` in (field, id) order"""
+    value = sort_value(doc, field)
+    is_datetime = isinstance(value, datetime)
+    raw = [value.isoformat() if is_datetime else value, is_datetime, doc["id"]]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        value, is_datetime, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if is_datetime:
+            value = datetime.fromisoformat(value)
+        return value, item_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def after_cursor(field: str, direction: int, value, item_id: str) -> List[dict]:
+    """Conditions ($or) selecting the documents that sort after (value, item_id)"""
+    op = "$lt" if direction < 0 else "$gt"
+    # MongoDB sorts missing/null values first, so they come last when descending
+    if value is None:
+        conditions = [{field: None, "id": {op: item_id}}]
+        if direction > 0:
+            conditions.append({field: {"$ne": None}})
+        return conditions
+    conditions = [{field: {op: value}}, {field: value, "id": {op: item_id}}]
+    if direction < 0:
+        conditions.append({field: None})
+    if field == "created_at" and isinstance(value, datetime):
+        # Until the timestamp migration finishes, ISO-string created_at
+        # values remain; MongoDB sorts strings after dates when descending
+        conditions.append({"created_at": {"$type": "string"}})
+    return conditions
+
+async def fetch_page(
+    collection,
+    query: dict,
+    limit: int,
+    cursor: Optional[str],
+    response: Response,
+    projection: Optional[dict] = None,
+    sort: Tuple[str, int] = ("created_at", DESCENDING)
+) -> List[dict]:
+    """Page of ``collection`` using keyset pagination on (sort field, id), newest first by default.
+
+    The cursor for the following page is returned in the ``X-Next-Cursor``
+    header, so the list response bodies stay unchanged.
+    """
+    field, direction = sort
+    if cursor:
+        value, item_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": after_cursor(field, direction, value, item_id)}]}
+    projection = projection or {"_id": 0}
+    # The sort value is needed for the cursor even when the caller does not want it
+    top_level = field.split(".")[0]
+    inclusive = any(value for key, value in projection.items() if key != "_id")
+    hidden = top_level if inclusive and top_level not in projection else None
+    if hidden:
+        projection = {**projection, field: 1}
+    docs = await collection.find(query, projection).sort(
+        [(field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], field)
+    if hidden:
+        for doc in docs:
+            doc.pop(hidden, None)
+    return docs
+
+# ==================== INDEXES ====================
+
+# Newest-first listing order used by keyset pagination
+CREATED_AT_DESC = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+def _id_index() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+# Text index over the folded search fields (see search.py); the language is
+# "none" because the text is already folded and Turkish has no stemmer
+SEARCH_TEXT_INDEX = IndexModel(
+    [("search.title", TEXT), ("search.body", TEXT)],
+    weights={"search.title": 5, "search.body": 1},
+    default_language="none",
+    name="search_text",
+)
+
+# Indexes ensured on every startup; create_indexes is a no-op for existing ones
+INDEXES = {
+    "admins": [_id_index(), IndexModel([("username", ASCENDING)], unique=True, name="username_unique")],
+    "appointments": [
+        _id_index(),
+        IndexModel(CREATED_AT_DESC, name="created_at"),
+        IndexModel([("status", ASCENDING)] + CREATED_AT_DESC, name="status_created_at"),
+        IndexModel([("service", ASCENDING)] + CREATED_AT_DESC, name="service_created_at"),
+        IndexModel([("date", ASCENDING), ("status", ASCENDING), ("service", ASCENDING)], name="date_status_service"),
+        IndexModel([("notification_pending", ASCENDING)], name="notification_pending", sparse=True),
+    ],
+    "blog_posts": [_id_index(), IndexModel(CREATED_AT_DESC, name="created_at"), SEARCH_TEXT_INDEX],
+    "services": [_id_index()],
+    "service_rating_stats": [_id_index()],
+    "features": [_id_index(), IndexModel([("order", ASCENDING)], name="order")],
+    "testimonials": [_id_index(), IndexModel([("order", ASCENDING)], name="order")],
+    "faqs": [_id_index(), IndexModel([("order", ASCENDING)], name="order")],
+    "contact_info": [_id_index()],
+    "cta_section": [_id_index()],
+    "products": [
+        _id_index(),
+        IndexModel(CREATED_AT_DESC, name="created_at"),
+        IndexModel([("category", ASCENDING), ("status", ASCENDING)] + CREATED_AT_DESC, name="category_status_created_at"),
+        IndexModel([("category", ASCENDING), ("status", ASCENDING), ("price", ASCENDING), ("id", ASCENDING)], name="category_status_price"),
+        IndexModel([("category", ASCENDING), ("status", ASCENDING), ("spec_filters.brand_key", ASCENDING)], name="category_status_brand"),
+        IndexModel(
+            [("category", ASCENDING), ("status", ASCENDING), ("spec_filters.year", DESCENDING), ("id", DESCENDING)],
+            name="category_status_year",
+        ),
+        IndexModel(
+            [("category", ASCENDING), ("status", ASCENDING), ("spec_filters.km", ASCENDING), ("id", ASCENDING)],
+            name="category_status_km",
+        ),
+        SEARCH_TEXT_INDEX,
+    ],
+    "uploads": [_id_index(), IndexModel([("ref_count", ASCENDING), ("uploaded_at", ASCENDING)], name="ref_count_uploaded_at")],
+    "notifications": [
+        _id_index(),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        # One notification per appointment, however often it is queued
+        IndexModel([("appointment_id", ASCENDING)], name="appointment_id_unique", unique=True, sparse=True),
+    ],
+    "comments": [
+        _id_index(),
+        IndexModel([("status", ASCENDING)] + CREATED_AT_DESC, name="status_created_at"),
+        IndexModel([("service_id", ASCENDING), ("status", ASCENDING)] + CREATED_AT_DESC, name="service_status_created_at"),
+    ],
+}
+
+async def ensure_indexes():
+    async def ensure(collection: str, models: List[IndexModel]):
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. duplicate ids in old data; keep serving and report it
+            logger.error(f"Could not create indexes on {collection}: {e}")
+
+    await asyncio.gather(*(ensure(collection, models) for collection, models in INDEXES.items()))
+    logger.info(f"Indexes ensured on {len(INDEXES)} collections")
+
+# ==================== LIST VIEWS ====================
+
+# Fields loaded for ?view=summary listings; full documents are only served
+# by the detail endpoints
+BLOG_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "author": 1, "image_url": 1,
+    "excerpt": 1, "created_at": 1, "updated_at": 1,
+}
+PRODUCT_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "category": 1, "title": 1, "excerpt": 1, "price": 1,
+    "currency": 1, "images": {"$slice": 1}, "image_variants": 1, "status": 1, "specs": 1, "created_at": 1,
+}
+
+def product_search_fields(product: dict) -> dict:
+    specs = product.get("specs") or {}
+    return search_fields(product.get("title"), [product.get("description"), *specs.values()])
+
+def blog_search_fields(post: dict) -> dict:
+    return search_fields(post.get("title"), [post.get("content")])
+
+# Folded spec keys admins use for the brand, model year and mileage of a
+# product; specs are free-form, so these are read into typed spec_filters
+SPEC_FILTER_KEYS = {
+    "brand": {"brand", "marka"},
+    "year": {"year", "yil", "model yili", "uretim yili"},
+    "km": {"km", "kilometre", "kilometer", "mileage"},
+}
+MIN_SPEC_YEAR = 1900
+MAX_SPEC_YEAR = 2100
+
+def product_spec_filters(specs: Optional[dict]) -> dict:
+    """Brand, year and km parsed from a product's specs, for filtering and facets"""
+    filters = {}
+    for key, value in (specs or {}).items():
+        name = next((name for name, keys in SPEC_FILTER_KEYS.items() if fold(key) in keys), None)
+        if name is None or name in filters or not str(value).strip():
+            continue
+        if name == "brand":
+            filters["brand"] = " ".join(str(value).split())
+            filters["brand_key"] = fold(value)
+            continue
+        # "12.000 km" -> 12000; dots and spaces group thousands in Turkish
+        digits = "".join(ch for ch in str(value) if ch.isdigit())
+        if not digits:
+            continue
+        number = int(digits)
+        if name == "year" and not MIN_SPEC_YEAR <= number <= MAX_SPEC_YEAR:
+            continue
+        filters[name] = number
+    return filters
+
+def summarize_product(product: dict) -> dict:
+    """Turn a document loaded with PRODUCT_SUMMARY_PROJECTION into a ProductSummary dict"""
+    images = product.pop('images', None)
+    variants = product.pop('image_variants', None) or {}
+    if images and "thumb" in variants.get(images[0], {}):
+        product['thumbnail'] = variants[images[0]]["thumb"]["url"]
+    else:
+        product['thumbnail'] = images[0] if images else None
+    return product
+
+async def backfill_field(collection: str, field: str, projection: dict, make_value) -> int:
+    """Set ``field`` to ``make_value(doc)`` on every document of ``collection`` without it.
+
+    Works in batches of BACKFILL_BATCH_SIZE, so memory and the size of each
+    bulk write stay bounded however large the collection is. Each update
+    still requires the field to be missing, so a value written concurrently
+    by the API is not overwritten. Returns how many documents were updated.
+    """
+    updated = 0
+    while True:
+        docs = await db[collection].find(
+            {field: {"$exists": False}}, {"_id": 1, **projection}
+        ).limit(BACKFILL_BATCH_SIZE).to_list(BACKFILL_BATCH_SIZE)
+        if not docs:
+            return updated
+        await db[collection].bulk_write([
+            UpdateOne({"_id": doc["_id"], field: {"$exists": False}}, {"$set": {field: make_value(doc)}})
+            for doc in docs
+        ], ordered=False)
+        updated += len(docs)
+
+async def backfill_excerpts():
+    """Store excerpts on blog posts and products written before they existed"""
+    for collection, source in (("blog_posts", "content"), ("products", "description")):
+        count = await backfill_field(
+            collection, "excerpt", {source: 1}, lambda doc, source=source: make_excerpt(doc.get(source, ""))
+        )
+        if count:
+            logger.info(f"Backfilled excerpts for {count} {collection}")
+
+async def backfill_spec_filters():
+    """Store spec_filters on products written before they existed"""
+    count = await backfill_field(
+        "products", "spec_filters", {"specs": 1}, lambda doc: product_spec_filters(doc.get("specs"))
+    )
+    if count:
+        logger.info(f"Backfilled spec filters for {count} products")
+
+async def backfill_search_fields():
+    """Store search fields on blog posts and products written before they existed"""
+    sources = (
+        ("blog_posts", {"title": 1, "content": 1}, blog_search_fields),
+        ("products", {"title": 1, "description": 1, "specs": 1}, product_search_fields),
+    )
+    for collection, projection, make_fields in sources:
+        count = await backfill_field(collection, "search", projection, make_fields)
+        if count:
+            logger.info(f"Backfilled search fields for {count} {collection}")
+
+# ==================== UPLOADS ====================
+
+uploads = UploadManager(
+    db.uploads,
+    upload_storage,
+    ALLOWED_IMAGE_TYPES,
+    MAX_UPLOAD_BYTES,
+    IMAGE_WORKERS,
+    orphan_grace=UPLOAD_ORPHAN_GRACE_SECONDS,
+    sweep_interval=UPLOAD_SWEEP_SECONDS,
+)
+
+# ==================== SEED MIGRATIONS ====================
+
+# Default content and one-off data fixes. Each step runs once per database
+# and is recorded in _migrations; bump its version to run it again. Steps
+# are idempotent (guarded inserts, upserts), so workers starting together
+# may both run one without duplicating data.
+
+DEFAULT_SERVICES = [
+    Service(name="AlienTech Yazılım", description="Motor performans optimizasyonu ve ECU yazılımı", icon="💻"),
+    Service(name="Bakım & Onarım", description="Periyodik bakım ve genel onarım hizmetleri", icon="🔧"),
+    Service(name="Çanta Montaj Projelendirme", description="TSE onaylı çanta sistemleri projelendirme ve montaj", icon="🧳"),
+    Service(name="Sigorta Hasar Takip", description="Kaza ve hasar durumlarında sigorta işlemleri takibi", icon="📋"),
+    Service(name="OTO-MOTO Alım Satım", description="Araç, motor ve ekipman alım satım hizmetleri", icon="🚗"),
+]
+
+DEFAULT_FEATURES = [
+    Feature(icon="👨‍🔧", title="10+ yıllık deneyim", description="Sektör uzmanı ekip", order=1),
+    Feature(icon="🇹🇷", title="Yerli üretim", description="Çözümlerimiz yerli ve milli", order=2),
+    Feature(icon="✅", title="6 ay garanti", description="Tüm hizmetlerde garanti", order=3),
+    Feature(icon="📞", title="7/24 destek", description="Danışmanlık desteği", order=4),
+]
+
+DEFAULT_TESTIMONIALS = [
+    Testimonial(name="Ahmet Y.", text="Profesyonel ekip, güvenilir hizmet!", rating=5, order=1),
+    Testimonial(name="Mehmet K.", text="Motosikletim adeta yeniden doğdu!", rating=5, order=2),
+    Testimonial(name="Burak D.", text="İlgileri ve iş kaliteleri mükemmel", rating=5, order=3),
+]
+
+DEFAULT_FAQS = [
+    FAQ(question="Hangi motosiklet markalarına hizmet veriyorsunuz?", answer="Tüm marka ve modellere hizmet veriyoruz.", order=1),
+    FAQ(question="İşlem süreleri ne kadar?", answer="İşleme göre değişmekle birlikte, 1-3 iş günü arasında tamamlıyoruz.", order=2),
+    FAQ(question="Garanti hizmetiniz var mı?", answer="Evet, tüm hizmetlerimiz için 6 ay garanti sunuyoruz.", order=3),
+    FAQ(question="Acil durumlarda ne yapmalıyım?", answer="7/24 WhatsApp hattımızdan bize ulaşabilirsiniz.", order=4),
+]
+
+DEFAULT_CONTACT_INFO = ContactInfo(
+    address="Hızırreis Sok. No:1A, Bayrampaşa / İstanbul",
+    phone="0532 683 26 03",
+    email="bdgaraj1@gmail.com",
+    whatsapp="+905326832603",
+    working_hours="Pazartesi - Cumartesi: 08:00 - 17:00",
+    emergency_phone="0532 683 26 03",
+    maps_url="https://maps.google.com/?q=Hızırreis+Sok.+No:1A+Bayrampaşa+Istanbul"
+)
+
+DEFAULT_CTA_SECTION = CTASection(
+    title="🚀 Hemen Randevu Alın!",
+    subtitle="%10 İndirimli İlk Servis",
+    button_text="Randevu Formunu Doldur"
+)
+
+async def seed_admin():
+    """Create the default admin, replacing the old "admin" account"""
+    if await db.admins.find_one({"username": "Burak5834"}, {"_id": 1}):
+        return
+    await db.admins.delete_many({"username": "admin"})
+    admin_token_cache.invalidate_user("admin")
+    default_admin = Admin(
+        username="Burak5834",
+        password_hash=await password_hasher.hash("Burak58811434")
+    )
+    doc = default_admin.model_dump()
+    await db.admins.update_one({"username": "Burak5834"}, {"$setOnInsert": doc}, upsert=True)
+    logger.info("Default admin created: username=Burak5834")
+
+async def seed_defaults(collection: str, key: str, defaults: List[BaseModel]):
+    """Insert default documents into an empty collection, upserting on ``key``"""
+    if await db[collection].count_documents({}, limit=1):
+        return
+    await db[collection].bulk_write([
+        UpdateOne({key: getattr(item, key)}, {"$setOnInsert": item.model_dump()}, upsert=True)
+        for item in defaults
+    ], ordered=False)
+    logger.info(f"{len(defaults)} default {collection} created")
+
+async def seed_singleton(collection: str, default: BaseModel):
+    await db[collection].update_one({"id": default.id}, {"$setOnInsert": default.model_dump()}, upsert=True)
+
+async def rename_old_services():
+    await db.services.bulk_write([
+        UpdateMany({"name": "Çanta Montajı"}, {"$set": {"name": "Çanta Montaj Projelendirme"}}),
+        UpdateMany({"name": "Sigorta Takibi"}, {"$set": {"name": "Sigorta Hasar Takip"}}),
+    ])
+
+async def rebuild_service_ratings():
+    """Recompute service_rating_stats from the approved comments.
+
+    The comment endpoints keep the totals up to date incrementally; this
+    fills them in for existing comments and repairs any drift.
+    """
+    rows = await db.comments.aggregate([
+        {"$match": {"status": "approved", "rating": {"$type": "number"}}},
+        {"$group": {"_id": {"service_id": "$service_id", "rating": "$rating"}, "count": {"$sum": 1}}},
+    ]).to_list(None)
+    stats = {}
+    for row in rows:
+        service_id, rating = row["_id"]["service_id"], int(row["_id"]["rating"])
+        entry = stats.setdefault(service_id, {"id": service_id, "count": 0, "sum": 0, "histogram": {}})
+        entry["count"] += row["count"]
+        entry["sum"] += rating * row["count"]
+        entry["histogram"][str(rating)] = row["count"]
+    await db.service_rating_stats.bulk_write(
+        [ReplaceOne({"id": service_id}, entry, upsert=True) for service_id, entry in stats.items()]
+        + [DeleteMany({"id": {"$nin": list(stats)}})]
+    )
+    logger.info(f"Rating stats rebuilt for {len(stats)} services")
+
+async def backfill_appointment_days():
+    """Count appointments booked before slot occupancy was tracked into appointment_days.
+
+    Each appointment is claimed by setting its ``reservation`` only while it
+    has none, and its slots are counted only by the worker whose claim
+    succeeded, so workers running this together or a rerun after a crash
+    never count an appointment twice. Existing double bookings are counted
+    as they are, so those slots show as full; appointments whose date or
+    time cannot be read reserve nothing.
+    """
+    durations = {
+        service["name"]: service.get("duration_minutes", APPOINTMENT_SLOT_MINUTES)
+        for service in await db.services.find({}, {"_id": 0, "name": 1, "duration_minutes": 1}).to_list(None)
+    }
+    claimed = counted = 0
+    cursor = db.appointments.find(
+        {"reservation": {"$exists": False}}, {"_id": 1, "date": 1, "time": 1, "service": 1, "status": 1}
+    )
+    async for doc in cursor:
+        reservation = None
+        parsed = parse_appointment_slot(doc.get("date"), doc.get("time"))
+        if parsed:
+            day, start = parsed
+            duration = durations.get(doc.get("service"), APPOINTMENT_SLOT_MINUTES)
+            reservation = {"day": day.isoformat(), "slots": covered_slots(start, duration, APPOINTMENT_SLOT_MINUTES)}
+        result = await db.appointments.update_one(
+            {"_id": doc["_id"], "reservation": {"$exists": False}}, {"$set": {"reservation": reservation}}
+        )
+        if result.modified_count != 1:
+            continue
+        claimed += 1
+        if reservation and doc.get("status") != "cancelled":
+            await db.appointment_days.update_one(
+                {"_id": reservation["day"]},
+                {"$inc": {f"slots.{slot}": 1 for slot in reservation["slots"]}},
+                upsert=True,
+            )
+            counted += 1
+    if claimed:
+        logger.info(f"Slot occupancy recorded for {claimed} appointments ({counted} active)")
+
+# name -> (version, step)
+SEED_MIGRATIONS = {
+    "default_admin": (1, seed_admin),
+    "default_services": (1, partial(seed_defaults, "services", "name", DEFAULT_SERVICES)),
+    "rename_old_services": (1, rename_old_services),
+    "default_features": (1, partial(seed_defaults, "features", "title", DEFAULT_FEATURES)),
+    "default_testimonials": (1, partial(seed_defaults, "testimonials", "name", DEFAULT_TESTIMONIALS)),
+    "default_faqs": (1, partial(seed_defaults, "faqs", "question", DEFAULT_FAQS)),
+    "default_contact_info": (1, partial(seed_singleton, "contact_info", DEFAULT_CONTACT_INFO)),
+    "default_cta_section": (1, partial(seed_singleton, "cta_section", DEFAULT_CTA_SECTION)),
+    "backfill_excerpts": (1, backfill_excerpts),
+    "backfill_search_fields": (1, backfill_search_fields),
+    "backfill_spec_filters": (1, backfill_spec_filters),
+    "service_rating_stats": (1, rebuild_service_ratings),
+    "appointment_days": (1, backfill_appointment_days),
+}
+
+async def run_seed_migrations():
+    """Run the seed steps this database has not applied yet, concurrently.
+
+    Once everything is applied, startup costs a single query on _migrations.
+    """
+    applied = {
+        doc["_id"]: doc.get("version", 0)
+        for doc in await db._migrations.find({}, {"version": 1}).to_list(None)
+    }
+    pending = [
+        (name, version, step)
+        for name, (version, step) in SEED_MIGRATIONS.items()
+        if applied.get(name, 0) < version
+    ]
+    if not pending:
+        return
+
+    async def run(name: str, version: int, step):
+        await step()
+        await db._migrations.update_one(
+            {"_id": name},
+            {"$set": {"version": version, "applied_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        logger.info(f"Seed migration {name} v{version} applied")
+
+    await asyncio.gather(*(run(*migration) for migration in pending))
+
+# ==================== TIMESTAMP MIGRATION ====================
+
+# Fields older versions wrote as ISO strings; they are BSON dates now
+TIMESTAMP_FIELDS = {
+    "admins": ["created_at"],
+    "appointments": ["created_at"],
+    "blog_posts": ["created_at", "updated_at"],
+    "products": ["created_at", "updated_at"],
+    "comments": ["created_at"],
+}
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class TimestampMigration:
+    """Converts ISO-string timestamps to BSON dates in the background.
+
+    Documents are selected with ``$type: "string"`` in batches, so the job
+    resumes where it stopped after a restart and workers running it at the
+    same time only repeat idempotent updates. Completion is recorded in
+    _migrations; until then read paths accept both representations.
+    """
+
+    NAME = "bson_timestamps"
+    VERSION = 1
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.converted = 0
+        self.skipped = 0
+        self.done = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        try:
+            await self.run()
+        except PyMongoError as e:
+            # Picked up again on the next startup
+            logger.error(f"Timestamp migration stopped: {e}")
+
+    async def run(self):
+        if await db._migrations.find_one({"_id": self.NAME, "version": {"$gte": self.VERSION}}):
+            self.done = True
+            return
+        for collection, fields in TIMESTAMP_FIELDS.items():
+            for field in fields:
+                await self._convert(collection, field)
+        await db._migrations.update_one(
+            {"_id": self.NAME},
+            {"$set": {"version": self.VERSION, "applied_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self.done = True
+        logger.info(f"Timestamp migration finished: {self.converted} converted, {self.skipped} unparseable")
+
+    async def _convert(self, collection: str, field: str):
+        unparseable = []
+        while True:
+            docs = await db[collection].find(
+                {field: {"$type": "string"}, "_id": {"$nin": unparseable}}, {"_id": 1, field: 1}
+            ).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return
+            updates = []
+            for doc in docs:
+                try:
+                    value = parse_timestamp(doc[field])
+                except ValueError:
+                    logger.warning(f"Leaving unparseable {collection}.{field} on {doc['_id']}: {doc[field]!r}")
+                    unparseable.append(doc["_id"])
+                    self.skipped += 1
+                    continue
+                # Matching the old value keeps a concurrent edit from being overwritten
+                updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+            if updates:
+                await db[collection].bulk_write(updates, ordered=False)
+                self.converted += len(updates)
+
+    def stats(self) -> dict:
+        return {"done": self.done, "converted": self.converted, "skipped": self.skipped}
+
+timestamp_migration = TimestampMigration(TIMESTAMP_MIGRATION_BATCH_SIZE)
 
 # ==================== INITIALIZATION ====================
 
@@ -338,125 +1523,42 @@ Randevu ID: {appointment.id}"""
 async def startup_db_client():
     """Initialize database with default admin and services"""
     # Create uploads directory if not exists
-    uploads_dir = Path("/app/backend/uploads")
-    uploads_dir.mkdir(exist_ok=True)
-    logger.info(f"Uploads directory: {uploads_dir}")
+    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    await upload_storage.setup()
+    logger.info(f"Upload storage: {UPLOAD_STORAGE}")
     
-    # Create default admin if not exists
-    admin_exists = await db.admins.find_one({"username": "Burak5834"})
-    if not admin_exists:
-        # Remove old admin if exists
-        await db.admins.delete_many({"username": "admin"})
-        
-        default_admin = Admin(
-            username="Burak5834",
-            password_hash=hash_password("Burak58811434")
-        )
-        doc = default_admin.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.admins.insert_one(doc)
-        logger.info("Default admin created: username=Burak5834")
-
-    # Create default services
-    services_count = await db.services.count_documents({})
-    if services_count == 0:
-        default_services = [
-            Service(name="AlienTech Yazılım", description="Motor performans optimizasyonu ve ECU yazılımı", icon="💻"),
-            Service(name="Bakım & Onarım", description="Periyodik bakım ve genel onarım hizmetleri", icon="🔧"),
-            Service(name="Çanta Montaj Projelendirme", description="TSE onaylı çanta sistemleri projelendirme ve montaj", icon="🧳"),
-            Service(name="Sigorta Hasar Takip", description="Kaza ve hasar durumlarında sigorta işlemleri takibi", icon="📋"),
-            Service(name="OTO-MOTO Alım Satım", description="Araç, motor ve ekipman alım satım hizmetleri", icon="🚗"),
-        ]
-        for service in default_services:
-            doc = service.model_dump()
-            await db.services.insert_one(doc)
-        logger.info(f"{len(default_services)} default services created")
-    
-    # Update old service names if they exist
-    await db.services.update_one(
-        {"name": "Çanta Montajı"},
-        {"$set": {"name": "Çanta Montaj Projelendirme"}}
-    )
-    await db.services.update_one(
-        {"name": "Sigorta Takibi"},
-        {"$set": {"name": "Sigorta Hasar Takip"}}
-    )
-    
-    # Create default features (Neden BD Garaj)
-    features_count = await db.features.count_documents({})
-    if features_count == 0:
-        default_features = [
-            Feature(icon="👨‍🔧", title="10+ yıllık deneyim", description="Sektör uzmanı ekip", order=1),
-            Feature(icon="🇹🇷", title="Yerli üretim", description="Çözümlerimiz yerli ve milli", order=2),
-            Feature(icon="✅", title="6 ay garanti", description="Tüm hizmetlerde garanti", order=3),
-            Feature(icon="📞", title="7/24 destek", description="Danışmanlık desteği", order=4),
-        ]
-        for feature in default_features:
-            await db.features.insert_one(feature.model_dump())
-        logger.info(f"{len(default_features)} default features created")
-    
-    # Create default testimonials
-    testimonials_count = await db.testimonials.count_documents({})
-    if testimonials_count == 0:
-        default_testimonials = [
-            Testimonial(name="Ahmet Y.", text="Profesyonel ekip, güvenilir hizmet!", rating=5, order=1),
-            Testimonial(name="Mehmet K.", text="Motosikletim adeta yeniden doğdu!", rating=5, order=2),
-            Testimonial(name="Burak D.", text="İlgileri ve iş kaliteleri mükemmel", rating=5, order=3),
-        ]
-        for testimonial in default_testimonials:
-            await db.testimonials.insert_one(testimonial.model_dump())
-        logger.info(f"{len(default_testimonials)} default testimonials created")
-    
-    # Create default FAQs
-    faqs_count = await db.faqs.count_documents({})
-    if faqs_count == 0:
-        default_faqs = [
-            FAQ(question="Hangi motosiklet markalarına hizmet veriyorsunuz?", answer="Tüm marka ve modellere hizmet veriyoruz.", order=1),
-            FAQ(question="İşlem süreleri ne kadar?", answer="İşleme göre değişmekle birlikte, 1-3 iş günü arasında tamamlıyoruz.", order=2),
-            FAQ(question="Garanti hizmetiniz var mı?", answer="Evet, tüm hizmetlerimiz için 6 ay garanti sunuyoruz.", order=3),
-            FAQ(question="Acil durumlarda ne yapmalıyım?", answer="7/24 WhatsApp hattımızdan bize ulaşabilirsiniz.", order=4),
-        ]
-        for faq in default_faqs:
-            await db.faqs.insert_one(faq.model_dump())
-        logger.info(f"{len(default_faqs)} default FAQs created")
-    
-    # Create default contact info
-    contact_exists = await db.contact_info.find_one({"id": "contact_info"})
-    if not contact_exists:
-        default_contact = ContactInfo(
-            address="Hızırreis Sok. No:1A, Bayrampaşa / İstanbul",
-            phone="0532 683 26 03",
-            email="bdgaraj1@gmail.com",
-            whatsapp="+905326832603",
-            working_hours="Pazartesi - Cumartesi: 08:00 - 17:00",
-            emergency_phone="0532 683 26 03",
-            maps_url="https://maps.google.com/?q=Hızırreis+Sok.+No:1A+Bayrampaşa+Istanbul"
-        )
-        await db.contact_info.insert_one(default_contact.model_dump())
-        logger.info("Default contact info created")
+    await ensure_indexes()
+    await run_seed_migrations()
+    timestamp_migration.start()
+
+    # Warm the content cache so public reads never hit the database
+    await cache_sync.prime()
+    await content_cache.reload()
+    cache_sync.start()
+    logger.info("Content cache loaded")
     
-    # Create default CTA section
-    cta_exists = await db.cta_section.find_one({"id": "cta_section"})
-    if not cta_exists:
-        default_cta = CTASection(
-            title="🚀 Hemen Randevu Alın!",
-            subtitle="%10 İndirimli İlk Servis",
-            button_text="Randevu Formunu Doldur"
-        )
-        await db.cta_section.insert_one(default_cta.model_dump())
-        logger.info("Default CTA section created")
+    notification_outbox.start()
+    uploads.start()
 
 # ==================== AUTH ENDPOINTS ====================
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(admin_login: AdminLogin):
     admin = await db.admins.find_one({"username": admin_login.username}, {"_id": 0})
-    if not admin or not verify_password(admin_login.password, admin['password_hash']):
+    if not admin or not await password_hasher.verify(admin_login.password, admin['password_hash']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
+    # Upgrade hashes made with an older cost factor while we have the password
+    if password_hasher.needs_rehash(admin['password_hash']):
+        new_hash = await password_hasher.hash(admin_login.password)
+        await db.admins.update_one({"username": admin['username']}, {"$set": {"password_hash": new_hash}})
+        admin_token_cache.invalidate_user(admin['username'])
+        password_hasher.rehashed += 1
+        logger.info(f"Password hash upgraded for {admin['username']}")
+    
     access_token = create_access_token(data={"sub": admin['username']})
     return TokenResponse(access_token=access_token)
 
@@ -473,43 +1575,260 @@ async def register_admin(admin_create: AdminCreate, current_admin: Admin = Depen
     
     new_admin = Admin(
         username=admin_create.username,
-        password_hash=hash_password(admin_create.password)
+        password_hash=await password_hasher.hash(admin_create.password)
     )
     doc = new_admin.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.admins.insert_one(doc)
     return new_admin
 
+# ==================== APPOINTMENT SLOTS ====================
+
+# Widest date range one availability request may cover
+MAX_AVAILABILITY_DAYS = 92
+
+def parse_appointment_slot(date_value: Optional[str], time_value: Optional[str]) -> Optional[tuple]:
+    """(date, start minute) of an appointment's "YYYY-MM-DD" and "HH:MM", None if unreadable"""
+    try:
+        day = datetime.strptime((date_value or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    start = parse_clock(time_value or "")
+    if start is None or start >= 24 * 60:
+        return None
+    return day, start
+
+async def working_hours() -> Dict[int, Tuple[int, int]]:
+    """Opening hours by weekday from the contact info, or the defaults if they cannot be read"""
+    contact = await content_cache.contact_info.get("contact_info")
+    hours = parse_working_hours(contact.working_hours if contact else "")
+    if not hours:
+        hours = parse_working_hours(DEFAULT_CONTACT_INFO.working_hours)
+    return hours
+
+async def service_duration(name: Optional[str]) -> int:
+    """Appointment length for a service by name; unknown services take one slot"""
+    for service in await content_cache.services.list():
+        if service.name == name:
+            return service.duration_minutes
+    return APPOINTMENT_SLOT_MINUTES
+
+def bookable_starts(day, hours: Dict[int, Tuple[int, int]], duration: int, now: datetime) -> List[int]:
+    """Start minutes on ``day`` that are open, in the future and within the booking window"""
+    today = now.date()
+    if not today <= day <= today + timedelta(days=APPOINTMENT_BOOKING_DAYS) or day.weekday() not in hours:
+        return []
+    starts = slot_starts(hours[day.weekday()], duration, APPOINTMENT_SLOT_MINUTES)
+    if day == today:
+        minute = now.hour * 60 + now.minute
+        starts = [start for start in starts if start > minute]
+    return starts
+
+async def reserve_slots(day: str, slots: List[int]) -> bool:
+    """Add one appointment to ``slots`` of ``day`` unless any of them is already full.
+
+    A single conditional upsert on the day's document, so concurrent
+    bookings cannot overfill a slot. When the day exists but a slot is full
+    the upsert collides with the existing _id; the same happens when two
+    first bookings of a day race, so that case is retried once.
+    """
+    for _ in range(2):
+        try:
+            await db.appointment_days.update_one(
+                {"_id": day, **{f"slots.{slot}": {"$not": {"$gte": APPOINTMENT_CAPACITY}} for slot in slots}},
+                {"$inc": {f"slots.{slot}": 1 for slot in slots}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            continue
+    return False
+
+async def release_slots(reservation: Optional[dict]):
+    if reservation and reservation.get("slots"):
+        await db.appointment_days.update_one(
+            {"_id": reservation["day"]},
+            {"$inc": {f"slots.{slot}": -1 for slot in reservation["slots"]}},
+        )
+
 # ==================== APPOINTMENT ENDPOINTS ====================
 
+@api_router.get("/appointments/availability", response_model=Availability)
+async def get_availability(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    service: Optional[str] = None
+):
+    """Bookable start times from ``from`` to ``to`` (YYYY-MM-DD, inclusive) for a service.
+
+    Each slot reports how many more appointments it can take (0 when
+    full); closed days, past times and days beyond the booking window have
+    no slots. Occupancy for the whole range comes from one query on the
+    per-day documents.
+    """
+    try:
+        first = datetime.strptime(start, "%Y-%m-%d").date()
+        last = datetime.strptime(end, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if last < first or (last - first).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be 1 to {MAX_AVAILABILITY_DAYS} days")
+
+    hours = await working_hours()
+    duration = await service_duration(service)
+    occupancy = {
+        doc["_id"]: doc.get("slots", {})
+        for doc in await db.appointment_days.find({"_id": {"$gte": first.isoformat(), "$lte": last.isoformat()}}).to_list(None)
+    }
+    now = datetime.now(SHOP_TIMEZONE)
+    days = []
+    for offset in range((last - first).days + 1):
+        day = first + timedelta(days=offset)
+        day_occupancy = occupancy.get(day.isoformat(), {})
+        days.append(AvailabilityDay(date=day.isoformat(), slots=[
+            AvailabilitySlot(
+                time=format_clock(slot_start),
+                remaining=remaining_capacity(
+                    day_occupancy, covered_slots(slot_start, duration, APPOINTMENT_SLOT_MINUTES), APPOINTMENT_CAPACITY
+                ),
+            )
+            for slot_start in bookable_starts(day, hours, duration, now)
+        ]))
+    return Availability(
+        duration_minutes=duration,
+        slot_minutes=APPOINTMENT_SLOT_MINUTES,
+        capacity=APPOINTMENT_CAPACITY,
+        days=days,
+    )
+
 @api_router.post("/appointments", response_model=Appointment)
 async def create_appointment(appointment_create: AppointmentCreate):
-    appointment = Appointment(**appointment_create.model_dump())
-    
+    parsed = parse_appointment_slot(appointment_create.date, appointment_create.time)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail="Date must be YYYY-MM-DD and time HH:MM")
+    day, start = parsed
+    duration = await service_duration(appointment_create.service)
+    if start not in bookable_starts(day, await working_hours(), duration, datetime.now(SHOP_TIMEZONE)):
+        raise HTTPException(status_code=400, detail="This time cannot be booked")
+    reservation = {"day": day.isoformat(), "slots": covered_slots(start, duration, APPOINTMENT_SLOT_MINUTES)}
+    if not await reserve_slots(reservation["day"], reservation["slots"]):
+        raise HTTPException(status_code=409, detail="This time is fully booked")
+
+    appointment = Appointment(
+        **{**appointment_create.model_dump(), "date": day.isoformat(), "time": format_clock(start)}
+    )
     doc = appointment.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.appointments.insert_one(doc)
+    doc["reservation"] = reservation
+    doc["notification_pending"] = True
+    try:
+        await db.appointments.insert_one(doc)
+    except PyMongoError:
+        await release_slots(reservation)
+        raise
     
-    # Send WhatsApp notification
-    await send_whatsapp_notification(appointment)
+    # Queue the WhatsApp notification; the outbox worker delivers it
+    await queue_appointment_notification(appointment)
     
     return appointment
 
+class AppointmentFilters:
+    """Query parameters shared by the admin appointment list and its stats.
+
+    date_from/date_to bound the appointment date (not when it was booked),
+    inclusive; dates are stored as YYYY-MM-DD, so they compare as strings.
+    """
+
+    def __init__(
+        self,
+        status: Optional[str] = Query(None, pattern="^(pending|confirmed|cancelled)$"),
+        service: Optional[str] = None,
+        date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+        date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+    ):
+        self.status = status
+        self.service = service
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def query(self, exclude: Tuple[str, ...] = ()) -> dict:
+        """Mongo filter for every set parameter except those named in ``exclude``"""
+        query = {}
+        if self.status and "status" not in exclude:
+            query["status"] = self.status
+        if self.service and "service" not in exclude:
+            query["service"] = self.service
+        date_range = {op: value for op, value in (("$gte", self.date_from), ("$lte", self.date_to)) if value}
+        if date_range:
+            query["date"] = date_range
+        return query
+
 @api_router.get("/appointments", response_model=List[Appointment])
-async def get_appointments(current_admin: Admin = Depends(get_current_admin)):
-    appointments = await db.appointments.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for apt in appointments:
-        if isinstance(apt['created_at'], str):
-            apt['created_at'] = datetime.fromisoformat(apt['created_at'])
-    return appointments
+async def get_appointments(
+    response: Response,
+    filters: AppointmentFilters = Depends(),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Appointments newest booking first, filtered by status, service and appointment date"""
+    appointments = await fetch_page(
+        db.appointments, filters.query(), limit, cursor, response, model_projection(Appointment)
+    )
+    return json_response(response, appointments, Appointment)
+
+@api_router.get("/appointments/stats", response_model=AppointmentStats)
+async def get_appointment_stats(
+    response: Response,
+    filters: AppointmentFilters = Depends(),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Appointment counts per status, appointment day and service in one aggregation.
+
+    by_status ignores the status filter and by_service the service filter, so
+    the admin can see the other tabs' and services' counts; total and by_day
+    apply every filter. The date range is matched once, on the index.
+    """
+    status_match = {"status": filters.status} if filters.status else {}
+    service_match = {"service": filters.service} if filters.service else {}
+    pipeline = [
+        {"$match": filters.query(exclude=("status", "service"))},
+        {"$facet": {
+            "by_status": [
+                {"$match": service_match},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ],
+            "by_day": [
+                {"$match": {**status_match, **service_match}},
+                {"$group": {"_id": "$date", "count": {"$sum": 1}}},
+                {"$sort": {"_id": ASCENDING}},
+            ],
+            "by_service": [
+                {"$match": status_match},
+                {"$group": {"_id": "$service", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+            ],
+        }},
+    ]
+    result = (await db.appointments.aggregate(pipeline).to_list(1))[0]
+    # Appointments stored without a status count as pending, like the model's default
+    by_status: Dict[str, int] = {}
+    for row in result["by_status"]:
+        key = row["_id"] or "pending"
+        by_status[key] = by_status.get(key, 0) + row["count"]
+    by_day = [{"date": row["_id"], "count": row["count"]} for row in result["by_day"] if row["_id"]]
+    by_service = [{"service": row["_id"], "count": row["count"]} for row in result["by_service"] if row["_id"]]
+    total = by_status.get(filters.status, 0) if filters.status else sum(by_status.values())
+    return json_response(response, {
+        "total": total,
+        "by_status": by_status,
+        "by_day": by_day,
+        "by_service": by_service,
+    })
 
 @api_router.get("/appointments/{appointment_id}", response_model=Appointment)
 async def get_appointment(appointment_id: str, current_admin: Admin = Depends(get_current_admin)):
     appointment = await db.appointments.find_one({"id": appointment_id}, {"_id": 0})
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
-    if isinstance(appointment['created_at'], str):
-        appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
     return Appointment(**appointment)
 
 @api_router.put("/appointments/{appointment_id}", response_model=Appointment)
@@ -524,41 +1843,70 @@ async def update_appointment(
     
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     if update_dict:
-        await db.appointments.update_one({"id": appointment_id}, {"$set": update_dict})
+        reservation = appointment.get("reservation")
+        was_active = appointment.get("status") != "cancelled"
+        is_active = update_dict.get("status", appointment.get("status")) != "cancelled"
+        # Re-activating a cancelled appointment needs its slots back first
+        if is_active and not was_active and reservation and reservation.get("slots"):
+            if not await reserve_slots(reservation["day"], reservation["slots"]):
+                raise HTTPException(status_code=409, detail="This time is fully booked")
+        # Conditional on the status we read, so a concurrent change cannot release twice
+        result = await db.appointments.update_one(
+            {"id": appointment_id, "status": appointment.get("status")}, {"$set": update_dict}
+        )
+        if result.matched_count == 0:
+            if is_active and not was_active:
+                await release_slots(reservation)
+            raise HTTPException(status_code=409, detail="Appointment was changed, please retry")
+        if was_active and not is_active:
+            await release_slots(reservation)
         appointment.update(update_dict)
     
-    if isinstance(appointment['created_at'], str):
-        appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
     return Appointment(**appointment)
 
 @api_router.delete("/appointments/{appointment_id}")
 async def delete_appointment(appointment_id: str, current_admin: Admin = Depends(get_current_admin)):
-    result = await db.appointments.delete_one({"id": appointment_id})
-    if result.deleted_count == 0:
+    appointment = await db.appointments.find_one_and_delete(
+        {"id": appointment_id}, {"_id": 0, "status": 1, "reservation": 1}
+    )
+    if appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
+    if appointment.get("status") != "cancelled":
+        await release_slots(appointment.get("reservation"))
     return {"message": "Appointment deleted successfully"}
 
 # ==================== BLOG ENDPOINTS ====================
 
-@api_router.get("/blog", response_model=List[BlogPost])
-async def get_blog_posts():
-    posts = await db.blog_posts.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for post in posts:
-        if isinstance(post['created_at'], str):
-            post['created_at'] = datetime.fromisoformat(post['created_at'])
-        if isinstance(post['updated_at'], str):
-            post['updated_at'] = datetime.fromisoformat(post['updated_at'])
-    return posts
+@api_router.get("/blog", response_model=Union[List[BlogPost], List[BlogPostSummary]])
+async def get_blog_posts(
+    request: Request,
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    """Get blog posts newest first; view=summary returns excerpts instead of content"""
+    apply_cache_validators(request, response, await collection_etag("blog_posts"), CACHE_CONTROL_CATALOG)
+    model = BlogPostSummary if view == "summary" else BlogPost
+    projection = BLOG_SUMMARY_PROJECTION if view == "summary" else model_projection(BlogPost)
+    posts = await fetch_page(db.blog_posts, {}, limit, cursor, response, projection)
+    return json_response(response, posts, model)
 
 @api_router.get("/blog/{post_id}", response_model=BlogPost)
-async def get_blog_post(post_id: str):
+async def get_blog_post(post_id: str, request: Request, response: Response):
+    if request.headers.get("if-none-match"):
+        # Revalidation: check the timestamp before loading the whole post
+        meta = await db.blog_posts.find_one({"id": post_id}, {"_id": 0, "updated_at": 1})
+        if meta:
+            apply_cache_validators(
+                request, response, make_etag("blog_posts", post_id, meta.get("updated_at")), CACHE_CONTROL_CATALOG
+            )
     post = await db.blog_posts.find_one({"id": post_id}, {"_id": 0})
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
-    if isinstance(post['created_at'], str):
-        post['created_at'] = datetime.fromisoformat(post['created_at'])
-    if isinstance(post['updated_at'], str):
-        post['updated_at'] = datetime.fromisoformat(post['updated_at'])
+    apply_cache_validators(
+        request, response, make_etag("blog_posts", post_id, post.get("updated_at")), CACHE_CONTROL_CATALOG
+    )
     return BlogPost(**post)
 
 @api_router.post("/blog", response_model=BlogPost)
@@ -568,9 +1916,10 @@ async def create_blog_post(
 ):
     blog_post = BlogPost(**post_create.model_dump())
     doc = blog_post.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['excerpt'] = make_excerpt(blog_post.content)
+    doc['search'] = blog_search_fields(doc)
     await db.blog_posts.insert_one(doc)
+    await notify_collection_changed("blog_posts")
     return blog_post
 
 @api_router.put("/blog/{post_id}", response_model=BlogPost)
@@ -585,14 +1934,15 @@ async def update_blog_post(
     
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     if update_dict:
-        update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+        update_dict['updated_at'] = datetime.now(timezone.utc)
+        if 'content' in update_dict:
+            update_dict['excerpt'] = make_excerpt(update_dict['content'])
+        if 'title' in update_dict or 'content' in update_dict:
+            update_dict['search'] = blog_search_fields({**post, **update_dict})
         await db.blog_posts.update_one({"id": post_id}, {"$set": update_dict})
+        await notify_collection_changed("blog_posts")
         post.update(update_dict)
     
-    if isinstance(post['created_at'], str):
-        post['created_at'] = datetime.fromisoformat(post['created_at'])
-    if isinstance(post['updated_at'], str):
-        post['updated_at'] = datetime.fromisoformat(post['updated_at'])
     return BlogPost(**post)
 
 @api_router.delete("/blog/{post_id}")
@@ -600,6 +1950,7 @@ async def delete_blog_post(post_id: str, current_admin: Admin = Depends(get_curr
     result = await db.blog_posts.delete_one({"id": post_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Blog post not found")
+    await notify_collection_changed("blog_posts")
     return {"message": "Blog post deleted successfully"}
 
 # ==================== SERVICES ENDPOINTS ====================
@@ -609,23 +1960,62 @@ class ServiceCreate(BaseModel):
     description: str
     icon: str
     image_url: Optional[str] = ""
+    duration_minutes: int = Field(default=60, ge=15, le=600)
 
 class ServiceUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     icon: Optional[str] = None
     image_url: Optional[str] = None
-
-@api_router.get("/services", response_model=List[Service])
-async def get_services():
-    services = await db.services.find({}, {"_id": 0}).to_list(1000)
-    return services
+    duration_minutes: Optional[int] = Field(default=None, ge=15, le=600)
+
+async def services_with_ratings() -> List[ServiceWithRating]:
+    ratings = {rating.id: rating for rating in await content_cache.service_ratings.list()}
+    return [
+        ServiceWithRating(**service.model_dump(), rating=ratings.get(service.id))
+        for service in await content_cache.services.list()
+    ]
+
+# (services and ratings cache versions, serialized /services payload, ETag) of the last build
+_services_payload: Optional[tuple] = None
+
+async def get_services_payload() -> tuple:
+    """Return the (payload, etag) pair for /services, rebuilding it if stale"""
+    global _services_payload
+    versions = (content_cache.services.version, content_cache.service_ratings.version)
+    if _services_payload is not None and _services_payload[0] == versions:
+        return _services_payload[1:]
+    payload = to_json(await services_with_ratings())
+    _services_payload = (versions, payload, make_etag("services", payload))
+    return _services_payload[1:]
+
+@api_router.get("/services", response_model=List[ServiceWithRating])
+async def get_services(request: Request, response: Response):
+    """All services, each with its rating totals (null until a rated comment is approved)"""
+    payload, etag = await get_services_payload()
+    apply_cache_validators(request, response, etag, CACHE_CONTROL_CONTENT)
+    return json_response(response, payload)
+
+@api_router.get("/services/{service_id}", response_model=ServiceWithRating)
+async def get_service(service_id: str, request: Request, response: Response):
+    service = await content_cache.services.get(service_id)
+    if service is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    rating = await content_cache.service_ratings.get(service_id)
+    payload = to_json(ServiceWithRating(**service.model_dump(), rating=rating))
+    apply_cache_validators(request, response, make_etag("services", service_id, payload), CACHE_CONTROL_CONTENT)
+    return json_response(response, payload)
 
 @api_router.post("/services", response_model=Service)
 async def create_service(service_create: ServiceCreate, current_admin: Admin = Depends(get_current_admin)):
-    service = Service(**service_create.model_dump())
+    if service_create.image_url:
+        await uploads.retain([service_create.image_url])
+    variants = await uploads.lookup_variants([service_create.image_url] if service_create.image_url else [])
+    service = Service(**service_create.model_dump(), image_variants=variants.get(service_create.image_url, {}))
     doc = service.model_dump()
     await db.services.insert_one(doc)
+    content_cache.services.put(service)
+    await notify_collection_changed("services")
     return service
 
 @api_router.put("/services/{service_id}", response_model=Service)
@@ -639,17 +2029,32 @@ async def update_service(
         raise HTTPException(status_code=404, detail="Service not found")
     
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
+    image_changed = 'image_url' in update_dict and update_dict['image_url'] != service.get('image_url')
+    if image_changed:
+        await uploads.retain([update_dict['image_url']])
+    if 'image_url' in update_dict:
+        variants = await uploads.lookup_variants([update_dict['image_url']])
+        update_dict['image_variants'] = variants.get(update_dict['image_url'], {})
     if update_dict:
         await db.services.update_one({"id": service_id}, {"$set": update_dict})
+        if image_changed:
+            await uploads.release([service.get('image_url') or ""])
         service.update(update_dict)
     
-    return Service(**service)
+    await notify_collection_changed("services")
+    return content_cache.services.put(Service(**service))
 
 @api_router.delete("/services/{service_id}")
 async def delete_service(service_id: str, current_admin: Admin = Depends(get_current_admin)):
-    result = await db.services.delete_one({"id": service_id})
-    if result.deleted_count == 0:
+    service = await db.services.find_one_and_delete({"id": service_id}, {"_id": 0, "image_url": 1})
+    if service is None:
         raise HTTPException(status_code=404, detail="Service not found")
+    await uploads.release([service.get("image_url") or ""])
+    content_cache.services.remove(service_id)
+    await notify_collection_changed("services")
+    if (await db.service_rating_stats.delete_one({"id": service_id})).deleted_count:
+        content_cache.service_ratings.remove(service_id)
+        await notify_collection_changed("service_rating_stats")
     return {"message": "Service deleted successfully"}
 
 @api_router.post("/upload/service-image")
@@ -658,46 +2063,25 @@ async def upload_service_image(
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Upload service image"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed.")
-    
-    # Validate file size (max 5MB)
-    file_size = 0
-    chunk_size = 1024 * 1024  # 1MB
-    temp_file = await file.read()
-    file_size = len(temp_file)
-    
-    if file_size > 5 * 1024 * 1024:  # 5MB
-        raise HTTPException(status_code=400, detail="File too large. Max 5MB allowed.")
-    
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = Path("/app/backend/uploads") / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(temp_file)
-    
-    # Return URL
-    file_url = f"/uploads/{unique_filename}"
-    logger.info(f"File uploaded: {file_url}")
-    
-    return {"url": file_url, "filename": unique_filename}
+    temp_path, digest = await uploads.receive(file)
+    upload = await uploads.ingest(temp_path, digest, file.content_type)
+    logger.info(f"File uploaded: {upload['url']}")
+    return upload_response(upload)
 
 # ==================== FEATURES ENDPOINTS (Neden BD Garaj) ====================
 
 @api_router.get("/features", response_model=List[Feature])
-async def get_features():
-    features = await db.features.find({}, {"_id": 0}).sort("order", 1).to_list(1000)
-    return features
+async def get_features(request: Request, response: Response):
+    await content_cache.features.list()
+    apply_cache_validators(request, response, content_cache.features.etag(), CACHE_CONTROL_CONTENT)
+    return json_response(response, content_cache.features.json())
 
 @api_router.post("/features", response_model=Feature)
 async def create_feature(feature_create: FeatureCreate, current_admin: Admin = Depends(get_current_admin)):
     feature = Feature(**feature_create.model_dump())
     await db.features.insert_one(feature.model_dump())
+    content_cache.features.put(feature)
+    await notify_collection_changed("features")
     return feature
 
 @api_router.put("/features/{feature_id}", response_model=Feature)
@@ -715,26 +2099,32 @@ async def update_feature(
         await db.features.update_one({"id": feature_id}, {"$set": update_dict})
         feature.update(update_dict)
     
-    return Feature(**feature)
+    await notify_collection_changed("features")
+    return content_cache.features.put(Feature(**feature))
 
 @api_router.delete("/features/{feature_id}")
 async def delete_feature(feature_id: str, current_admin: Admin = Depends(get_current_admin)):
     result = await db.features.delete_one({"id": feature_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Feature not found")
+    content_cache.features.remove(feature_id)
+    await notify_collection_changed("features")
     return {"message": "Feature deleted successfully"}
 
 # ==================== TESTIMONIALS ENDPOINTS (Müşteri Yorumları) ====================
 
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials():
-    testimonials = await db.testimonials.find({}, {"_id": 0}).sort("order", 1).to_list(1000)
-    return testimonials
+async def get_testimonials(request: Request, response: Response):
+    await content_cache.testimonials.list()
+    apply_cache_validators(request, response, content_cache.testimonials.etag(), CACHE_CONTROL_CONTENT)
+    return json_response(response, content_cache.testimonials.json())
 
 @api_router.post("/testimonials", response_model=Testimonial)
 async def create_testimonial(testimonial_create: TestimonialCreate, current_admin: Admin = Depends(get_current_admin)):
     testimonial = Testimonial(**testimonial_create.model_dump())
     await db.testimonials.insert_one(testimonial.model_dump())
+    content_cache.testimonials.put(testimonial)
+    await notify_collection_changed("testimonials")
     return testimonial
 
 @api_router.put("/testimonials/{testimonial_id}", response_model=Testimonial)
@@ -752,26 +2142,32 @@ async def update_testimonial(
         await db.testimonials.update_one({"id": testimonial_id}, {"$set": update_dict})
         testimonial.update(update_dict)
     
-    return Testimonial(**testimonial)
+    await notify_collection_changed("testimonials")
+    return content_cache.testimonials.put(Testimonial(**testimonial))
 
 @api_router.delete("/testimonials/{testimonial_id}")
 async def delete_testimonial(testimonial_id: str, current_admin: Admin = Depends(get_current_admin)):
     result = await db.testimonials.delete_one({"id": testimonial_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
+    content_cache.testimonials.remove(testimonial_id)
+    await notify_collection_changed("testimonials")
     return {"message": "Testimonial deleted successfully"}
 
 # ==================== FAQ ENDPOINTS (SSS) ====================
 
 @api_router.get("/faqs", response_model=List[FAQ])
-async def get_faqs():
-    faqs = await db.faqs.find({}, {"_id": 0}).sort("order", 1).to_list(1000)
-    return faqs
+async def get_faqs(request: Request, response: Response):
+    await content_cache.faqs.list()
+    apply_cache_validators(request, response, content_cache.faqs.etag(), CACHE_CONTROL_CONTENT)
+    return json_response(response, content_cache.faqs.json())
 
 @api_router.post("/faqs", response_model=FAQ)
 async def create_faq(faq_create: FAQCreate, current_admin: Admin = Depends(get_current_admin)):
     faq = FAQ(**faq_create.model_dump())
     await db.faqs.insert_one(faq.model_dump())
+    content_cache.faqs.put(faq)
+    await notify_collection_changed("faqs")
     return faq
 
 @api_router.put("/faqs/{faq_id}", response_model=FAQ)
@@ -789,23 +2185,27 @@ async def update_faq(
         await db.faqs.update_one({"id": faq_id}, {"$set": update_dict})
         faq.update(update_dict)
     
-    return FAQ(**faq)
+    await notify_collection_changed("faqs")
+    return content_cache.faqs.put(FAQ(**faq))
 
 @api_router.delete("/faqs/{faq_id}")
 async def delete_faq(faq_id: str, current_admin: Admin = Depends(get_current_admin)):
     result = await db.faqs.delete_one({"id": faq_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    content_cache.faqs.remove(faq_id)
+    await notify_collection_changed("faqs")
     return {"message": "FAQ deleted successfully"}
 
 # ==================== CONTACT INFO ENDPOINTS ====================
 
 @api_router.get("/contact-info", response_model=ContactInfo)
-async def get_contact_info():
-    contact = await db.contact_info.find_one({"id": "contact_info"}, {"_id": 0})
+async def get_contact_info(request: Request, response: Response):
+    contact = await content_cache.contact_info.get("contact_info")
     if not contact:
         raise HTTPException(status_code=404, detail="Contact info not found")
-    return ContactInfo(**contact)
+    apply_cache_validators(request, response, content_cache.contact_info.etag(), CACHE_CONTROL_CONTENT)
+    return contact
 
 @api_router.put("/contact-info", response_model=ContactInfo)
 async def update_contact_info(
@@ -821,16 +2221,18 @@ async def update_contact_info(
         await db.contact_info.update_one({"id": "contact_info"}, {"$set": update_dict})
         contact.update(update_dict)
     
-    return ContactInfo(**contact)
+    await notify_collection_changed("contact_info")
+    return content_cache.contact_info.put(ContactInfo(**contact))
 
 # ==================== CTA SECTION ENDPOINTS ====================
 
 @api_router.get("/cta-section", response_model=CTASection)
-async def get_cta_section():
-    cta = await db.cta_section.find_one({"id": "cta_section"}, {"_id": 0})
+async def get_cta_section(request: Request, response: Response):
+    cta = await content_cache.cta_section.get("cta_section")
     if not cta:
         raise HTTPException(status_code=404, detail="CTA section not found")
-    return CTASection(**cta)
+    apply_cache_validators(request, response, content_cache.cta_section.etag(), CACHE_CONTROL_CONTENT)
+    return cta
 
 @api_router.put("/cta-section", response_model=CTASection)
 async def update_cta_section(
@@ -846,36 +2248,215 @@ async def update_cta_section(
         await db.cta_section.update_one({"id": "cta_section"}, {"$set": update_dict})
         cta.update(update_dict)
     
-    return CTASection(**cta)
+    await notify_collection_changed("cta_section")
+    return content_cache.cta_section.put(CTASection(**cta))
+
+# ==================== HOMEPAGE BUNDLE ====================
+
+class HomeBundle(BaseModel):
+    services: List[ServiceWithRating] = []
+    features: List[Feature] = []
+    testimonials: List[Testimonial] = []
+    faqs: List[FAQ] = []
+    contact_info: Optional[ContactInfo] = None
+    cta_section: Optional[CTASection] = None
+
+# (cache versions, serialized /home payload, ETag) of the last build
+_home_bundle: Optional[tuple] = None
+
+async def get_home_bundle() -> tuple:
+    """Return the (payload, etag) pair for /home, rebuilding it if stale"""
+    global _home_bundle
+    versions = content_cache.versions()
+    if _home_bundle is not None and _home_bundle[0] == versions:
+        return _home_bundle[1:]
+    bundle = HomeBundle(
+        services=await services_with_ratings(),
+        features=await content_cache.features.list(),
+        testimonials=await content_cache.testimonials.list(),
+        faqs=await content_cache.faqs.list(),
+        contact_info=await content_cache.contact_info.get("contact_info"),
+        cta_section=await content_cache.cta_section.get("cta_section"),
+    )
+    payload = bundle.model_dump_json().encode('utf-8')
+    _home_bundle = (versions, payload, make_etag("home", payload))
+    return _home_bundle[1:]
+
+@api_router.get("/home", response_model=HomeBundle)
+async def get_home(request: Request, response: Response):
+    """All homepage sections in a single cached response"""
+    payload, etag = await get_home_bundle()
+    apply_cache_validators(request, response, etag, CACHE_CONTROL_CONTENT)
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL_CONTENT},
+    )
 
 # ==================== PRODUCTS ENDPOINTS (OTO-MOTO Alım Satım) ====================
 
-@api_router.get("/products", response_model=List[Product])
-async def get_products(category: Optional[str] = None, status: Optional[str] = None):
-    """Get all products, optionally filtered by category and status"""
-    query = {}
-    if category:
-        query["category"] = category
-    if status:
-        query["status"] = status
-    
-    products = await db.products.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for product in products:
-        if isinstance(product.get('created_at'), str):
-            product['created_at'] = datetime.fromisoformat(product['created_at'])
-        if isinstance(product.get('updated_at'), str):
-            product['updated_at'] = datetime.fromisoformat(product['updated_at'])
-    return products
+class ProductFilters:
+    """Query parameters shared by the product listing and its facets.
+
+    brand may be repeated and matches regardless of case and Turkish
+    letters; the ranges are inclusive and apply to spec_filters, so products
+    without a year or km are left out once a bound on it is given.
+    """
+
+    def __init__(
+        self,
+        category: Optional[str] = None,
+        status: Optional[str] = None,
+        min_price: Optional[float] = Query(None, ge=0),
+        max_price: Optional[float] = Query(None, ge=0),
+        brand: List[str] = Query([]),
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        km_min: Optional[int] = Query(None, ge=0),
+        km_max: Optional[int] = Query(None, ge=0)
+    ):
+        self.category = category
+        self.status = status
+        self.ranges = {
+            "price": ("price", min_price, max_price),
+            "year": ("spec_filters.year", year_min, year_max),
+            "km": ("spec_filters.km", km_min, km_max),
+        }
+        self.brand_keys = [key for key in (fold(value) for value in brand) if key]
+
+    def base_query(self) -> dict:
+        query = {}
+        if self.category:
+            query["category"] = self.category
+        if self.status:
+            query["status"] = self.status
+        return query
+
+    def query(self, exclude: Optional[str] = None) -> dict:
+        """MongoDB filter for every parameter except the ``exclude`` facet"""
+        query = self.base_query()
+        for name, (field, low, high) in self.ranges.items():
+            if name == exclude:
+                continue
+            bounds = {op: bound for op, bound in (("$gte", low), ("$lte", high)) if bound is not None}
+            if bounds:
+                query[field] = bounds
+        if self.brand_keys and exclude != "brand":
+            query["spec_filters.brand_key"] = {"$in": self.brand_keys}
+        return query
+
+# sort parameter -> (field, direction) for keyset pagination
+PRODUCT_SORTS = {
+    "newest": ("created_at", DESCENDING),
+    "price_asc": ("price", ASCENDING),
+    "price_desc": ("price", DESCENDING),
+    "year_desc": ("spec_filters.year", DESCENDING),
+    "km_asc": ("spec_filters.km", ASCENDING),
+}
+# Lower bounds of the year and km facet buckets; the last bucket is open-ended
+YEAR_BUCKETS = [MIN_SPEC_YEAR, 2000, 2010, 2015, 2020]
+KM_BUCKETS = [0, 10_000, 25_000, 50_000, 100_000]
+
+@api_router.get("/products", response_model=Union[List[Product], List[ProductSummary]])
+async def get_products(
+    request: Request,
+    response: Response,
+    filters: ProductFilters = Depends(),
+    sort: str = Query("newest", pattern="^(" + "|".join(PRODUCT_SORTS) + ")$"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    """Get products, newest first unless sorted otherwise, filtered by ProductFilters.
+
+    view=summary returns only the listing fields (see ProductSummary).
+    """
+    apply_cache_validators(request, response, await collection_etag("products"), CACHE_CONTROL_CATALOG)
+    query = filters.query()
+    sort_order = PRODUCT_SORTS[sort]
+
+    if view == "summary":
+        products = await fetch_page(db.products, query, limit, cursor, response, PRODUCT_SUMMARY_PROJECTION, sort_order)
+        return json_response(response, [summarize_product(product) for product in products], ProductSummary)
+    products = await fetch_page(db.products, query, limit, cursor, response, model_projection(Product), sort_order)
+    return json_response(response, products, Product)
+
+def range_buckets(field: str, lower_bounds: List[int]) -> dict:
+    return {
+        "$bucket": {
+            "groupBy": f"${field}",
+            "boundaries": lower_bounds + [2 ** 53],
+            "default": "other",
+            "output": {"count": {"$sum": 1}},
+        }
+    }
+
+def bucket_counts(rows: List[dict], lower_bounds: List[int]) -> List[dict]:
+    counts = {row["_id"]: row["count"] for row in rows}
+    return [
+        {"min": low, "max": high, "count": counts[low]}
+        for low, high in zip(lower_bounds, lower_bounds[1:] + [None])
+        if low in counts
+    ]
+
+@api_router.get("/products/facets", response_model=ProductFacets)
+async def get_product_facets(request: Request, response: Response, filters: ProductFilters = Depends()):
+    """Counts per brand, year bucket and km bucket plus the price range, in one aggregation.
+
+    Each facet applies every filter except its own, so the counts show what
+    choosing another brand or range would return.
+    """
+    apply_cache_validators(request, response, await collection_etag("products"), CACHE_CONTROL_CATALOG)
+    pipeline = [
+        {"$match": filters.base_query()},
+        {"$facet": {
+            "total": [{"$match": filters.query()}, {"$count": "count"}],
+            "brands": [
+                {"$match": {**filters.query(exclude="brand"), "spec_filters.brand_key": {"$exists": True}}},
+                {"$group": {
+                    "_id": "$spec_filters.brand_key",
+                    "value": {"$first": "$spec_filters.brand"},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+            ],
+            "years": [
+                {"$match": {**filters.query(exclude="year"), "spec_filters.year": {"$exists": True}}},
+                range_buckets("spec_filters.year", YEAR_BUCKETS),
+            ],
+            "km": [
+                {"$match": {**filters.query(exclude="km"), "spec_filters.km": {"$exists": True}}},
+                range_buckets("spec_filters.km", KM_BUCKETS),
+            ],
+            "price": [
+                {"$match": filters.query(exclude="price")},
+                {"$group": {"_id": None, "min": {"$min": "$price"}, "max": {"$max": "$price"}}},
+            ],
+        }},
+    ]
+    result = (await db.products.aggregate(pipeline).to_list(1))[0]
+    price = result["price"][0] if result["price"] else {}
+    return json_response(response, {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "brands": [{"value": row["value"], "count": row["count"]} for row in result["brands"]],
+        "years": bucket_counts(result["years"], YEAR_BUCKETS),
+        "km": bucket_counts(result["km"], KM_BUCKETS),
+        "price": {"min": price.get("min"), "max": price.get("max")},
+    })
 
 @api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request, response: Response):
+    if request.headers.get("if-none-match"):
+        # Revalidation: check the timestamps before loading the whole product
+        meta = await db.products.find_one({"id": product_id}, {"_id": 0, "created_at": 1, "updated_at": 1})
+        if meta:
+            version = meta.get("updated_at") or meta.get("created_at")
+            apply_cache_validators(request, response, make_etag("products", product_id, version), CACHE_CONTROL_CATALOG)
     product = await db.products.find_one({"id": product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(product.get('created_at'), str):
-        product['created_at'] = datetime.fromisoformat(product['created_at'])
-    if isinstance(product.get('updated_at'), str):
-        product['updated_at'] = datetime.fromisoformat(product['updated_at'])
+    version = product.get("updated_at") or product.get("created_at")
+    apply_cache_validators(request, response, make_etag("products", product_id, version), CACHE_CONTROL_CATALOG)
     return Product(**product)
 
 @api_router.post("/products", response_model=Product)
@@ -883,11 +2464,17 @@ async def create_product(
     product_create: ProductCreate,
     current_admin: Admin = Depends(get_current_admin)
 ):
-    product = Product(**product_create.model_dump())
+    await uploads.retain(product_create.images)
+    product = Product(
+        **product_create.model_dump(),
+        image_variants=await uploads.lookup_variants(product_create.images)
+    )
     doc = product.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['excerpt'] = make_excerpt(product.description)
+    doc['search'] = product_search_fields(doc)
+    doc['spec_filters'] = product_spec_filters(product.specs)
     await db.products.insert_one(doc)
+    await notify_collection_changed("products")
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product)
@@ -902,21 +2489,33 @@ async def update_product(
     
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     if update_dict:
-        update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+        update_dict['updated_at'] = datetime.now(timezone.utc)
+        if 'description' in update_dict:
+            update_dict['excerpt'] = make_excerpt(update_dict['description'])
+        if update_dict.keys() & {'title', 'description', 'specs'}:
+            update_dict['search'] = product_search_fields({**product, **update_dict})
+        if 'specs' in update_dict:
+            update_dict['spec_filters'] = product_spec_filters(update_dict['specs'])
+        if 'images' in update_dict:
+            # Retain before writing, so a swept image is refused, and before
+            # releasing, so images kept on the product never drop to zero
+            await uploads.retain(update_dict['images'])
+            update_dict['image_variants'] = await uploads.lookup_variants(update_dict['images'])
         await db.products.update_one({"id": product_id}, {"$set": update_dict})
+        if 'images' in update_dict:
+            await uploads.release(product.get('images', []))
+        await notify_collection_changed("products")
         product.update(update_dict)
     
-    if isinstance(product.get('created_at'), str):
-        product['created_at'] = datetime.fromisoformat(product['created_at'])
-    if isinstance(product.get('updated_at'), str):
-        product['updated_at'] = datetime.fromisoformat(product['updated_at'])
     return Product(**product)
 
 @api_router.delete("/products/{product_id}")
 async def delete_product(product_id: str, current_admin: Admin = Depends(get_current_admin)):
-    result = await db.products.delete_one({"id": product_id})
-    if result.deleted_count == 0:
+    product = await db.products.find_one_and_delete({"id": product_id}, {"_id": 0, "images": 1})
+    if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    await uploads.release(product.get("images", []))
+    await notify_collection_changed("products")
     return {"message": "Product deleted successfully"}
 
 @api_router.post("/upload/product-image")
@@ -925,38 +2524,242 @@ async def upload_product_image(
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Upload product image"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif"]
-    if file.content_type not in allowed_types:
+    temp_path, digest = await uploads.receive(file)
+    upload = await uploads.ingest(temp_path, digest, file.content_type)
+    logger.info(f"Product image uploaded: {upload['url']}")
+    return upload_response(upload)
+
+@api_router.post("/upload/presign")
+async def presign_direct_upload(
+    upload_request: DirectUploadRequest,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Presigned POST for sending an image straight to the storage bucket"""
+    if not isinstance(upload_storage, DirectUploadStorage):
+        raise HTTPException(status_code=400, detail="Direct uploads are not enabled")
+    if upload_request.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed.")
-    
-    # Validate file size (max 5MB)
-    temp_file = await file.read()
-    file_size = len(temp_file)
-    
-    if file_size > 5 * 1024 * 1024:  # 5MB
+    upload_id = str(uuid.uuid4())
+    presigned = upload_storage.presign_upload(
+        upload_id, upload_request.content_type, MAX_UPLOAD_BYTES
+    )
+    return {"upload_id": upload_id, "url": presigned["url"], "fields": presigned["fields"]}
+
+@api_router.post("/upload/complete")
+async def complete_direct_upload(
+    upload_complete: DirectUploadComplete,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Turn a finished direct upload into a stored image with variants"""
+    if not isinstance(upload_storage, DirectUploadStorage):
+        raise HTTPException(status_code=400, detail="Direct uploads are not enabled")
+    try:
+        upload_id = str(uuid.UUID(upload_complete.upload_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid upload id")
+    temp_path = uploads.temp_path()
+    loop = asyncio.get_running_loop()
+    try:
+        content_type = await upload_storage.download(upload_id, temp_path, MAX_UPLOAD_BYTES)
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed.")
+        digest = await loop.run_in_executor(None, sha256_file, temp_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError:
         raise HTTPException(status_code=400, detail="File too large. Max 5MB allowed.")
-    
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = Path("/app/backend/uploads") / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(temp_file)
-    
-    # Return URL
-    file_url = f"/uploads/{unique_filename}"
-    logger.info(f"Product image uploaded: {file_url}")
-    
-    return {"url": file_url, "filename": unique_filename}
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    upload = await uploads.ingest(temp_path, digest, content_type)
+    logger.info(f"Direct upload stored: {upload['url']}")
+    return upload_response(upload)
+
+# ==================== SEARCH ====================
+
+# Deepest result offset a search cursor can reach; relevance ranking has to
+# look at every hit up to the requested page, so paging is kept shallow
+MAX_SEARCH_RESULTS = 200
+
+class MemorySearch:
+    """SEARCH_MODE=memory: an InvertedIndex of every product and blog post.
+
+    Rebuilt on the first search after either collection changes, in this
+    worker or (through the cache sync) in another one.
+    """
+
+    def __init__(self):
+        self.index: Optional[InvertedIndex] = None
+        self.versions: Optional[tuple] = None
+        self.rebuilds = 0
+        self._lock = asyncio.Lock()
+
+    def _current_versions(self) -> tuple:
+        return content_cache.version("products"), content_cache.version("blog_posts")
+
+    async def get_index(self) -> InvertedIndex:
+        if self.index is None or self.versions != self._current_versions():
+            async with self._lock:
+                versions = self._current_versions()
+                if self.index is None or self.versions != versions:
+                    self.index = await self._build()
+                    self.versions = versions
+                    self.rebuilds += 1
+        return self.index
+
+    async def _build(self) -> InvertedIndex:
+        products, posts = await asyncio.gather(
+            db.products.find({}, {**PRODUCT_SUMMARY_PROJECTION, "search": 1}).to_list(None),
+            db.blog_posts.find({}, {**BLOG_SUMMARY_PROJECTION, "search": 1}).to_list(None),
+        )
+        index = InvertedIndex()
+        for product in products:
+            fields = product.pop("search", None) or product_search_fields(product)
+            item = {**model_defaults(ProductSummary), **summarize_product(product)}
+            index.add({"type": "product", "item": item}, fields)
+        for post in posts:
+            fields = post.pop("search", None) or blog_search_fields(post)
+            index.add({"type": "blog", "item": {**model_defaults(BlogPostSummary), **post}}, fields)
+        logger.info(f"Search index built: {len(products)} products, {len(posts)} blog posts")
+        return index
+
+    async def search(self, terms: str, kind: Optional[str], product_query: dict) -> List[dict]:
+        def predicate(document: dict) -> bool:
+            if kind and document["type"] != kind:
+                return False
+            if document["type"] == "product":
+                return all(document["item"].get(key) == value for key, value in product_query.items())
+            return True
+
+        index = await self.get_index()
+        return [
+            {"type": document["type"], "score": score, "item": document["item"]}
+            for score, document in index.search(terms, predicate)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "mode": SEARCH_MODE,
+            "documents": len(self.index) if self.index is not None else 0,
+            "rebuilds": self.rebuilds,
+        }
+
+memory_search = MemorySearch()
+
+async def text_search(collection, query: dict, terms: str, projection: dict, limit: int) -> List[dict]:
+    """Best ``limit`` documents of ``collection`` for ``terms`` by textScore"""
+    return await collection.find(
+        {**query, "$text": {"$search": terms}},
+        {**projection, "score": {"$meta": "textScore"}},
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+
+async def mongo_search(terms: str, kind: Optional[str], product_query: dict, limit: int) -> List[dict]:
+    searches = []
+    if kind in (None, "product"):
+        searches.append(("product", text_search(db.products, product_query, terms, PRODUCT_SUMMARY_PROJECTION, limit)))
+    if kind in (None, "blog"):
+        searches.append(("blog", text_search(db.blog_posts, {}, terms, BLOG_SUMMARY_PROJECTION, limit)))
+    results = await asyncio.gather(*(search for _, search in searches))
+    hits = []
+    for (hit_type, _), docs in zip(searches, results):
+        model = ProductSummary if hit_type == "product" else BlogPostSummary
+        for doc in docs:
+            score = round(doc.pop("score"), 4)
+            if hit_type == "product":
+                doc = summarize_product(doc)
+            hits.append({"type": hit_type, "score": score, "item": {**model_defaults(model), **doc}})
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits
+
+@api_router.get("/search", response_model=List[SearchHit])
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[str] = Query(None, alias="type", pattern="^(product|blog)$"),
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None
+):
+    """Products and blog posts matching ``q``, most relevant first.
+
+    Any word of the query matches, with title matches ranked above body
+    matches; Turkish letters and case are ignored ("parca" finds "Parça").
+    type narrows the hits to products or blog posts and category/status
+    filter the products. The cursor for the next page is returned in the
+    X-Next-Cursor header, as for the list endpoints.
+    """
+    terms = fold(q)
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not 0 <= offset < MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    versions = await asyncio.gather(collection_etag("products"), collection_etag("blog_posts"))
+    etag = make_etag("search", *versions, SEARCH_MODE, terms, kind, category, status, limit, offset)
+    apply_cache_validators(request, response, etag, CACHE_CONTROL_CATALOG)
+    if not terms:
+        return json_response(response, [])
+
+    product_query = {key: value for key, value in (("category", category), ("status", status)) if value}
+    if SEARCH_MODE == "memory":
+        hits = await memory_search.search(terms, kind, product_query)
+    else:
+        hits = await mongo_search(terms, kind, product_query, offset + limit + 1)
+    end = offset + limit
+    if len(hits) > end and end < MAX_SEARCH_RESULTS:
+        response.headers["X-Next-Cursor"] = str(end)
+    return json_response(response, hits[offset:end])
+
+@api_router.get("/search/stats")
+async def get_search_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Search mode and in-memory index size (admin only)"""
+    return memory_search.stats()
 
 # ==================== COMMENTS API ====================
 
+# Only approved comments count towards a service's rating. Each handler
+# learns the comment's previous state from the same atomic write that
+# changes it, so concurrent moderation cannot count a comment twice.
+
+async def adjust_service_rating(comment: dict, delta: int):
+    """Add (delta=1) or remove (delta=-1) one approved comment from its service's totals"""
+    rating = comment.get("rating")
+    if rating is None:
+        return
+    doc = await db.service_rating_stats.find_one_and_update(
+        {"id": comment["service_id"]},
+        {"$inc": {"count": delta, "sum": delta * rating, f"histogram.{rating}": delta}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    content_cache.service_ratings.put(ServiceRating(**doc))
+    await notify_collection_changed("service_rating_stats")
+
+async def update_service_rating(before: Optional[dict], after: Optional[dict]):
+    """Apply a comment's change from ``before`` to ``after`` (None: absent) to the rating totals"""
+    was_approved = before is not None and before.get("status") == "approved"
+    is_approved = after is not None and after.get("status") == "approved"
+    if was_approved and not is_approved:
+        await adjust_service_rating(before, -1)
+    elif is_approved and not was_approved:
+        await adjust_service_rating(after, 1)
+
 @api_router.get("/comments", response_model=List[Comment])
-async def get_comments(service_id: Optional[str] = None, status: Optional[str] = None):
+async def get_comments(
+    request: Request,
+    response: Response,
+    service_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """Get comments (public - only approved, or admin - all)"""
+    apply_cache_validators(request, response, await collection_etag("comments"), CACHE_CONTROL_COMMENTS)
     query = {}
     
     if service_id:
@@ -968,13 +2771,16 @@ async def get_comments(service_id: Optional[str] = None, status: Optional[str] =
     else:
         query["status"] = "approved"  # Public only sees approved comments
     
-    comments = await db.comments.find(query, {"_id": 0}).sort("created_at", -1).to_list(length=None)
-    return [Comment(**comment) for comment in comments]
+    comments = await fetch_page(db.comments, query, limit, cursor, response, model_projection(Comment))
+    return json_response(response, comments, Comment)
 
 @api_router.get("/comments/all", response_model=List[Comment])
 async def get_all_comments(
-    service_id: Optional[str] = None, 
+    response: Response,
+    service_id: Optional[str] = None,
     status: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Get all comments (admin only - includes pending and rejected)"""
@@ -986,19 +2792,22 @@ async def get_all_comments(
     if status:
         query["status"] = status
     
-    comments = await db.comments.find(query, {"_id": 0}).sort("created_at", -1).to_list(length=None)
-    return [Comment(**comment) for comment in comments]
+    comments = await fetch_page(db.comments, query, limit, cursor, response, model_projection(Comment))
+    return json_response(response, comments, Comment)
 
 @api_router.post("/comments", response_model=Comment)
 async def create_comment(comment: CommentCreate):
     """Create a new comment (public - starts as pending)"""
     # Verify service exists
-    service = await db.services.find_one({"id": comment.service_id}, {"_id": 0})
+    service = await content_cache.services.get(comment.service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     
     new_comment = Comment(**comment.model_dump(), status="pending")
     await db.comments.insert_one(new_comment.model_dump())
+    await notify_collection_changed("comments")
+    # No-op while new comments start out pending; keeps the totals right if they ever don't
+    await update_service_rating(None, new_comment.model_dump())
     
     logger.info(f"New comment created for service {comment.service_id} by {comment.user_name}")
     return new_comment
@@ -1013,26 +2822,97 @@ async def update_comment_status(
     if update.status not in ["approved", "rejected", "pending"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    result = await db.comments.update_one(
+    previous = await db.comments.find_one_and_update(
         {"id": comment_id},
-        {"$set": {"status": update.status}}
+        {"$set": {"status": update.status}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
     )
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Comment not found")
+    await notify_collection_changed("comments")
+    updated_comment = {**previous, "status": update.status}
+    await update_service_rating(previous, updated_comment)
     
-    updated_comment = await db.comments.find_one({"id": comment_id}, {"_id": 0})
     logger.info(f"Comment {comment_id} status updated to {update.status}")
     return Comment(**updated_comment)
 
 @api_router.delete("/comments/{comment_id}")
 async def delete_comment(comment_id: str, current_admin: Admin = Depends(get_current_admin)):
     """Delete a comment (admin only)"""
-    result = await db.comments.delete_one({"id": comment_id})
-    if result.deleted_count == 0:
+    comment = await db.comments.find_one_and_delete(
+        {"id": comment_id}, {"_id": 0, "service_id": 1, "rating": 1, "status": 1}
+    )
+    if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
+    await notify_collection_changed("comments")
+    await update_service_rating(comment, None)
     return {"message": "Comment deleted successfully"}
 
+# ==================== DIAGNOSTICS (admin) ====================
+
+@api_router.get("/cache/stats")
+async def get_cache_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Content cache versions, hit/miss counters and sync status (admin only)"""
+    return {**content_cache.stats(), "sync": cache_sync.stats(), "compression": compressed_body_cache.stats()}
+
+@api_router.post("/services/ratings/rebuild")
+async def rebuild_ratings(current_admin: Admin = Depends(get_current_admin)):
+    """Recompute every service's rating totals from the approved comments (admin only)"""
+    await rebuild_service_ratings()
+    await content_cache.service_ratings.reload()
+    await notify_collection_changed("service_rating_stats")
+    return {"message": "Rating stats rebuilt", "services": len(await content_cache.service_ratings.list())}
+
+@api_router.post("/cache/reload")
+async def reload_cache(current_admin: Admin = Depends(get_current_admin)):
+    """Force a reload of the content cache from the database (admin only)"""
+    await content_cache.reload()
+    return {"message": "Content cache reloaded", "stats": content_cache.stats()}
+
+@api_router.get("/auth/token-cache/stats")
+async def get_token_cache_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Verified-token cache counters (admin only)"""
+    return admin_token_cache.stats()
+
+@api_router.get("/auth/hashing/stats")
+async def get_hashing_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Password hashing pool usage (admin only)"""
+    return password_hasher.stats()
+
+@api_router.get("/notifications/stats")
+async def get_notification_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Notification outbox counters and queue sizes by status (admin only)"""
+    return await notification_outbox.stats()
+
+@api_router.get("/migrations/stats")
+async def get_migration_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Applied seed migrations and background timestamp migration progress (admin only)"""
+    applied = await db._migrations.find({}).to_list(None)
+    return {
+        "applied": {doc["_id"]: doc.get("version") for doc in applied},
+        "timestamps": timestamp_migration.stats(),
+    }
+
+@api_router.get("/uploads/stats")
+async def get_uploads_serving_stats(current_admin: Admin = Depends(get_current_admin)):
+    """/uploads response counters and memory cache usage (admin only)"""
+    return uploads_files.stats()
+
+@api_router.get("/indexes/stats")
+async def get_index_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Per-index usage counters from $indexStats (admin only)"""
+    async def collection_stats(collection: str):
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        return [
+            {"name": stat["name"], "key": stat["key"], "ops": stat["accesses"]["ops"], "since": stat["accesses"]["since"]}
+            for stat in stats
+        ]
+
+    results = await asyncio.gather(*(collection_stats(collection) for collection in INDEXES))
+    return dict(zip(INDEXES, results))
+
 # ==================== HEALTH CHECK ====================
 
 @api_router.get("/")
@@ -1043,7 +2923,27 @@ async def root():
 app.include_router(api_router)
 
 # Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="/app/backend/uploads"), name="uploads")
+uploads_files = UploadsFileServer(
+    UPLOADS_DIR,
+    cache_bytes=UPLOADS_MEMORY_CACHE_BYTES,
+    cache_max_file_bytes=UPLOADS_MEMORY_CACHE_MAX_FILE_BYTES,
+)
+
+# With S3 storage the bucket (or a CDN in front of it) serves the files
+if isinstance(upload_storage, LocalStorage):
+    app.mount("/uploads", uploads_files, name="uploads")
+
+# Oversized image uploads are refused before Starlette reads the multipart body
+app.add_middleware(UploadSizeLimit, path_prefix="/api/upload/", max_bytes=MAX_UPLOAD_BYTES)
+
+compressed_body_cache = CompressedBodyCache(COMPRESSION_CACHE_BYTES)
+# /uploads serves images (already compressed) and precompressed siblings itself
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    excluded_paths=("/uploads",),
+    cache=compressed_body_cache,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1051,6 +2951,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -1062,4 +2963,10 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await cache_sync.stop()
+    await notification_outbox.stop()
+    await timestamp_migration.stop()
+    password_hasher.shutdown()
+    await uploads.stop()
+    uploads.shutdown()
     client.close()
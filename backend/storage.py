@@ -0,0 +1,208 @@
+"""Where uploaded images live: local disk or an S3-compatible bucket.
+
+Both backends store objects under the same keys (``<sha256>.<ext>`` plus the
+``<sha256>_<size>.<ext>`` variants) and expose them below an ``/uploads/``
+URL path, so records and URLs stay valid whichever backend wrote them.
+
+``UploadStorage`` is what every backend provides. Backends that can also
+hand out presigned uploads, so browsers send files straight to them,
+implement ``DirectUploadStorage`` as well; check for it with ``isinstance``.
+"""
+import asyncio
+import os
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Protocol, runtime_checkable
+
+PRESIGNED_UPLOAD_EXPIRES = 15 * 60
+# Direct uploads wait here, outside the public uploads/ prefix, until they are completed
+S3_INCOMING_PREFIX = "incoming/"
+
+
+async def _in_thread(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args, **kwargs))
+
+
+class UploadStorage(Protocol):
+    """A place to keep uploaded files under their keys"""
+
+    def temp_dir(self) -> Path:
+        """Local directory for files being prepared for ``save``"""
+
+    async def setup(self):
+        """Create whatever the backend needs before the first upload"""
+
+    def public_url(self, key: str) -> str:
+        """URL clients fetch the file under ``key`` from"""
+
+    async def save(self, key: str, source: Path, content_type: str):
+        """Store a finished local file under ``key`` (consumes ``source``)"""
+
+    async def delete(self, keys: List[str]):
+        """Delete the files under ``keys``; missing ones are ignored"""
+
+
+@runtime_checkable
+class DirectUploadStorage(UploadStorage, Protocol):
+    """Storage that browsers can upload to directly with a presigned request"""
+
+    def presign_upload(self, upload_id: str, content_type: str, max_bytes: int) -> dict:
+        """Presigned POST (``url`` and form ``fields``) for one file up to ``max_bytes``"""
+
+    async def download(self, upload_id: str, destination: Path, max_bytes: int) -> str:
+        """Move a direct upload to a local file and return its content type"""
+
+    async def delete_stale_uploads(self, older_than: datetime) -> int:
+        """Delete direct uploads started before ``older_than`` and never completed"""
+
+
+class LocalStorage:
+    """Uploads kept in a directory that the API serves itself at /uploads"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def temp_dir(self) -> Path:
+        # Same filesystem as the final files, so save() can rename atomically
+        return self.directory / ".tmp"
+
+    async def setup(self):
+        await _in_thread(self.temp_dir().mkdir, parents=True, exist_ok=True)
+
+    def public_url(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+    async def save(self, key: str, source: Path, content_type: str):
+        """Move a finished local file into storage (consumes ``source``)"""
+        await _in_thread(os.replace, source, self.directory / key)
+
+    async def delete(self, keys: List[str]):
+        for key in keys:
+            await _in_thread((self.directory / key).unlink, missing_ok=True)
+
+
+class S3Storage:
+    """Uploads kept in an S3-compatible bucket (AWS S3, MinIO, moto server).
+
+    ``endpoint_url`` points boto3 at a non-AWS implementation, which is how
+    this is exercised locally against MinIO or ``moto_server``. Objects are
+    written under ``uploads/`` and served from ``public_url`` (a CDN or the
+    bucket's own URL), never through the API. Direct uploads land under
+    ``incoming/``, which must not be publicly readable; the ones never
+    completed are removed by ``delete_stale_uploads`` (or a lifecycle rule
+    on that prefix).
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        temp_directory: Path,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        public_url: Optional[str] = None,
+    ):
+        import boto3
+
+        self.bucket = bucket
+        self._temp_directory = temp_directory
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        if public_url is None:
+            base = endpoint_url or f"https://{bucket}.s3.amazonaws.com"
+            public_url = f"{base}/{bucket}" if endpoint_url else base
+        self.public_base = public_url.rstrip("/")
+
+    def temp_dir(self) -> Path:
+        return self._temp_directory
+
+    async def setup(self):
+        await _in_thread(self.temp_dir().mkdir, parents=True, exist_ok=True)
+
+    @staticmethod
+    def _object_key(key: str) -> str:
+        return f"uploads/{key}"
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base}/{self._object_key(key)}"
+
+    async def save(self, key: str, source: Path, content_type: str):
+        """Upload a finished local file and remove it.
+
+        Uploads are capped well below S3's 5 MiB minimum part size, so every
+        file goes up in a single request; boto3's transfer defaults only
+        switch to multipart above 8 MB.
+        """
+        await _in_thread(
+            self.client.upload_file,
+            str(source),
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs={
+                "ContentType": content_type,
+                "CacheControl": "public, max-age=31536000, immutable",
+            },
+        )
+        await _in_thread(source.unlink, missing_ok=True)
+
+    async def delete(self, keys: List[str]):
+        await self._delete_objects([self._object_key(key) for key in keys])
+
+    async def _delete_objects(self, object_keys: List[str]):
+        if object_keys:
+            await _in_thread(
+                self.client.delete_objects,
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in object_keys], "Quiet": True},
+            )
+
+    async def download(self, upload_id: str, destination: Path, max_bytes: int) -> str:
+        """Copy a directly uploaded object to a local file, delete it from the bucket
+        and return its content type.
+
+        Raises FileNotFoundError if there is no such object and ValueError if
+        it is larger than ``max_bytes``.
+        """
+        from botocore.exceptions import ClientError
+
+        object_key = S3_INCOMING_PREFIX + upload_id
+        try:
+            head = await _in_thread(self.client.head_object, Bucket=self.bucket, Key=object_key)
+        except ClientError as e:
+            raise FileNotFoundError(upload_id) from e
+        if head["ContentLength"] > max_bytes:
+            await self._delete_objects([object_key])
+            raise ValueError("Object too large")
+        await _in_thread(self.client.download_file, self.bucket, object_key, str(destination))
+        await self._delete_objects([object_key])
+        return head.get("ContentType", "")
+
+    async def delete_stale_uploads(self, older_than: datetime) -> int:
+        def stale_keys() -> List[str]:
+            pages = self.client.get_paginator("list_objects_v2").paginate(
+                Bucket=self.bucket, Prefix=S3_INCOMING_PREFIX
+            )
+            return [
+                item["Key"]
+                for page in pages
+                for item in page.get("Contents", [])
+                if item["LastModified"] < older_than
+            ]
+
+        keys = await _in_thread(stale_keys)
+        # delete_objects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            await self._delete_objects(keys[start:start + 1000])
+        return len(keys)
+
+    def presign_upload(self, upload_id: str, content_type: str, max_bytes: int) -> dict:
+        """Presigned POST letting a browser send one file straight to the bucket"""
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=S3_INCOMING_PREFIX + upload_id,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=PRESIGNED_UPLOAD_EXPIRES,
+        )
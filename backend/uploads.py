@@ -0,0 +1,349 @@
+"""Uploaded images: receiving, storing with variants and reference counting.
+
+Files are content-addressed: the key is the SHA-256 of the uploaded bytes,
+so an image uploaded several times is stored once. What is stored under it
+is a re-encoded copy without the camera's metadata, plus resized variants.
+Each stored image has a record in the ``uploads`` collection with its size,
+its variants and a ``ref_count`` of the products and services using it.
+Nothing is deleted when the count drops to zero: a re-upload of the same
+bytes hands out the same URL, which a form may still hold. A periodic sweep
+deletes records (and files) unused for a grace period since they were last
+uploaded or released, which also covers images never saved into anything.
+Variants are generated by ``imaging`` in a process pool created on the
+first upload, so Pillow is never loaded by a worker that does not receive
+one.
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from pymongo import ReturnDocument, UpdateOne
+from starlette.responses import JSONResponse
+
+from imaging import generate_variants
+from storage import DirectUploadStorage, UploadStorage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_filename(url: str) -> Optional[str]:
+    """Stored filename behind an /uploads URL (absolute or relative)"""
+    if "/uploads/" not in (url or ""):
+        return None
+    return url.rsplit("/uploads/", 1)[1]
+
+
+def upload_response(upload: dict) -> dict:
+    return {
+        "url": upload["url"],
+        "filename": upload["id"],
+        "width": upload["width"],
+        "height": upload["height"],
+        "variants": upload["variants"],
+    }
+
+
+def _ref_counts(urls: List[str]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for url in urls:
+        filename = upload_filename(url)
+        if filename:
+            counts[filename] = counts.get(filename, 0) + 1
+    return counts
+
+
+class UploadManager:
+    """Uploaded images in ``storage``, recorded in ``collection``.
+
+    ``allowed_types`` maps accepted content types to file extensions.
+    Every ``sweep_interval`` seconds (0 disables it) uploads that have been
+    unused for ``orphan_grace`` seconds since they were last uploaded or
+    released are deleted.
+    """
+
+    def __init__(
+        self,
+        collection,
+        storage: UploadStorage,
+        allowed_types: Dict[str, str],
+        max_bytes: int,
+        image_workers: int,
+        orphan_grace: float,
+        sweep_interval: float,
+    ):
+        self.collection = collection
+        self.storage = storage
+        self.allowed_types = allowed_types
+        self.max_bytes = max_bytes
+        self.image_workers = image_workers
+        self.orphan_grace = orphan_grace
+        self.sweep_interval = sweep_interval
+        self._image_pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def image_pool(self) -> ProcessPoolExecutor:
+        if self._image_pool is None:
+            self._image_pool = ProcessPoolExecutor(max_workers=self.image_workers)
+        return self._image_pool
+
+    def shutdown(self):
+        if self._image_pool is not None:
+            self._image_pool.shutdown(wait=False)
+            self._image_pool = None
+
+    def temp_path(self) -> Path:
+        return self.storage.temp_dir() / f".{uuid.uuid4()}.part"
+
+    async def receive(self, file: UploadFile) -> Tuple[Path, str]:
+        """Copy an uploaded image to a temp file and return its path and SHA-256.
+
+        By the time this runs Starlette has already read and spooled the
+        whole request body; ``UploadSizeLimit`` keeps oversized requests
+        from getting that far. The checks here catch a file that still ends
+        up above ``max_bytes`` within the multipart allowance. Blocking file
+        I/O runs in the default thread pool.
+        """
+        if file.content_type not in self.allowed_types:
+            raise HTTPException(status_code=400, detail="Invalid file type. Only images allowed.")
+        # The multipart parser already knows the size; fail fast when it is too big
+        if file.size is not None and file.size > self.max_bytes:
+            raise HTTPException(status_code=400, detail="File too large. Max 5MB allowed.")
+
+        temp_path = self.temp_path()
+        digest = hashlib.sha256()
+
+        loop = asyncio.get_running_loop()
+        out = await loop.run_in_executor(None, open, temp_path, "wb")
+        try:
+            size = 0
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise HTTPException(status_code=400, detail="File too large. Max 5MB allowed.")
+                digest.update(chunk)
+                await loop.run_in_executor(None, out.write, chunk)
+            await loop.run_in_executor(None, out.close)
+        except BaseException:
+            out.close()
+            temp_path.unlink(missing_ok=True)
+            raise
+        return temp_path, digest.hexdigest()
+
+    async def ingest(self, temp_path: Path, digest: str, content_type: str) -> dict:
+        """Store a received image and its resized variants, and record it.
+
+        Re-uploads of stored bytes reuse the existing record and restart
+        its grace period. The variants and a re-encoded original, all
+        without the camera's metadata (EXIF, GPS), are generated next to
+        the temp file and then handed to the storage backend; the uploaded
+        bytes themselves are never stored. A file that Pillow cannot read
+        is rejected with 400. Consumes ``temp_path``.
+        """
+        loop = asyncio.get_running_loop()
+        filename = f"{digest}.{self.allowed_types[content_type]}"
+        existing = await self.collection.find_one_and_update(
+            {"id": filename},
+            {"$set": {"uploaded_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if existing:
+            await loop.run_in_executor(None, partial(temp_path.unlink, missing_ok=True))
+            return existing
+        stem, extension = filename.rsplit(".", 1)
+        work_dir = self.storage.temp_dir()
+        # Named after the temp file, so concurrent uploads of the same bytes do not collide
+        original = f"{temp_path.name}.{extension}"
+        try:
+            result = await loop.run_in_executor(
+                self.image_pool(), generate_variants, str(temp_path), str(work_dir), stem, original
+            )
+        except ValueError:
+            await loop.run_in_executor(None, partial((work_dir / original).unlink, missing_ok=True))
+            raise HTTPException(status_code=400, detail="Invalid image file.")
+        finally:
+            await loop.run_in_executor(None, partial(temp_path.unlink, missing_ok=True))
+        variants = {}
+        for name, variant in result["variants"].items():
+            await self.storage.save(variant["webp"], work_dir / variant["webp"], "image/webp")
+            await self.storage.save(variant["jpeg"], work_dir / variant["jpeg"], "image/jpeg")
+            variants[name] = {
+                "url": self.storage.public_url(variant["webp"]),
+                "jpeg_url": self.storage.public_url(variant["jpeg"]),
+                "width": variant["width"],
+                "height": variant["height"],
+            }
+        # The original goes last, so a stored original always has its variants
+        await self.storage.save(filename, work_dir / original, content_type)
+        now = datetime.now(timezone.utc)
+        record = {
+            "id": filename,
+            "url": self.storage.public_url(filename),
+            "width": result["width"],
+            "height": result["height"],
+            "variants": variants,
+            "created_at": now,
+            "uploaded_at": now,
+        }
+        # Upsert: a concurrent upload of the same bytes may have beaten us to it.
+        # ref_count tracks how many products/services use the file.
+        await self.collection.update_one(
+            {"id": filename},
+            {"$setOnInsert": {**record, "ref_count": 0}},
+            upsert=True,
+        )
+        return record
+
+    async def lookup_variants(self, urls: List[str]) -> Dict[str, dict]:
+        """Map each uploaded image URL to its recorded variants"""
+        filenames = {upload_filename(url): url for url in urls if upload_filename(url)}
+        if not filenames:
+            return {}
+        records = await self.collection.find(
+            {"id": {"$in": list(filenames)}}, {"_id": 0, "id": 1, "variants": 1}
+        ).to_list(None)
+        return {filenames[record["id"]]: record["variants"] for record in records}
+
+    async def retain(self, urls: List[str]):
+        """Count a new reference from a product/service to each uploaded image.
+
+        Call it before saving the product or service: an image whose record
+        is gone (swept, or never uploaded) is refused with 400, and the
+        references already counted for the other images are dropped again.
+        """
+        retained: List[str] = []
+        for filename, count in _ref_counts(urls).items():
+            result = await self.collection.update_one({"id": filename}, {"$inc": {"ref_count": count}})
+            if result.matched_count == 0:
+                await self.release([url for url in urls if upload_filename(url) in retained])
+                raise HTTPException(status_code=400, detail=f"Image {filename} not found, please upload it again")
+            retained.append(filename)
+
+    async def release(self, urls: List[str]):
+        """Drop references to uploaded images; ``sweep`` deletes them once unused long enough"""
+        counts = _ref_counts(urls)
+        if not counts:
+            return
+        now = datetime.now(timezone.utc)
+        await self.collection.bulk_write([
+            UpdateOne({"id": filename}, {"$inc": {"ref_count": -count}, "$set": {"released_at": now}})
+            for filename, count in counts.items()
+        ])
+
+    async def _delete_unused(self, query: dict) -> bool:
+        # Atomic claim, so only one worker deletes the files
+        record = await self.collection.find_one_and_delete(query)
+        if record is None:
+            return False
+        keys = [record["id"]]
+        for variant in record.get("variants", {}).values():
+            keys += [upload_filename(variant["url"]), upload_filename(variant["jpeg_url"])]
+        await self.storage.delete(keys)
+        logger.info(f"Deleted unused upload {record['id']}")
+        return True
+
+    async def sweep(self) -> int:
+        """Delete uploads neither uploaded nor released within the grace period; returns how many.
+
+        Direct uploads started before the grace period and never completed
+        are deleted from storage as well.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.orphan_grace)
+        query = {
+            "ref_count": {"$lte": 0},
+            "$or": [
+                {"uploaded_at": {"$lt": cutoff}},
+                # Recorded before uploaded_at existed
+                {"uploaded_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+            ],
+            # Missing on uploads that were never used
+            "released_at": {"$not": {"$gte": cutoff}},
+        }
+        deleted = 0
+        while await self._delete_unused(query):
+            deleted += 1
+        if deleted:
+            logger.info(f"Upload sweep deleted {deleted} unused uploads")
+        if isinstance(self.storage, DirectUploadStorage):
+            abandoned = await self.storage.delete_stale_uploads(cutoff)
+            if abandoned:
+                logger.info(f"Upload sweep deleted {abandoned} direct uploads that were never completed")
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Upload sweep failed: {e!r}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if self.sweep_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class UploadSizeLimit:
+    """Refuses oversized upload requests before their body is read.
+
+    Starlette parses a multipart body, spooling the files to disk, before
+    the endpoint runs, so only a check on the declared ``Content-Length``
+    keeps a huge request from being received in full. POSTs below
+    ``path_prefix`` larger than ``max_bytes`` plus the multipart allowance
+    get 413, and ones without a Content-Length (chunked bodies) get 411.
+    """
+
+    def __init__(self, app, path_prefix: str, max_bytes: int):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_request_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        length = None
+        for key, value in scope["headers"]:
+            if key == b"content-length":
+                length = value.decode("latin-1")
+        if length is None or not length.isdigit():
+            response = JSONResponse({"detail": "Content-Length required"}, status_code=411)
+        elif int(length) > self.max_request_bytes:
+            response = JSONResponse(
+                {"detail": f"File too large. Max {self.max_bytes // (1024 * 1024)}MB allowed."}, status_code=413
+            )
+        else:
+            await self.app(scope, receive, send)
+            return
+        # Not reading the body; ask the server to close rather than drain it
+        response.headers["Connection"] = "close"
+        await response(scope, receive, send)
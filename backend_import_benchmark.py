@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+BD Garaj Backend Cold Import Benchmark
+Imports backend/server.py in fresh interpreters under `python -X importtime`
+and fails if the import gets slower than the budget or pulls in a module
+that should only be loaded on first use
+
+The budget is relative: each server import is paired with an import of the
+third-party packages server.py needs (FastAPI, pydantic, Motor, ...) in
+another fresh interpreter, and the gate compares the two. Host speed and
+load affect both the same way, so the gate does not flake on slow runners.
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Configuration
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+# Server import time / baseline import time, median over the runs. It is
+# 1.3-1.5 today (the app's own modules and models add about 40% to its
+# dependencies); 1.8 leaves room for noise and still catches a heavy
+# dependency imported eagerly
+IMPORT_BUDGET_RATIO = float(os.environ.get("IMPORT_BUDGET_RATIO", "1.8"))
+# Optional absolute budget on top, for hosts whose speed is known
+IMPORT_BUDGET_MS = float(os.environ["IMPORT_BUDGET_MS"]) if os.environ.get("IMPORT_BUDGET_MS") else None
+RUNS = int(os.environ.get("IMPORT_BENCHMARK_RUNS", "7"))
+
+# The third-party packages server.py imports at startup: the floor the budget is measured against
+BASELINE_IMPORTS = [
+    "fastapi", "fastapi.security", "dotenv", "starlette.middleware.cors",
+    "motor.motor_asyncio", "pymongo", "pydantic", "pydantic_core",
+]
+
+# Loaded lazily by the backend; importing any of these at startup is a regression
+LAZY_MODULES = ["twilio", "bcrypt", "jwt", "PIL", "boto3"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def run_importtime(statement):
+    """Run an import statement in a new interpreter; return [(depth, module, cumulative_us)]"""
+    env = dict(os.environ)
+    # server.py reads these at import; the client does not connect until used
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "import_benchmark")
+    env["TWILIO_ENABLED"] = "false"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(f"❌ FAIL: `{statement}` raised an error")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)) // 2, match.group(4), int(match.group(2))))
+    return entries
+
+
+def run_import():
+    """Import the server once in a new interpreter; return {module: cumulative_us}"""
+    return {module: micros for _, module, micros in run_importtime("import server")}
+
+
+def run_baseline():
+    """Import server.py's third-party packages once in a new interpreter; return the total in us"""
+    roots = {name.split(".")[0] for name in BASELINE_IMPORTS}
+    return sum(
+        micros
+        for depth, module, micros in run_importtime(f"import {', '.join(BASELINE_IMPORTS)}")
+        if depth == 0 and module.split(".")[0] in roots
+    )
+
+
+def main():
+    print(f"Importing backend/server.py {RUNS} times (budget {IMPORT_BUDGET_RATIO:.2f}x its dependencies)")
+    runs = []
+    baselines = []
+    # Interleaved, so a slow spell on the host hits both sides of a pair
+    for _ in range(RUNS):
+        runs.append(run_import())
+        baselines.append(run_baseline() / 1000)
+    # The first run also compiles .pyc files; report the median of the rest
+    timings = [run["server"] / 1000 for run in runs[1:] or runs]
+    baselines = baselines[1:] or baselines
+    median_ms = statistics.median(timings)
+    ratio = statistics.median(server / baseline for server, baseline in zip(timings, baselines))
+
+    print(f"server: median {median_ms:.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms")
+    print(f"dependencies alone: median {statistics.median(baselines):.0f} ms; server/dependencies: {ratio:.2f}")
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)[1:11]
+    print("Slowest imports (cumulative):")
+    for module, micros in slowest:
+        print(f"  {micros / 1000:8.1f} ms  {module}")
+
+    failed = False
+    eager = sorted({
+        module for module in runs[-1]
+        for lazy in LAZY_MODULES
+        if module == lazy or module.startswith(lazy + ".")
+    })
+    if eager:
+        print(f"❌ FAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if ratio > IMPORT_BUDGET_RATIO:
+        print(f"❌ FAIL: cold import takes {ratio:.2f}x its dependencies, budget is {IMPORT_BUDGET_RATIO:.2f}x")
+        failed = True
+    if IMPORT_BUDGET_MS is not None and median_ms > IMPORT_BUDGET_MS:
+        print(f"❌ FAIL: cold import takes {median_ms:.0f} ms, budget is {IMPORT_BUDGET_MS:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+BD Garaj Backend Serialization Benchmark
+Measures the per-item cost of turning stored product/blog/comment documents
+into a JSON response body: the previous path (fromisoformat loop,
+response_model validation, jsonable_encoder + json.dumps) against the
+trusted fast path (defaults merge + pydantic_core.to_json)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+ITEMS = int(os.environ.get("BENCHMARK_ITEMS", "500"))
+REPEAT = int(os.environ.get("BENCHMARK_REPEAT", "20"))
+
+# server.py reads these at import; the client does not connect until used
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "serialization_benchmark")
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+import server  # noqa: E402
+
+
+def product_doc(i: int) -> dict:
+    """A product as create_product stores it"""
+    return {
+        "id": str(uuid.uuid4()),
+        "category": "motorcycle",
+        "title": f"Motosiklet {i}",
+        "description": "Bakımlı, garaj motoru. " * 20,
+        "price": 125000.0 + i,
+        "currency": "TRY",
+        "images": [f"/uploads/{uuid.uuid4().hex}.jpg" for _ in range(3)],
+        "status": "active",
+        "contact_phone": "0532 683 26 03",
+        "contact_email": "bdgaraj1@gmail.com",
+        "specs": {"year": 2020, "km": 12000, "brand": "Honda"},
+        "image_variants": {},
+        "created_at": "2026-01-01T10:00:00.123456+00:00",
+        "updated_at": "2026-01-02T10:00:00.123456+00:00",
+    }
+
+
+def blog_doc(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Blog yazısı {i}",
+        "content": "Motosiklet bakımında dikkat edilmesi gerekenler. " * 40,
+        "author": "BD Garaj",
+        "image_url": None,
+        "created_at": "2026-01-01T10:00:00.123456+00:00",
+        "updated_at": "2026-01-02T10:00:00.123456+00:00",
+    }
+
+
+def comment_doc(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "service_id": str(uuid.uuid4()),
+        "user_name": f"Müşteri {i}",
+        "user_email": "musteri@example.com",
+        "comment_text": "Çok memnun kaldım, teşekkürler!",
+        "rating": 5,
+        "status": "approved",
+        "created_at": "2026-01-01T10:00:00.123456+00:00",
+    }
+
+
+def old_path(docs: List[dict], model, convert_dates: bool, build_models: bool) -> bytes:
+    """What the list endpoints did before: parse dates, validate, encode"""
+    if convert_dates:
+        for doc in docs:
+            if isinstance(doc.get("created_at"), str):
+                doc["created_at"] = server.datetime.fromisoformat(doc["created_at"])
+            if isinstance(doc.get("updated_at"), str):
+                doc["updated_at"] = server.datetime.fromisoformat(doc["updated_at"])
+    content = [model(**doc) for doc in docs] if build_models else docs
+    field = create_response_field(name="response", type_=List[model])
+    encoded = asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(encoded).body
+
+
+def new_path(docs: List[dict], model) -> bytes:
+    return server.json_response(Response(), docs, model).body
+
+
+def per_item_us(func, make_docs) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        docs = make_docs()
+        start = time.perf_counter()
+        func(docs)
+        best = min(best, time.perf_counter() - start)
+    return best / ITEMS * 1e6
+
+
+def main():
+    cases = [
+        ("products", product_doc, server.Product, True, False),
+        ("blog", blog_doc, server.BlogPost, True, False),
+        ("comments", comment_doc, server.Comment, False, True),
+    ]
+    print(f"{ITEMS} items per response, best of {REPEAT} runs")
+    print(f"{'endpoint':<10} {'before µs/item':>15} {'after µs/item':>15} {'speedup':>8}")
+    for name, make_doc, model, convert_dates, build_models in cases:
+        make_docs = lambda: [make_doc(i) for i in range(ITEMS)]  # noqa: E731
+        before = per_item_us(lambda docs: old_path(docs, model, convert_dates, build_models), make_docs)
+        after = per_item_us(lambda docs: new_path(docs, model), make_docs)
+        print(f"{name:<10} {before:>15.1f} {after:>15.1f} {before / after:>7.1f}x")
+
+        # Same data either way, apart from how UTC offsets are spelled
+        old_body = json.loads(old_path(make_docs()[:1], model, convert_dates, build_models))
+        new_body = json.loads(new_path(make_docs()[:1], model))
+        if old_body[0].keys() != new_body[0].keys():
+            sys.exit(f"❌ FAIL: {name} fields differ: {sorted(old_body[0].keys() ^ new_body[0].keys())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,42 @@ import { Link } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import { appointmentsAPI } from '../services/api';
 
+// Appointments loaded per page; more come in with "Daha Fazla Randevu"
+const PAGE_SIZE = 50;
+
 const AdminDashboard = () => {
   const [appointments, setAppointments] = useState([]);
+  const [stats, setStats] = useState({ total: 0, by_status: {}, by_service: [] });
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all'); // all, pending, confirmed, cancelled
+  const [range, setRange] = useState({ dateFrom: '', dateTo: '', service: '' });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAppointments();
-  }, []);
+  }, [filter, range]);
+
+  // Filters are applied by the server; only set values are sent
+  const filterParams = (withStatus = true) => {
+    const params = {};
+    if (withStatus && filter !== 'all') params.status = filter;
+    if (range.service) params.service = range.service;
+    if (range.dateFrom) params.date_from = range.dateFrom;
+    if (range.dateTo) params.date_to = range.dateTo;
+    return params;
+  };
 
   const fetchAppointments = async () => {
     try {
-      const response = await appointmentsAPI.getAll();
+      const [response, statsResponse] = await Promise.all([
+        appointmentsAPI.getAll({ ...filterParams(), limit: PAGE_SIZE }),
+        // Tab counts cover every status, so the stats leave it out
+        appointmentsAPI.getStats(filterParams(false)),
+      ]);
       setAppointments(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+      setStats(statsResponse.data);
     } catch (error) {
       console.error('Error fetching appointments:', error);
     } finally {
@@ -23,6 +46,29 @@ const AdminDashboard = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await appointmentsAPI.getAll({
+        ...filterParams(),
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      setAppointments([...appointments, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching appointments:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const updateRange = (key, value) => {
+    setRange({ ...range, [key]: value });
+  };
+
+  const tabCount = (key) => (key === 'all' ? stats.total : stats.by_status[key] || 0);
+
   const handleStatusChange = async (appointmentId, newStatus) => {
     try {
       await appointmentsAPI.update(appointmentId, { status: newStatus });
@@ -70,11 +116,6 @@ const AdminDashboard = () => {
     );
   };
 
-  const filteredAppointments = appointments.filter((apt) => {
-    if (filter === 'all') return true;
-    return apt.status === filter;
-  });
-
   return (
     <div className="min-h-screen bg-gray-50" data-testid="admin-dashboard">
       <Navbar />
@@ -139,23 +180,61 @@ const AdminDashboard = () => {
                   }`}
                   data-testid={`filter-${tab.key}`}
                 >
-                  {tab.label} ({appointments.filter((a) => tab.key === 'all' || a.status === tab.key).length})
+                  {tab.label} ({tabCount(tab.key)})
                 </button>
               ))}
             </div>
+            <div className="flex flex-wrap gap-4 mt-4 text-sm" data-testid="appointment-filters">
+              <label className="flex items-center gap-2 text-gray-700">
+                Başlangıç
+                <input
+                  type="date"
+                  value={range.dateFrom}
+                  onChange={(e) => updateRange('dateFrom', e.target.value)}
+                  className="px-3 py-2 rounded-lg border border-gray-300"
+                  data-testid="filter-date-from"
+                />
+              </label>
+              <label className="flex items-center gap-2 text-gray-700">
+                Bitiş
+                <input
+                  type="date"
+                  value={range.dateTo}
+                  onChange={(e) => updateRange('dateTo', e.target.value)}
+                  className="px-3 py-2 rounded-lg border border-gray-300"
+                  data-testid="filter-date-to"
+                />
+              </label>
+              <select
+                value={range.service}
+                onChange={(e) => updateRange('service', e.target.value)}
+                className="px-3 py-2 rounded-lg border border-gray-300 bg-white"
+                data-testid="filter-service"
+              >
+                <option value="">Tüm hizmetler</option>
+                {range.service && !stats.by_service.some((s) => s.service === range.service) && (
+                  <option value={range.service}>{range.service} (0)</option>
+                )}
+                {stats.by_service.map((item) => (
+                  <option key={item.service} value={item.service}>
+                    {item.service} ({item.count})
+                  </option>
+                ))}
+              </select>
+            </div>
           </div>
 
           {loading ? (
             <div className="text-center py-12">
               <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-orange-600 mx-auto"></div>
             </div>
-          ) : filteredAppointments.length === 0 ? (
+          ) : appointments.length === 0 ? (
             <div className="bg-white rounded-lg shadow-md p-12 text-center">
               <p className="text-gray-600 text-lg" data-testid="no-appointments">Randevu bulunamadı.</p>
             </div>
           ) : (
             <div className="space-y-4">
-              {filteredAppointments.map((appointment) => (
+              {appointments.map((appointment) => (
                 <div
                   key={appointment.id}
                   className="bg-white rounded-lg shadow-md p-6 hover:shadow-lg transition"
@@ -237,6 +316,19 @@ const AdminDashboard = () => {
               ))}
             </div>
           )}
+
+          {!loading && nextCursor && (
+            <div className="text-center mt-8">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="bg-white text-orange-600 border border-orange-600 px-6 py-3 rounded-lg font-semibold hover:bg-orange-50 transition disabled:opacity-50"
+                data-testid="load-more"
+              >
+                {loadingMore ? 'Yükleniyor...' : 'Daha Fazla Randevu'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
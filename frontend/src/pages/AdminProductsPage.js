@@ -3,8 +3,7 @@ import { Link } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import ImageUploader from '../components/ImageUploader';
 import { productsAPI } from '../services/api';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+import { mediaUrl } from '../utils/media';
 
 const AdminProductsPage = () => {
   const [products, setProducts] = useState([]);
@@ -55,7 +54,7 @@ const AdminProductsPage = () => {
   const handleImageUpload = async (file) => {
     try {
       const response = await productsAPI.uploadImage(file);
-      const imageUrl = `${BACKEND_URL}${response.data.url}`;
+      const imageUrl = mediaUrl(response.data.url);
       setFormData({
         ...formData,
         images: [...formData.images, imageUrl],
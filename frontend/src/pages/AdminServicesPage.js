@@ -3,8 +3,7 @@ import { Link } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import ImageUploader from '../components/ImageUploader';
 import { servicesAPI } from '../services/api';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+import { mediaUrl } from '../utils/media';
 
 const AdminServicesPage = () => {
   const [services, setServices] = useState([]);
@@ -16,6 +15,7 @@ const AdminServicesPage = () => {
     description: '',
     icon: '',
     image_url: '',
+    duration_minutes: 60,
   });
 
   useEffect(() => {
@@ -57,6 +57,7 @@ const AdminServicesPage = () => {
         description: '',
         icon: '',
         image_url: '',
+        duration_minutes: 60,
       });
       fetchServices();
     } catch (error) {
@@ -74,6 +75,7 @@ const AdminServicesPage = () => {
       description: service.description,
       icon: service.icon,
       image_url: service.image_url || '',
+      duration_minutes: service.duration_minutes || 60,
     });
     setShowModal(true);
   };
@@ -96,6 +98,7 @@ const AdminServicesPage = () => {
       description: '',
       icon: '',
       image_url: '',
+      duration_minutes: 60,
     });
     setShowModal(true);
   };
@@ -103,7 +106,7 @@ const AdminServicesPage = () => {
   const handleImageUpload = async (file) => {
     try {
       const response = await servicesAPI.uploadImage(file);
-      const imageUrl = `${BACKEND_URL}${response.data.url}`;
+      const imageUrl = mediaUrl(response.data.url);
       setFormData({
         ...formData,
         image_url: imageUrl,
@@ -284,6 +287,27 @@ const AdminServicesPage = () => {
                     </a> emoji seçebilirsiniz
                   </p>
                 </div>
+
+                <div>
+                  <label className="block text-sm font-medium text-gray-700 mb-2">
+                    Randevu Süresi (dakika) *
+                  </label>
+                  <input
+                    type="number"
+                    name="duration_minutes"
+                    value={formData.duration_minutes}
+                    onChange={handleChange}
+                    required
+                    min="15"
+                    max="600"
+                    step="15"
+                    className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-orange-500 focus:border-orange-500"
+                    data-testid="service-duration-input"
+                  />
+                  <p className="text-xs text-gray-500 mt-1">
+                    Online randevuda bu hizmet için ayrılan atölye süresi
+                  </p>
+                </div>
               </div>
 
               <div className="flex gap-4 mt-8">
@@ -10,6 +10,8 @@ const AppointmentPage = () => {
   const [loading, setLoading] = useState(false);
   const [successMessage, setSuccessMessage] = useState('');
   const [errorMessage, setErrorMessage] = useState('');
+  const [timeSlots, setTimeSlots] = useState([]);
+  const [slotsLoading, setSlotsLoading] = useState(false);
 
   const [formData, setFormData] = useState({
     customer_name: '',
@@ -33,6 +35,28 @@ const AppointmentPage = () => {
     fetchServices();
   }, []);
 
+  // Free times depend on the day and on how long the chosen service takes
+  useEffect(() => {
+    if (!formData.date) {
+      setTimeSlots([]);
+      return;
+    }
+    fetchTimeSlots();
+  }, [formData.date, formData.service]);
+
+  const fetchTimeSlots = async () => {
+    try {
+      setSlotsLoading(true);
+      const response = await appointmentsAPI.getAvailability(formData.date, formData.date, formData.service || null);
+      setTimeSlots(response.data.days[0]?.slots || []);
+    } catch (error) {
+      console.error('Error fetching available times:', error);
+      setTimeSlots([]);
+    } finally {
+      setSlotsLoading(false);
+    }
+  };
+
   const handleChange = (e) => {
     setFormData({
       ...formData,
@@ -62,26 +86,18 @@ const AppointmentPage = () => {
       });
       setTimeout(() => navigate('/'), 3000);
     } catch (error) {
-      setErrorMessage('❌ Randevu oluşturulurken bir hata oluştu. Lütfen tekrar deneyin.');
+      if (error.response?.status === 409) {
+        setErrorMessage('❌ Seçtiğiniz saat az önce doldu. Lütfen başka bir saat seçin.');
+        fetchTimeSlots();
+      } else {
+        setErrorMessage('❌ Randevu oluşturulurken bir hata oluştu. Lütfen tekrar deneyin.');
+      }
       console.error('Error creating appointment:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const timeSlots = [
-    '08:00',
-    '09:00',
-    '10:00',
-    '11:00',
-    '12:00',
-    '13:00',
-    '14:00',
-    '15:00',
-    '16:00',
-    '17:00',
-  ];
-
   return (
     <div className="min-h-screen flex flex-col" data-testid="appointment-page">
       <Navbar />
@@ -215,10 +231,18 @@ const AppointmentPage = () => {
                     className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-orange-500 focus:border-orange-500"
                     data-testid="appointment-time-select"
                   >
-                    <option value="">Saat seçiniz</option>
-                    {timeSlots.map((time) => (
-                      <option key={time} value={time}>
-                        {time}
+                    <option value="">
+                      {!formData.date
+                        ? 'Önce tarih seçiniz'
+                        : slotsLoading
+                        ? 'Yükleniyor...'
+                        : timeSlots.length === 0
+                        ? 'Bu tarihte uygun saat yok'
+                        : 'Saat seçiniz'}
+                    </option>
+                    {timeSlots.map((slot) => (
+                      <option key={slot.time} value={slot.time} disabled={slot.remaining === 0}>
+                        {slot.time}{slot.remaining === 0 ? ' (dolu)' : ''}
                       </option>
                     ))}
                   </select>
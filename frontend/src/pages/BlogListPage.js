@@ -11,7 +11,7 @@ const BlogListPage = () => {
   useEffect(() => {
     const fetchPosts = async () => {
       try {
-        const response = await blogAPI.getAll();
+        const response = await blogAPI.getSummaries();
         setPosts(response.data);
       } catch (error) {
         console.error('Error fetching blog posts:', error);
@@ -80,7 +80,7 @@ const BlogListPage = () => {
                       {post.title}
                     </h2>
                     <p className="text-gray-600 text-sm mb-4 line-clamp-3">
-                      {post.content.substring(0, 150)}...
+                      {post.excerpt}
                     </p>
                     <div className="flex items-center justify-between text-sm text-gray-500">
                       <span>👤 {post.author}</span>
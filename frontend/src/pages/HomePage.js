@@ -3,8 +3,16 @@ import { Link } from 'react-router-dom';
 import { QRCodeSVG } from 'qrcode.react';
 import Navbar from '../components/Navbar';
 import Footer from '../components/Footer';
-import { servicesAPI, featuresAPI, testimonialsAPI, faqsAPI, contactAPI, ctaAPI } from '../services/api';
+import { homeAPI } from '../services/api';
 import { openWhatsApp } from '../utils/whatsapp';
+import { mediaUrl } from '../utils/media';
+
+// Prefer the resized variant generated at upload time over the original photo
+const serviceImageSrc = (service) => (
+  service.image_variants?.medium
+    ? mediaUrl(service.image_variants.medium.url)
+    : service.image_url
+);
 
 const HomePage = () => {
   const [services, setServices] = useState([]);
@@ -17,21 +25,14 @@ const HomePage = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [servicesRes, featuresRes, testimonialsRes, faqsRes, contactRes, ctaRes] = await Promise.all([
-          servicesAPI.getAll(),
-          featuresAPI.getAll(),
-          testimonialsAPI.getAll(),
-          faqsAPI.getAll(),
-          contactAPI.get(),
-          ctaAPI.get(),
-        ]);
-        
-        setServices(servicesRes.data);
-        setFeatures(featuresRes.data);
-        setTestimonials(testimonialsRes.data);
-        setFaqs(faqsRes.data);
-        setContactInfo(contactRes.data);
-        setCtaSection(ctaRes.data);
+        const { data } = await homeAPI.get();
+
+        setServices(data.services);
+        setFeatures(data.features);
+        setTestimonials(data.testimonials);
+        setFaqs(data.faqs);
+        setContactInfo(data.contact_info);
+        setCtaSection(data.cta_section);
       } catch (error) {
         console.error('Error fetching data:', error);
       }
@@ -177,7 +178,7 @@ const HomePage = () => {
                   {service.image_url ? (
                     <div className="relative overflow-hidden">
                       <img
-                        src={service.image_url}
+                        src={serviceImageSrc(service)}
                         alt={service.name}
                         className="w-full h-48 object-cover group-hover:scale-110 transition-transform duration-300"
                       />
@@ -2,15 +2,22 @@ import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import Footer from '../components/Footer';
-import { productsAPI } from '../services/api';
+import { productsAPI, searchAPI } from '../services/api';
 import { openWhatsApp } from '../utils/whatsapp';
+import { mediaUrl } from '../utils/media';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+// Listings loaded per page; more come in with "Daha Fazla İlan"
+const PAGE_SIZE = 24;
 
 const OtoMotoPage = () => {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedCategory, setSelectedCategory] = useState('all');
+  const [searchQuery, setSearchQuery] = useState('');
+  const [filters, setFilters] = useState({ sort: 'newest', brand: '', minPrice: '', maxPrice: '' });
+  const [brands, setBrands] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const categories = [
     { id: 'all', name: 'Tümü', icon: '🚗', description: 'Tüm ürünler' },
@@ -20,15 +27,42 @@ const OtoMotoPage = () => {
   ];
 
   useEffect(() => {
-    fetchProducts();
-  }, [selectedCategory]);
+    // Wait for a pause in typing before searching or applying a price
+    const typing = searchQuery || filters.minPrice || filters.maxPrice;
+    const timer = setTimeout(fetchProducts, typing ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [selectedCategory, searchQuery, filters]);
+
+  // Filters are applied by the server; only set values are sent
+  const filterParams = () => {
+    const params = { status: 'active' };
+    if (selectedCategory !== 'all') params.category = selectedCategory;
+    if (filters.brand) params.brand = filters.brand;
+    if (filters.minPrice) params.min_price = filters.minPrice;
+    if (filters.maxPrice) params.max_price = filters.maxPrice;
+    return params;
+  };
 
   const fetchProducts = async () => {
     try {
       setLoading(true);
       const category = selectedCategory === 'all' ? null : selectedCategory;
-      const response = await productsAPI.getAll(category, 'active');
+      if (searchQuery.trim()) {
+        const response = await searchAPI.products(searchQuery.trim(), category);
+        // Search covers every category; keep the ones listed on this page
+        const categoryIds = categories.map(c => c.id);
+        setProducts(response.data.map(hit => hit.item).filter(p => categoryIds.includes(p.category)));
+        setNextCursor(null);
+        return;
+      }
+      const params = filterParams();
+      const [response, facets] = await Promise.all([
+        productsAPI.list({ ...params, sort: filters.sort, limit: PAGE_SIZE }),
+        productsAPI.getFacets(params),
+      ]);
       setProducts(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+      setBrands(facets.data.brands);
     } catch (error) {
       console.error('Error fetching products:', error);
     } finally {
@@ -36,6 +70,28 @@ const OtoMotoPage = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await productsAPI.list({
+        ...filterParams(),
+        sort: filters.sort,
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      setProducts([...products, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const updateFilter = (key, value) => {
+    setFilters({ ...filters, [key]: value });
+  };
+
   const formatPrice = (price, currency = 'TRY') => {
     return new Intl.NumberFormat('tr-TR', {
       style: 'currency',
@@ -85,6 +141,67 @@ const OtoMotoPage = () => {
             </div>
           </div>
 
+          {/* Search */}
+          <div className="mb-8 max-w-xl mx-auto">
+            <input
+              type="search"
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="İlanlarda ara (marka, model, parça...)"
+              className="w-full px-4 py-3 rounded-lg border border-gray-300 focus:outline-none focus:ring-2 focus:ring-orange-600"
+              data-testid="product-search"
+            />
+          </div>
+
+          {/* Filters */}
+          {!searchQuery.trim() && (
+            <div className="mb-8 flex flex-wrap justify-center gap-4" data-testid="product-filters">
+              <select
+                value={filters.sort}
+                onChange={(e) => updateFilter('sort', e.target.value)}
+                className="px-4 py-2 rounded-lg border border-gray-300 bg-white"
+                data-testid="filter-sort"
+              >
+                <option value="newest">En yeni</option>
+                <option value="price_asc">Fiyat (artan)</option>
+                <option value="price_desc">Fiyat (azalan)</option>
+                <option value="year_desc">Model yılı (yeni)</option>
+                <option value="km_asc">Kilometre (düşük)</option>
+              </select>
+              <select
+                value={filters.brand}
+                onChange={(e) => updateFilter('brand', e.target.value)}
+                className="px-4 py-2 rounded-lg border border-gray-300 bg-white"
+                data-testid="filter-brand"
+              >
+                <option value="">Tüm markalar</option>
+                {brands.map((brand) => (
+                  <option key={brand.value} value={brand.value}>
+                    {brand.value} ({brand.count})
+                  </option>
+                ))}
+              </select>
+              <input
+                type="number"
+                min="0"
+                value={filters.minPrice}
+                onChange={(e) => updateFilter('minPrice', e.target.value)}
+                placeholder="En düşük fiyat"
+                className="w-40 px-4 py-2 rounded-lg border border-gray-300"
+                data-testid="filter-min-price"
+              />
+              <input
+                type="number"
+                min="0"
+                value={filters.maxPrice}
+                onChange={(e) => updateFilter('maxPrice', e.target.value)}
+                placeholder="En yüksek fiyat"
+                className="w-40 px-4 py-2 rounded-lg border border-gray-300"
+                data-testid="filter-max-price"
+              />
+            </div>
+          )}
+
           {/* Category Description */}
           {selectedCategory !== 'all' && (
             <div className="mb-8 text-center">
@@ -102,7 +219,7 @@ const OtoMotoPage = () => {
           ) : products.length === 0 ? (
             <div className="text-center py-12">
               <p className="text-gray-600 text-lg mb-4" data-testid="no-products">
-                Bu kategoride henüz ilan bulunmuyor.
+                {searchQuery.trim() ? 'Aramanızla eşleşen ilan bulunamadı.' : 'Bu kategoride henüz ilan bulunmuyor.'}
               </p>
               <Link
                 to="/"
@@ -121,10 +238,10 @@ const OtoMotoPage = () => {
                   data-testid={`product-${product.id}`}
                 >
                   {/* Image */}
-                  {product.images && product.images.length > 0 ? (
+                  {product.thumbnail ? (
                     <div className="relative overflow-hidden h-56">
                       <img
-                        src={`${BACKEND_URL}${product.images[0]}`}
+                        src={mediaUrl(product.thumbnail)}
                         alt={product.title}
                         className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
                       />
@@ -159,7 +276,7 @@ const OtoMotoPage = () => {
                       {product.title}
                     </h3>
                     <p className="text-gray-600 text-sm line-clamp-2 mb-3">
-                      {product.description}
+                      {product.excerpt}
                     </p>
                     
                     {/* Specs */}
@@ -184,6 +301,19 @@ const OtoMotoPage = () => {
             </div>
           )}
 
+          {!loading && nextCursor && (
+            <div className="text-center mt-8">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="bg-white text-orange-600 border border-orange-600 px-6 py-3 rounded-lg font-semibold hover:bg-orange-50 transition disabled:opacity-50"
+                data-testid="load-more"
+              >
+                {loadingMore ? 'Yükleniyor...' : 'Daha Fazla İlan'}
+              </button>
+            </div>
+          )}
+
           {/* Contact CTA */}
           <div className="mt-16 bg-gradient-to-r from-orange-600 to-orange-700 text-white p-8 rounded-xl text-center">
             <h3 className="text-2xl font-bold mb-4">Aracınızı veya Motorunuzu Satmak İster Misiniz?</h3>
@@ -4,8 +4,7 @@ import Navbar from '../components/Navbar';
 import Footer from '../components/Footer';
 import { productsAPI } from '../services/api';
 import { openWhatsApp } from '../utils/whatsapp';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+import { mediaUrl } from '../utils/media';
 
 const ProductDetailPage = () => {
   const { id } = useParams();
@@ -108,7 +107,7 @@ const ProductDetailPage = () => {
               <div className="bg-white rounded-xl shadow-lg overflow-hidden mb-4">
                 {product.images && product.images.length > 0 ? (
                   <img
-                    src={`${BACKEND_URL}${product.images[currentImageIndex]}`}
+                    src={mediaUrl(product.images[currentImageIndex])}
                     alt={product.title}
                     className="w-full h-96 object-cover"
                     data-testid="main-image"
@@ -133,7 +132,7 @@ const ProductDetailPage = () => {
                       data-testid={`thumbnail-${index}`}
                     >
                       <img
-                        src={`${BACKEND_URL}${image}`}
+                        src={mediaUrl(image)}
                         alt={`${product.title} ${index + 1}`}
                         className="w-full h-20 object-cover"
                       />
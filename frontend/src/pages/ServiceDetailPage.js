@@ -26,16 +26,15 @@ const ServiceDetailPage = () => {
   useEffect(() => {
     const fetchService = async () => {
       try {
-        const response = await servicesAPI.getAll();
-        const foundService = response.data.find(s => s.id === id);
-        if (foundService) {
-          setService(foundService);
-        } else {
+        const response = await servicesAPI.getOne(id);
+        setService(response.data);
+      } catch (error) {
+        if (error.response?.status === 404) {
           setError('Hizmet bulunamadı.');
+        } else {
+          console.error('Error fetching service:', error);
+          setError('Hizmet yüklenirken bir hata oluştu.');
         }
-      } catch (error) {
-        console.error('Error fetching service:', error);
-        setError('Hizmet yüklenirken bir hata oluştu.');
       } finally {
         setLoading(false);
       }
@@ -304,7 +303,14 @@ const ServiceDetailPage = () => {
               {!loading && !error && (
                 <div className="bg-white rounded-xl shadow-md p-8 mt-8">
                   <div className="flex justify-between items-center mb-6">
-                    <h3 className="text-2xl font-bold text-gray-900">💬 Müşteri Yorumları</h3>
+                    <div>
+                      <h3 className="text-2xl font-bold text-gray-900">💬 Müşteri Yorumları</h3>
+                      {service.rating?.count > 0 && (
+                        <p className="text-gray-600 mt-1" data-testid="service-rating">
+                          ⭐ {service.rating.average.toLocaleString('tr-TR')} / 5 · {service.rating.count} değerlendirme
+                        </p>
+                      )}
+                    </div>
                     <button
                       onClick={() => setShowCommentForm(!showCommentForm)}
                       className="bg-orange-600 text-white px-6 py-2 rounded-lg hover:bg-orange-700 transition"
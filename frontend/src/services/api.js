@@ -30,7 +30,16 @@ export const authAPI = {
 // Appointments API
 export const appointmentsAPI = {
   create: (data) => apiClient.post('/appointments', data),
-  getAll: () => apiClient.get('/appointments'),
+  // Free start times per day between two YYYY-MM-DD dates (inclusive)
+  getAvailability: (from, to, service = null) => {
+    const params = { from, to };
+    if (service) params.service = service;
+    return apiClient.get('/appointments/availability', { params });
+  },
+  // Newest bookings first; status, service and date_from/date_to filter on the server
+  getAll: (params = {}) => apiClient.get('/appointments', { params }),
+  // Counts per status, appointment day and service for the same filters
+  getStats: (params = {}) => apiClient.get('/appointments/stats', { params }),
   getOne: (id) => apiClient.get(`/appointments/${id}`),
   update: (id, data) => apiClient.put(`/appointments/${id}`, data),
   delete: (id) => apiClient.delete(`/appointments/${id}`),
@@ -39,6 +48,7 @@ export const appointmentsAPI = {
 // Blog API
 export const blogAPI = {
   getAll: () => apiClient.get('/blog'),
+  getSummaries: () => apiClient.get('/blog', { params: { view: 'summary' } }),
   getOne: (id) => apiClient.get(`/blog/${id}`),
   create: (data) => apiClient.post('/blog', data),
   update: (id, data) => apiClient.put(`/blog/${id}`, data),
@@ -48,6 +58,8 @@ export const blogAPI = {
 // Services API
 export const servicesAPI = {
   getAll: () => apiClient.get('/services'),
+  // One service with its rating totals (count, average, histogram)
+  getOne: (id) => apiClient.get(`/services/${id}`),
   create: (data) => apiClient.post('/services', data),
   update: (id, data) => apiClient.put(`/services/${id}`, data),
   delete: (id) => apiClient.delete(`/services/${id}`),
@@ -98,6 +110,11 @@ export const ctaAPI = {
   update: (data) => apiClient.put('/cta-section', data),
 };
 
+// Homepage bundle API (services, features, testimonials, FAQs, contact, CTA)
+export const homeAPI = {
+  get: () => apiClient.get('/home'),
+};
+
 // Products API (OTO-MOTO Alım Satım)
 export const productsAPI = {
   getAll: (category = null, status = null) => {
@@ -106,6 +123,18 @@ export const productsAPI = {
     if (status) params.status = status;
     return apiClient.get('/products', { params });
   },
+  // Listing view: excerpt and thumbnail instead of description and images
+  getSummaries: (category = null, status = null) => {
+    const params = { view: 'summary' };
+    if (category) params.category = category;
+    if (status) params.status = status;
+    return apiClient.get('/products', { params });
+  },
+  // Filtered and sorted page of summaries; the next page's cursor comes
+  // back in the X-Next-Cursor header
+  list: (params = {}) => apiClient.get('/products', { params: { view: 'summary', ...params } }),
+  // Brand, year and km counts plus the price range for the same filters
+  getFacets: (params = {}) => apiClient.get('/products/facets', { params }),
   getOne: (id) => apiClient.get(`/products/${id}`),
   create: (data) => apiClient.post('/products', data),
   update: (id, data) => apiClient.put(`/products/${id}`, data),
@@ -121,6 +150,17 @@ export const productsAPI = {
   },
 };
 
+// Search API (products and blog posts, most relevant first)
+export const searchAPI = {
+  search: (q, params = {}) => apiClient.get('/search', { params: { q, ...params } }),
+  // Active products only, as the summaries the listing pages render
+  products: (q, category = null) => {
+    const params = { type: 'product', status: 'active', limit: 50 };
+    if (category) params.category = category;
+    return apiClient.get('/search', { params: { q, ...params } });
+  },
+};
+
 // Comments API
 export const commentsAPI = {
   // Public endpoints
@@ -0,0 +1,18 @@
+/**
+ * Yüklenen görsellerin adresleri
+ * Yerel depolamada API göreli yol döner (/uploads/...), S3 kullanıldığında tam URL
+ */
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+
+/**
+ * Görsel adresini tarayıcının kullanabileceği tam URL'ye çevirir
+ * @param {string} url - API'den gelen görsel adresi
+ * @returns {string} - Tam URL
+ */
+export const mediaUrl = (url) => {
+  if (!url || /^https?:\/\//.test(url)) {
+    return url;
+  }
+  return `${BACKEND_URL}${url}`;
+};
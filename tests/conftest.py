@@ -0,0 +1,68 @@
+"""Shared fixtures: the backend app on an in-memory MongoDB (mongomock-motor).
+
+The app is started once per test session, like a single worker; tests that
+depend on a collection's contents clear it first.
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import; the real client never connects
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bd_garaj_test")
+os.environ.setdefault("CACHE_SYNC_MODE", "poll")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("TWILIO_ENABLED", "false")
+
+ADMIN_CREDENTIALS = {"username": "Burak5834", "password": "Burak58811434"}
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    # Uploaded test images go to a temporary directory, not the real one
+    os.environ["UPLOADS_DIR"] = str(tmp_path_factory.mktemp("uploads"))
+    # Everything server.py builds at import (the outbox, the upload manager)
+    # then holds collections of the in-memory client
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr("motor.motor_asyncio.AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+        import server as backend
+    return backend
+
+
+@pytest.fixture(scope="session")
+def api(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(api):
+    response = api.post("/api/auth/login", json=ADMIN_CREDENTIALS)
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def run(api):
+    """Run a coroutine function on the app's event loop"""
+    def call(func, *args):
+        return api.portal.call(func, *args)
+    return call
+
+
+@pytest.fixture
+def booking_day(server) -> date:
+    """Next Monday after today in the shop's timezone: open, bookable and not today"""
+    day = datetime.now(server.SHOP_TIMEZONE).date() + timedelta(days=1)
+    while day.weekday() != 0:
+        day += timedelta(days=1)
+    return day
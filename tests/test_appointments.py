@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+SERVICE = "Bakım & Onarım"
+
+
+@pytest.fixture(autouse=True)
+def clear_appointments(server, run):
+    async def clear():
+        await server.db.appointments.delete_many({})
+        await server.db.appointment_days.delete_many({})
+    run(clear)
+
+
+def book(api, day, time):
+    return api.post("/api/appointments", json={
+        "customer_name": "Test Müşteri",
+        "phone": "0532 000 00 00",
+        "email": "test@example.com",
+        "service": SERVICE,
+        "date": day.isoformat(),
+        "time": time,
+    })
+
+
+def remaining(api, day) -> dict:
+    response = api.get("/api/appointments/availability", params={"from": day.isoformat(), "to": day.isoformat()})
+    assert response.status_code == 200
+    return {slot["time"]: slot["remaining"] for slot in response.json()["days"][0]["slots"]}
+
+
+def test_reserve_slots_stops_at_capacity(server, run):
+    day = "2030-01-07"
+    for _ in range(server.APPOINTMENT_CAPACITY):
+        assert run(server.reserve_slots, day, [600, 660])
+    assert not run(server.reserve_slots, day, [660])
+    # Nothing was counted by the refused booking
+    assert run(server.reserve_slots, day, [720])
+    doc = run(server.db.appointment_days.find_one, {"_id": day})
+    assert doc["slots"] == {"600": server.APPOINTMENT_CAPACITY, "660": server.APPOINTMENT_CAPACITY, "720": 1}
+
+
+def test_full_slot_is_refused(server, api, booking_day):
+    for _ in range(server.APPOINTMENT_CAPACITY):
+        assert book(api, booking_day, "10:00").status_code == 200
+    response = book(api, booking_day, "10:00")
+    assert response.status_code == 409
+    assert remaining(api, booking_day)["10:00"] == 0
+    assert remaining(api, booking_day)["11:00"] == server.APPOINTMENT_CAPACITY
+
+
+def test_invalid_times_are_refused(api, booking_day):
+    assert book(api, booking_day, "07:00").status_code == 400
+    assert book(api, booking_day, "10:30").status_code == 400
+    assert book(api, booking_day, "saat").status_code == 400
+
+
+def test_cancel_reactivate_and_delete_release_slots(server, api, admin_headers, booking_day):
+    capacity = server.APPOINTMENT_CAPACITY
+    first = book(api, booking_day, "10:00").json()["id"]
+    assert remaining(api, booking_day)["10:00"] == capacity - 1
+
+    response = api.put(f"/api/appointments/{first}", headers=admin_headers, json={"status": "cancelled"})
+    assert response.status_code == 200
+    assert remaining(api, booking_day)["10:00"] == capacity
+
+    # Cancelling an appointment that is already cancelled releases nothing
+    api.put(f"/api/appointments/{first}", headers=admin_headers, json={"status": "cancelled"})
+    assert remaining(api, booking_day)["10:00"] == capacity
+
+    response = api.put(f"/api/appointments/{first}", headers=admin_headers, json={"status": "confirmed"})
+    assert response.status_code == 200
+    assert remaining(api, booking_day)["10:00"] == capacity - 1
+
+    assert api.delete(f"/api/appointments/{first}", headers=admin_headers).status_code == 200
+    assert remaining(api, booking_day)["10:00"] == capacity
+
+
+def test_reactivating_into_a_full_slot_is_refused(server, api, admin_headers, booking_day):
+    cancelled = book(api, booking_day, "10:00").json()["id"]
+    api.put(f"/api/appointments/{cancelled}", headers=admin_headers, json={"status": "cancelled"})
+    for _ in range(server.APPOINTMENT_CAPACITY):
+        assert book(api, booking_day, "10:00").status_code == 200
+
+    response = api.put(f"/api/appointments/{cancelled}", headers=admin_headers, json={"status": "pending"})
+    assert response.status_code == 409
+    assert api.get(f"/api/appointments/{cancelled}", headers=admin_headers).json()["status"] == "cancelled"
+
+    # Deleting the cancelled appointment does not free anyone else's slot
+    api.delete(f"/api/appointments/{cancelled}", headers=admin_headers)
+    assert remaining(api, booking_day)["10:00"] == 0
+
+
+def test_backfill_counts_each_appointment_once(server, run):
+    async def backfill():
+        await server.db.appointments.insert_many([
+            {"id": "a", "date": "2030-01-07", "time": "10:00", "service": SERVICE, "status": "pending"},
+            {"id": "b", "date": "2030-01-07", "time": "10:00", "service": SERVICE, "status": "confirmed"},
+            {"id": "c", "date": "2030-01-07", "time": "11:00", "service": SERVICE, "status": "cancelled"},
+            {"id": "d", "date": "unreadable", "time": "10:00", "service": SERVICE, "status": "pending"},
+        ])
+        # Two workers starting together, then a restart
+        await asyncio.gather(server.backfill_appointment_days(), server.backfill_appointment_days())
+        await server.backfill_appointment_days()
+        return (
+            await server.db.appointment_days.find_one({"_id": "2030-01-07"}),
+            {doc["id"]: doc["reservation"] for doc in await server.db.appointments.find({}).to_list(None)},
+        )
+
+    day, reservations = run(backfill)
+    assert day["slots"] == {"600": 2}
+    assert reservations == {
+        "a": {"day": "2030-01-07", "slots": [600]},
+        "b": {"day": "2030-01-07", "slots": [600]},
+        "c": {"day": "2030-01-07", "slots": [660]},
+        "d": None,
+    }
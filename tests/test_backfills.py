@@ -0,0 +1,71 @@
+import pytest
+
+
+class CountingDatabase:
+    """The test database, recording the size of every bulk write"""
+
+    def __init__(self, database):
+        self._database = database
+        self.bulk_writes = []
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+    def __getitem__(self, name):
+        collection = self._database[name]
+        database = self
+
+        class Collection:
+            def __getattr__(self, attribute):
+                return getattr(collection, attribute)
+
+            async def bulk_write(self, requests, **kwargs):
+                database.bulk_writes.append((name, len(requests)))
+                return await collection.bulk_write(requests, **kwargs)
+
+        return Collection()
+
+
+@pytest.fixture
+def old_documents(server, run):
+    """Products and blog posts written before excerpts, search and spec filters existed"""
+    products = [
+        {"id": f"old-product-{n}", "title": f"Motor {n}", "description": "Temiz motosiklet", "specs": {"Marka": "Honda", "Yıl": "2019"}}
+        for n in range(5)
+    ]
+    posts = [{"id": f"old-post-{n}", "title": f"Yazı {n}", "content": "Bakım ipuçları"} for n in range(3)]
+    run(server.db.products.insert_many, products)
+    run(server.db.blog_posts.insert_many, posts)
+    yield
+    run(server.db.products.delete_many, {"id": {"$regex": "^old-product-"}})
+    run(server.db.blog_posts.delete_many, {"id": {"$regex": "^old-post-"}})
+
+
+def test_backfills_run_in_batches(server, run, monkeypatch, old_documents):
+    database = CountingDatabase(server.db)
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "BACKFILL_BATCH_SIZE", 2)
+
+    run(server.backfill_excerpts)
+    run(server.backfill_search_fields)
+    run(server.backfill_spec_filters)
+
+    assert all(size <= 2 for _, size in database.bulk_writes)
+    assert sum(size for name, size in database.bulk_writes if name == "products") == 15
+    assert sum(size for name, size in database.bulk_writes if name == "blog_posts") == 6
+    products = run(server.db.products.find({"id": {"$regex": "^old-product-"}}).to_list, None)
+    assert all(product["excerpt"] == "Temiz motosiklet" for product in products)
+    assert all(product["spec_filters"] == {"brand": "Honda", "brand_key": "honda", "year": 2019} for product in products)
+    assert all(product["search"] for product in products)
+
+
+def test_backfill_leaves_documents_that_have_the_field(server, run, old_documents):
+    run(server.db.products.update_one, {"id": "old-product-0"}, {"$set": {"excerpt": "edited"}})
+    count = run(server.backfill_field, "products", "excerpt", {}, lambda doc: "backfilled")
+    excerpts = {
+        product["id"]: product["excerpt"]
+        for product in run(server.db.products.find({"id": {"$regex": "^old-product-"}}).to_list, None)
+    }
+    assert count == 4
+    assert excerpts.pop("old-product-0") == "edited"
+    assert set(excerpts.values()) == {"backfilled"}
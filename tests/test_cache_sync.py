@@ -0,0 +1,137 @@
+import asyncio
+import logging
+
+import pytest
+from pymongo.errors import OperationFailure
+
+UNAUTHORIZED = 13
+
+
+class ChangeStream:
+    """Yields ``changes`` and then stays open, like a quiet change stream"""
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def _iterate(self):
+        for position, change in enumerate(self.changes):
+            self.resume_token = {"_data": str(position)}
+            yield change
+        await asyncio.Event().wait()
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class WatchingDatabase:
+    """The test database, except that ``watch`` returns or raises the given results in turn"""
+
+    def __init__(self, database, results):
+        self._database = database
+        self.results = list(results)
+        self.watch_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+    def __getitem__(self, name):
+        return self._database[name]
+
+    def watch(self, *args, **kwargs):
+        self.watch_calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def restore_features(server, run):
+    yield
+    run(server.db.features.delete_many, {"id": {"$in": ["sync-broken", "sync-ok"]}})
+    run(server.content_cache.reload)
+
+
+def run_sync(run, sync, seconds=0.1):
+    async def scenario():
+        sync.start()
+        await asyncio.sleep(seconds)
+        await sync.stop()
+    run(scenario)
+
+
+def test_falls_back_to_polling_when_change_streams_are_unsupported(server, run, monkeypatch):
+    database = WatchingDatabase(server.db, [
+        OperationFailure("The $changeStream stage is only supported on replica sets", code=server.CHANGE_STREAMS_UNSUPPORTED),
+    ])
+    monkeypatch.setattr(server, "db", database)
+    sync = server.CacheSync("auto", 0.01)
+    run_sync(run, sync)
+    assert sync.active_mode == "poll"
+    assert database.watch_calls == 1
+
+
+def test_other_change_stream_failures_are_logged_and_retried(server, run, monkeypatch, caplog):
+    database = WatchingDatabase(server.db, [
+        OperationFailure("not authorized on admin to execute command", code=UNAUTHORIZED),
+        OperationFailure("not authorized on admin to execute command", code=UNAUTHORIZED),
+        OperationFailure("The $changeStream stage is only supported on replica sets", code=server.CHANGE_STREAMS_UNSUPPORTED),
+    ])
+    monkeypatch.setattr(server, "db", database)
+    sync = server.CacheSync("auto", 0.01)
+    with caplog.at_level(logging.ERROR, logger="server"):
+        run_sync(run, sync)
+    assert database.watch_calls == 3
+    assert sum("code 13" in record.getMessage() for record in caplog.records) == 2
+    assert sync.active_mode == "poll"
+
+
+def feature_change(document: dict) -> dict:
+    return {"operationType": "insert", "ns": {"db": "test", "coll": "features"}, "fullDocument": document}
+
+
+def test_bad_change_event_is_logged_and_the_stream_continues(server, run, monkeypatch, caplog, restore_features):
+    database = WatchingDatabase(server.db, [ChangeStream([
+        # Not a valid Feature: no icon, title or description
+        feature_change({"id": "sync-broken"}),
+        feature_change({"id": "sync-ok", "icon": "🔧", "title": "Yeni", "description": "Eklendi", "order": 9}),
+    ])])
+    monkeypatch.setattr(server, "db", database)
+    sync = server.CacheSync("changestream", 0.01)
+    with caplog.at_level(logging.ERROR, logger="server"):
+        run_sync(run, sync)
+    assert any("Could not apply change to features" in record.getMessage() for record in caplog.records)
+    assert sync.events == 2
+    assert run(server.content_cache.features.get, "sync-ok") is not None
+    assert run(server.content_cache.features.get, "sync-broken") is None
+
+
+def test_failed_reload_is_logged_and_retried_by_the_poller(server, run, caplog, restore_features):
+    async def scenario():
+        sync = server.CacheSync("poll", 0.01)
+        await sync.prime()
+        sync.start()
+        # Another worker writes a document this worker's model rejects
+        await server.db.features.insert_one({"id": "sync-broken"})
+        await server.db._cache_versions.update_one({"_id": "features"}, {"$inc": {"version": 1}}, upsert=True)
+        await asyncio.sleep(0.1)
+        alive_while_broken = not sync._task.done()
+        version = server.content_cache.features.version
+        await server.db.features.delete_one({"id": "sync-broken"})
+        await asyncio.sleep(0.1)
+        reloaded = server.content_cache.features.version > version
+        await sync.stop()
+        return alive_while_broken, reloaded
+
+    with caplog.at_level(logging.ERROR, logger="server"):
+        alive_while_broken, reloaded = run(scenario)
+    assert alive_while_broken
+    assert reloaded
+    assert any("Reloading features" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,41 @@
+import pytest
+
+from compression import encoded_etag, strip_etag_encoding
+
+
+@pytest.mark.parametrize("etag, encoding, expected", [
+    ('"abc"', "gzip", '"abc-gzip"'),
+    ('W/"abc"', "br", 'W/"abc-br"'),
+])
+def test_encoded_etag_round_trips(etag, encoding, expected):
+    assert encoded_etag(etag, encoding) == expected
+    assert strip_etag_encoding(expected.removeprefix("W/")) == etag.removeprefix("W/")
+
+
+def get_home(api, **headers):
+    return api.get("/api/home", headers=headers)
+
+
+def test_each_encoding_gets_its_own_etag(api):
+    plain = get_home(api, **{"Accept-Encoding": "identity"})
+    gzipped = get_home(api, **{"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["etag"] == encoded_etag(plain.headers["etag"], "gzip")
+    assert gzipped.content == plain.content
+
+
+@pytest.mark.parametrize("held, accept_encoding, sent", [
+    ("gzip", "gzip", "gzip"),
+    ("identity", "identity", "identity"),
+    # A client that cached the gzip body and now sends a different Accept-Encoding
+    ("gzip", "identity", "identity"),
+])
+def test_revalidation_works_for_every_encoding(api, held, accept_encoding, sent):
+    etags = {
+        encoding: get_home(api, **{"Accept-Encoding": encoding}).headers["etag"]
+        for encoding in ("identity", "gzip")
+    }
+    response = get_home(api, **{"Accept-Encoding": accept_encoding, "If-None-Match": etags[held]})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etags[sent]
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from notifications import NotificationOutbox
+
+BACKOFF = 10
+
+
+class StubSender:
+    """Records messages; fails the first ``failures`` sends"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def send(self, to: str, body: str) -> str:
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("Twilio is down")
+            self.messages.append(body)
+            return f"sid-{len(self.messages)}"
+
+
+@pytest.fixture
+def collection():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient(tz_aware=True)["outbox_test"]["notifications"]
+
+
+def make_outbox(collection, sender, max_attempts=3, batch_size=10):
+    return NotificationOutbox(
+        collection, sender, batch_size=batch_size, max_attempts=max_attempts, poll_interval=0.01, backoff=BACKOFF
+    )
+
+
+def test_enqueued_message_is_sent_once(collection):
+    sender = StubSender()
+    outbox = make_outbox(collection, sender)
+
+    async def scenario():
+        message_id = await outbox.enqueue("whatsapp:+900", "Yeni randevu", appointment_id="a1")
+        sent = await outbox.run_once()
+        again = await outbox.run_once()
+        return message_id, sent, again, await collection.find_one({"id": message_id})
+
+    message_id, sent, again, doc = asyncio.run(scenario())
+    assert (sent, again) == (1, 0)
+    assert sender.messages == ["Yeni randevu"]
+    assert (doc["status"], doc["attempts"], doc["sid"], doc["locked_until"]) == ("sent", 1, "sid-1", None)
+    assert doc["appointment_id"] == "a1"
+
+
+def test_workers_claim_each_message_once(collection):
+    sender = StubSender()
+    workers = [make_outbox(collection, sender, batch_size=3) for _ in range(3)]
+
+    async def scenario():
+        for n in range(9):
+            await workers[0].enqueue("whatsapp:+900", f"message {n}")
+        return await asyncio.gather(*(worker.run_once() for worker in workers))
+
+    assert sum(asyncio.run(scenario())) == 9
+    assert sorted(sender.messages) == sorted(f"message {n}" for n in range(9))
+
+
+def test_expired_lease_is_claimed_again(collection):
+    sender = StubSender()
+    outbox = make_outbox(collection, sender)
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        # Held by workers that crashed mid-send: one lease has run out, one has not
+        await collection.insert_many([
+            {"id": "expired", "to": "x", "body": "expired lease", "status": "sending", "attempts": 0,
+             "next_attempt_at": now, "locked_until": now - timedelta(seconds=1)},
+            {"id": "held", "to": "x", "body": "held lease", "status": "sending", "attempts": 0,
+             "next_attempt_at": now, "locked_until": now + timedelta(seconds=NotificationOutbox.LEASE_SECONDS)},
+        ])
+        return await outbox.run_once()
+
+    assert asyncio.run(scenario()) == 1
+    assert sender.messages == ["expired lease"]
+
+
+def test_failed_send_is_retried_with_exponential_backoff(collection):
+    sender = StubSender(failures=2)
+    outbox = make_outbox(collection, sender)
+
+    async def attempt(message_id):
+        now = datetime.now(timezone.utc)
+        # BSON dates keep milliseconds
+        before = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        await outbox.run_once()
+        return before, await collection.find_one({"id": message_id})
+
+    async def make_due(message_id):
+        await collection.update_one({"id": message_id}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+
+    async def scenario():
+        message_id = await outbox.enqueue("whatsapp:+900", "retry me")
+        first = await attempt(message_id)
+        # Not due yet: the backoff has not passed
+        assert await outbox.run_once() == 0
+        await make_due(message_id)
+        second = await attempt(message_id)
+        await make_due(message_id)
+        third = await attempt(message_id)
+        return first, second, third
+
+    (before1, first), (before2, second), (_, third) = asyncio.run(scenario())
+    assert (first["status"], first["attempts"], first["last_error"]) == ("pending", 1, "Twilio is down")
+    assert first["next_attempt_at"] - before1 >= timedelta(seconds=BACKOFF)
+    assert (second["status"], second["attempts"]) == ("pending", 2)
+    assert second["next_attempt_at"] - before2 >= timedelta(seconds=2 * BACKOFF)
+    assert (third["status"], third["attempts"]) == ("sent", 3)
+    assert (outbox.retried, outbox.sent, outbox.failed) == (2, 1, 0)
+
+
+def test_gives_up_after_max_attempts(collection):
+    sender = StubSender(failures=5)
+    outbox = make_outbox(collection, sender, max_attempts=2)
+
+    async def scenario():
+        message_id = await outbox.enqueue("whatsapp:+900", "never sent")
+        await outbox.run_once()
+        await collection.update_one({"id": message_id}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+        await outbox.run_once()
+        await collection.update_one({"id": message_id}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+        return await outbox.run_once(), await collection.find_one({"id": message_id})
+
+    claimed_after_failing, doc = asyncio.run(scenario())
+    assert claimed_after_failing == 0
+    assert (doc["status"], doc["attempts"]) == ("failed", 2)
+    assert (outbox.retried, outbox.failed) == (1, 1)
+
+
+def test_enqueue_once_for_a_key(collection):
+    outbox = make_outbox(collection, StubSender())
+
+    async def scenario():
+        first = await outbox.enqueue("whatsapp:+900", "Yeni randevu", once_for={"appointment_id": "a1"})
+        second = await outbox.enqueue("whatsapp:+900", "Yeni randevu", once_for={"appointment_id": "a1"})
+        return first, second, await collection.count_documents({})
+
+    first, second, count = asyncio.run(scenario())
+    assert first == second
+    assert count == 1
+
+
+def test_worker_runs_recovery_and_sends_what_it_queued(collection):
+    sender = StubSender()
+
+    async def recover():
+        await outbox.enqueue("whatsapp:+900", "missed", once_for={"appointment_id": "a2"})
+        return 1
+
+    outbox = NotificationOutbox(
+        collection, sender, batch_size=10, max_attempts=3, poll_interval=0.01, backoff=BACKOFF, recover=recover
+    )
+
+    async def scenario():
+        outbox.start()
+        await asyncio.sleep(0.1)
+        await outbox.stop()
+
+    asyncio.run(scenario())
+    assert sender.messages == ["missed"]
+    assert outbox.recovered == 1
+
+
+@pytest.fixture
+def clean_appointments(server, run):
+    run(server.db.appointments.delete_many, {})
+    run(server.db.appointment_days.delete_many, {})
+    run(server.db.notifications.delete_many, {})
+    yield
+    run(server.db.appointments.delete_many, {})
+    run(server.db.appointment_days.delete_many, {})
+
+
+def test_booking_queues_one_notification(server, api, run, booking_day, clean_appointments):
+    response = api.post("/api/appointments", json={
+        "customer_name": "Ali", "phone": "05320000000", "email": "ali@example.com", "service": "Genel Bakım",
+        "date": booking_day.isoformat(), "time": "10:00",
+    })
+    assert response.status_code == 200
+    appointment_id = response.json()["id"]
+    assert run(server.db.notifications.count_documents, {"appointment_id": appointment_id}) == 1
+    assert "notification_pending" not in run(server.db.appointments.find_one, {"id": appointment_id})
+
+
+def test_notification_missed_by_an_interrupted_request_is_recovered(server, run, booking_day, clean_appointments):
+    # The request stopped after inserting the appointment, before queueing its notification
+    appointment = server.Appointment(
+        customer_name="Ayşe", phone="05320000001", email="ayse@example.com", service="Genel Bakım",
+        date=booking_day.isoformat(), time="11:00",
+    )
+    run(server.db.appointments.insert_one, {**appointment.model_dump(), "notification_pending": True})
+
+    assert run(server.queue_missed_appointment_notifications) == 1
+    assert run(server.queue_missed_appointment_notifications) == 0
+    notification = run(server.db.notifications.find_one, {"appointment_id": appointment.id})
+    assert "Ayşe" in notification["body"]
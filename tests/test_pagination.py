@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from starlette.responses import Response
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def page_through(run, server, collection, sort, query=None) -> list:
+    """Every document of ``collection`` fetched one page of one at a time"""
+    ids, cursor = [], None
+    while True:
+        response = Response()
+        docs = run(server.fetch_page, collection, query or {}, 1, cursor, response, None, sort)
+        ids += [doc["id"] for doc in docs]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+        assert len(ids) <= run(collection.count_documents, {}), "paging does not terminate"
+
+
+@pytest.fixture
+def collection(server, run):
+    collection = server.db.paging_test
+    run(collection.delete_many, {})
+    return collection
+
+
+def insert(run, collection, docs):
+    run(collection.insert_many, [dict(doc) for doc in docs])
+
+
+def test_ties_are_broken_by_id(server, run, collection):
+    insert(run, collection, [{"id": f"p{i}", "price": 100 if i % 2 else 200} for i in range(6)])
+    assert page_through(run, server, collection, ("price", ASCENDING)) == ["p1", "p3", "p5", "p0", "p2", "p4"]
+    assert page_through(run, server, collection, ("price", DESCENDING)) == ["p4", "p2", "p0", "p5", "p3", "p1"]
+
+
+def test_missing_values_first_ascending_and_last_descending(server, run, collection):
+    insert(run, collection, [
+        {"id": "a", "spec_filters": {"km": 5000}},
+        {"id": "b"},
+        {"id": "c", "spec_filters": {"km": None}},
+        {"id": "d", "spec_filters": {"km": 1000}},
+        {"id": "e", "spec_filters": {}},
+        {"id": "f", "spec_filters": {"km": 5000}},
+    ])
+    ascending = page_through(run, server, collection, ("spec_filters.km", ASCENDING))
+    assert ascending == ["b", "c", "e", "d", "a", "f"]
+    descending = page_through(run, server, collection, ("spec_filters.km", DESCENDING))
+    assert descending == ["f", "a", "d", "e", "c", "b"]
+
+
+def test_created_at_mixing_dates_and_legacy_strings(server, run, collection):
+    insert(run, collection, [
+        {"id": "d1", "created_at": BASE_TIME + timedelta(days=3)},
+        {"id": "s1", "created_at": (BASE_TIME + timedelta(days=2)).isoformat()},
+        {"id": "d2", "created_at": BASE_TIME + timedelta(days=1)},
+        {"id": "s2", "created_at": BASE_TIME.isoformat()},
+        {"id": "d3", "created_at": BASE_TIME + timedelta(days=1)},
+    ])
+    # Dates sort after strings in BSON order, so newest-first lists the
+    # converted documents before the ones the migration has not reached
+    assert page_through(run, server, collection, ("created_at", DESCENDING)) == ["d1", "d3", "d2", "s1", "s2"]
+
+
+def test_filters_apply_on_every_page(server, run, collection):
+    insert(run, collection, [{"id": f"p{i}", "price": i, "status": "sold" if i % 3 == 0 else "active"} for i in range(9)])
+    ids = page_through(run, server, collection, ("price", DESCENDING), {"status": "active"})
+    assert ids == ["p8", "p7", "p5", "p4", "p2", "p1"]
+
+
+def test_invalid_cursor_is_rejected(server, run, collection):
+    with pytest.raises(server.HTTPException) as error:
+        run(server.fetch_page, collection, {}, 1, "not-a-cursor", Response())
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def products(server, run):
+    async def seed():
+        await server.db.products.delete_many({})
+        docs = []
+        for i in range(8):
+            specs = {} if i % 4 == 0 else {"year": 2010 + i % 3, "km": 10_000 * (i % 3)}
+            docs.append({
+                "id": f"product-{i}",
+                "category": "motorcycle",
+                "title": f"Motosiklet {i}",
+                "description": "",
+                "price": float(100_000 + 10_000 * (i % 3)),
+                "status": "active",
+                "specs": specs,
+                "spec_filters": server.product_spec_filters(specs),
+                "images": [],
+                "created_at": BASE_TIME + timedelta(hours=i // 2),
+            })
+        await server.db.products.insert_many(docs)
+        await server.notify_collection_changed("products")
+        return docs
+    return run(seed)
+
+
+@pytest.mark.parametrize("sort", ["newest", "price_asc", "price_desc", "year_desc", "km_asc"])
+def test_product_sorts_return_every_product_once(api, products, sort):
+    field, direction = {
+        "newest": ("created_at", -1),
+        "price_asc": ("price", 1),
+        "price_desc": ("price", -1),
+        "year_desc": ("year", -1),
+        "km_asc": ("km", 1),
+    }[sort]
+    seen, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": 1, "view": "summary"}
+        if cursor:
+            params["cursor"] = cursor
+        response = api.get("/api/products", params=params)
+        assert response.status_code == 200
+        seen += [product["id"] for product in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert len(seen) <= len(products)
+    assert sorted(seen) == sorted(product["id"] for product in products)
+
+    by_id = {product["id"]: product for product in products}
+
+    def key(product_id):
+        product = by_id[product_id]
+        value = product.get(field) if field in ("created_at", "price") else product["spec_filters"].get(field)
+        # Missing values first ascending, last descending, as MongoDB sorts them
+        return (value is not None, value if value is not None else 0, product_id)
+
+    assert seen == sorted(seen, key=key, reverse=direction < 0)
@@ -0,0 +1,70 @@
+from scheduling import (
+    covered_slots, format_clock, parse_clock, parse_working_hours, remaining_capacity, slot_starts,
+)
+
+MONDAY_TO_SATURDAY = {day: (8 * 60, 17 * 60) for day in range(6)}
+
+
+def test_parse_clock():
+    assert parse_clock("08:00") == 480
+    assert parse_clock("9.30") == 570
+    assert parse_clock(" 24:00 ") == 1440
+    assert parse_clock("24:01") is None
+    assert parse_clock("12:60") is None
+    assert parse_clock("Kapalı") is None
+    assert format_clock(570) == "09:30"
+
+
+def test_parse_working_hours_day_range():
+    assert parse_working_hours("Pazartesi - Cumartesi: 08:00 - 17:00") == MONDAY_TO_SATURDAY
+
+
+def test_parse_working_hours_groups_and_closed_days():
+    hours = parse_working_hours("Hafta içi: 09:00 - 18:00, Cumartesi: 09.00 - 14:00, Pazar: Kapalı")
+    assert hours == {0: (540, 1080), 1: (540, 1080), 2: (540, 1080), 3: (540, 1080), 4: (540, 1080), 5: (540, 840)}
+
+    assert parse_working_hours("HAFTA SONU: 10:00 - 16:00") == {5: (600, 960), 6: (600, 960)}
+    assert set(parse_working_hours("Her gün 10:00-20:00")) == set(range(7))
+
+
+def test_parse_working_hours_lists_and_wrapping_ranges():
+    hours = parse_working_hours("Salı ve Perşembe 10:00-12:30; Cuma - Pazartesi: 08:00 - 10:00")
+    assert hours == {1: (600, 750), 3: (600, 750), 4: (480, 600), 5: (480, 600), 6: (480, 600), 0: (480, 600)}
+
+
+def test_parse_working_hours_first_entry_for_a_day_wins():
+    hours = parse_working_hours("Pazartesi - Cuma: 08:00 - 17:00, Cuma: 08:00 - 12:00")
+    assert hours[4] == (480, 1020)
+
+
+def test_parse_working_hours_unreadable():
+    assert parse_working_hours("") == {}
+    assert parse_working_hours("Randevu ile") == {}
+    # Closing before opening is ignored
+    assert parse_working_hours("Pazartesi: 17:00 - 08:00") == {}
+
+
+def test_slot_starts():
+    assert slot_starts((480, 1020), 60, 60) == list(range(480, 961, 60))
+    # A 90 minute appointment takes two slots, so the last start is 15:00
+    assert slot_starts((480, 1020), 90, 60) == list(range(480, 901, 60))
+    # Opening off the grid starts at the next slot
+    assert slot_starts((510, 1020), 60, 60) == list(range(540, 961, 60))
+    assert slot_starts((480, 500), 60, 60) == []
+
+
+def test_covered_slots():
+    assert covered_slots(600, 60, 60) == [600]
+    assert covered_slots(600, 90, 60) == [600, 660]
+    # Starting off the grid also occupies the slot it starts in
+    assert covered_slots(630, 60, 60) == [600, 660]
+    assert covered_slots(600, 0, 60) == [600]
+    assert covered_slots(600, 30, 30) == [600]
+
+
+def test_remaining_capacity():
+    occupancy = {"600": 1, "660": 2}
+    assert remaining_capacity(occupancy, [600], 2) == 1
+    assert remaining_capacity(occupancy, [600, 660], 2) == 0
+    assert remaining_capacity(occupancy, [720], 2) == 2
+    assert remaining_capacity({"600": 3}, [600], 2) == 0
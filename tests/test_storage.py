@@ -0,0 +1,84 @@
+"""S3Storage against moto's in-process S3"""
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from storage import DirectUploadStorage, S3Storage
+
+BUCKET = "bd-garaj-test"
+
+
+@pytest.fixture
+def s3(monkeypatch, tmp_path):
+    moto = pytest.importorskip("moto")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        storage = S3Storage(BUCKET, tmp_path / "work", region="us-east-1")
+        storage.client.create_bucket(Bucket=BUCKET)
+        asyncio.run(storage.setup())
+        yield storage
+
+
+def object_keys(storage) -> list:
+    return sorted(item["Key"] for item in storage.client.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+
+def test_save_public_url_and_delete(s3):
+    source = s3.temp_dir() / "photo.part"
+    source.write_bytes(b"jpeg bytes")
+    asyncio.run(s3.save("abc.jpg", source, "image/jpeg"))
+
+    assert not source.exists()
+    assert object_keys(s3) == ["uploads/abc.jpg"]
+    head = s3.client.head_object(Bucket=BUCKET, Key="uploads/abc.jpg")
+    assert head["ContentType"] == "image/jpeg"
+    assert head["CacheControl"] == "public, max-age=31536000, immutable"
+    assert s3.public_url("abc.jpg") == f"https://{BUCKET}.s3.amazonaws.com/uploads/abc.jpg"
+
+    asyncio.run(s3.delete(["abc.jpg", "missing.jpg"]))
+    assert object_keys(s3) == []
+
+
+def test_direct_upload_round_trip(s3, tmp_path):
+    requests = pytest.importorskip("requests")
+    assert isinstance(s3, DirectUploadStorage)
+    presigned = s3.presign_upload("upload-1", "image/png", 1024)
+    # Not under the public uploads/ prefix until it has been processed
+    assert presigned["fields"]["key"] == "incoming/upload-1"
+    policy = json.loads(base64.b64decode(presigned["fields"]["policy"]))
+    assert ["content-length-range", 1, 1024] in policy["conditions"]
+
+    # What the browser does with the presigned POST
+    response = requests.post(
+        presigned["url"], data=presigned["fields"], files={"file": ("photo.png", b"png bytes", "image/png")}
+    )
+    assert response.status_code == 204
+
+    destination = tmp_path / "downloaded"
+    assert asyncio.run(s3.download("upload-1", destination, 1024)) == "image/png"
+    assert destination.read_bytes() == b"png bytes"
+    # The incoming object is consumed
+    assert object_keys(s3) == []
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(s3.download("upload-1", destination, 1024))
+
+
+def test_download_refuses_and_removes_an_oversized_object(s3, tmp_path):
+    s3.client.put_object(Bucket=BUCKET, Key="incoming/big", Body=b"x" * 2048, ContentType="image/png")
+    with pytest.raises(ValueError):
+        asyncio.run(s3.download("big", tmp_path / "big", 1024))
+    assert object_keys(s3) == []
+
+
+def test_stale_direct_uploads_are_deleted(s3):
+    s3.client.put_object(Bucket=BUCKET, Key="incoming/abandoned", Body=b"x")
+    s3.client.put_object(Bucket=BUCKET, Key="uploads/kept.jpg", Body=b"x")
+    now = datetime.now(timezone.utc)
+
+    assert asyncio.run(s3.delete_stale_uploads(now - timedelta(hours=1))) == 0
+    assert asyncio.run(s3.delete_stale_uploads(now + timedelta(minutes=1))) == 1
+    assert object_keys(s3) == ["uploads/kept.jpg"]
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from storage import DirectUploadStorage
+from uploads import UploadSizeLimit
+
+MAX_BYTES = 5 * 1024 * 1024
+
+
+def call_limited(method: str, path: str, headers: list) -> tuple:
+    """Send one request through UploadSizeLimit; returns (status, body, whether the app ran)"""
+    reached = []
+    messages = []
+
+    async def app(scope, receive, send):
+        reached.append(True)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        raise AssertionError("the request body was read")
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": headers}
+    asyncio.run(UploadSizeLimit(app, "/api/upload/", MAX_BYTES)(scope, receive, send))
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return messages[0]["status"], body, bool(reached)
+
+
+def test_oversized_upload_is_refused_from_content_length():
+    status, body, reached = call_limited(
+        "POST", "/api/upload/product-image", [(b"content-length", str(500 * 1024 * 1024).encode())]
+    )
+    assert (status, reached) == (413, False)
+    assert json.loads(body)["detail"] == "File too large. Max 5MB allowed."
+
+
+def test_upload_without_content_length_is_refused():
+    status, _, reached = call_limited("POST", "/api/upload/service-image", [(b"transfer-encoding", b"chunked")])
+    assert (status, reached) == (411, False)
+
+
+@pytest.mark.parametrize("method, path, length", [
+    ("POST", "/api/upload/product-image", MAX_BYTES),
+    ("POST", "/api/products", 50 * 1024 * 1024),
+    ("GET", "/api/upload/anything", None),
+])
+def test_other_requests_pass_through(method, path, length):
+    headers = [] if length is None else [(b"content-length", str(length).encode())]
+    status, body, reached = call_limited(method, path, headers)
+    assert (status, body, reached) == (200, b"ok", True)
+
+
+def jpeg_bytes(color=(200, 80, 20)) -> bytes:
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.new("RGB", (64, 48), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def test_upload_endpoint_limits(api, admin_headers):
+    too_big = api.post(
+        "/api/upload/product-image",
+        headers=admin_headers,
+        files={"file": ("big.jpg", b"\xff" * (MAX_BYTES + 128 * 1024), "image/jpeg")},
+    )
+    assert too_big.status_code == 413
+
+    response = api.post(
+        "/api/upload/product-image", headers=admin_headers, files={"file": ("ok.jpg", jpeg_bytes(), "image/jpeg")}
+    )
+    assert response.status_code == 200
+    assert response.json()["width"] == 64
+
+
+@pytest.fixture
+def upload(api, admin_headers, server, run):
+    """Upload an image through the API; returns a function giving its record"""
+    def upload_image(color):
+        response = api.post(
+            "/api/upload/product-image", headers=admin_headers, files={"file": ("a.jpg", jpeg_bytes(color), "image/jpeg")}
+        )
+        assert response.status_code == 200
+        return run(server.db.uploads.find_one, {"id": response.json()["filename"]})
+
+    run(server.db.uploads.delete_many, {})
+    yield upload_image
+    run(server.db.uploads.delete_many, {})
+
+
+def backdate(server, run, filename, **fields):
+    run(server.db.uploads.update_one, {"id": filename}, {"$set": fields})
+
+
+def test_sweep_deletes_only_old_unreferenced_uploads(server, run, upload):
+    old = datetime.now(timezone.utc) - timedelta(seconds=server.uploads.orphan_grace + 60)
+    fresh = upload((10, 10, 10))
+    abandoned = upload((20, 20, 20))
+    referenced = upload((30, 30, 30))
+    backdate(server, run, abandoned["id"], uploaded_at=old)
+    backdate(server, run, referenced["id"], uploaded_at=old, ref_count=1)
+
+    assert run(server.uploads.sweep) == 1
+    remaining = {doc["id"] for doc in run(server.db.uploads.find().to_list, None)}
+    assert remaining == {fresh["id"], referenced["id"]}
+    assert not (server.UPLOADS_DIR / abandoned["id"]).exists()
+    assert (server.UPLOADS_DIR / fresh["id"]).exists()
+
+
+def test_sweep_handles_records_without_uploaded_at(server, run, upload):
+    legacy = upload((40, 40, 40))
+    old = datetime.now(timezone.utc) - timedelta(seconds=server.uploads.orphan_grace + 60)
+    run(server.db.uploads.update_one, {"id": legacy["id"]}, {"$set": {"created_at": old}, "$unset": {"uploaded_at": ""}})
+    assert run(server.uploads.sweep) == 1
+
+
+def test_uploading_the_same_bytes_again_restarts_the_grace_period(server, run, upload):
+    first = upload((50, 50, 50))
+    old = datetime.now(timezone.utc) - timedelta(seconds=server.uploads.orphan_grace + 60)
+    backdate(server, run, first["id"], uploaded_at=old)
+    again = upload((50, 50, 50))
+    assert again["id"] == first["id"]
+    assert run(server.uploads.sweep) == 0
+
+
+def test_local_storage_does_not_take_direct_uploads(api, admin_headers, server):
+    assert not isinstance(server.upload_storage, DirectUploadStorage)
+    response = api.post("/api/upload/presign", headers=admin_headers, json={"content_type": "image/png"})
+    assert (response.status_code, response.json()["detail"]) == (400, "Direct uploads are not enabled")
+
+
+def image_with_metadata(image_format: str) -> bytes:
+    image_module = pytest.importorskip("PIL.Image")
+    exif = image_module.Exif()
+    exif[0x010F] = "SecretCam"  # Make
+    exif[0x8825] = {1: "N", 2: (41.0, 1.0, 2.0)}  # GPS
+    buffer = io.BytesIO()
+    image_module.new("RGB", (40, 30), (1, 120, 200)).save(buffer, image_format, exif=exif.tobytes())
+    data = buffer.getvalue()
+    assert b"SecretCam" in data
+    return data
+
+
+@pytest.mark.parametrize("image_format, content_type", [
+    ("JPEG", "image/jpeg"),
+    ("PNG", "image/png"),
+    ("WEBP", "image/webp"),
+])
+def test_stored_original_has_no_camera_metadata(server, api, admin_headers, upload, image_format, content_type):
+    image_module = pytest.importorskip("PIL.Image")
+    response = api.post(
+        "/api/upload/product-image",
+        headers=admin_headers,
+        files={"file": ("photo", image_with_metadata(image_format), content_type)},
+    )
+    assert response.status_code == 200
+    stored = server.UPLOADS_DIR / response.json()["filename"]
+    assert b"SecretCam" not in stored.read_bytes()
+    with image_module.open(stored) as image:
+        assert image.format == image_format
+        assert image.size == (40, 30)
+        assert dict(image.getexif()) == {}
+
+
+def create_product(api, admin_headers, images):
+    response = api.post(
+        "/api/products",
+        headers=admin_headers,
+        json={"category": "motorcycle", "title": "Test motor", "description": "d", "price": 1, "images": images},
+    )
+    return response
+
+
+def test_released_image_stays_for_a_re_upload(server, run, api, admin_headers, upload):
+    image = upload((60, 60, 60))
+    first = create_product(api, admin_headers, [image["url"]]).json()
+    # The same bytes are uploaded again, e.g. into another product's form
+    assert upload((60, 60, 60))["id"] == image["id"]
+    api.put(f"/api/products/{first['id']}", headers=admin_headers, json={"images": []})
+
+    assert run(server.db.uploads.find_one, {"id": image["id"]})["ref_count"] == 0
+    assert run(server.uploads.sweep) == 0
+    second = create_product(api, admin_headers, [image["url"]])
+    assert second.status_code == 200
+    assert api.get(image["url"]).status_code == 200
+    for product in (first, second.json()):
+        api.delete(f"/api/products/{product['id']}", headers=admin_headers)
+
+
+def test_sweep_waits_a_grace_period_after_the_last_release(server, run, upload):
+    image = upload((70, 70, 70))
+    old = datetime.now(timezone.utc) - timedelta(seconds=server.uploads.orphan_grace + 60)
+    backdate(server, run, image["id"], uploaded_at=old, ref_count=1)
+    run(server.uploads.release, [image["url"]])
+    assert run(server.uploads.sweep) == 0
+    backdate(server, run, image["id"], released_at=old)
+    assert run(server.uploads.sweep) == 1
+
+
+def test_retain_refuses_a_swept_image(server, run, api, admin_headers, upload):
+    kept = upload((80, 80, 80))
+    swept = upload((90, 90, 90))
+    run(server.db.uploads.delete_one, {"id": swept["id"]})
+
+    response = create_product(api, admin_headers, [kept["url"], swept["url"]])
+    assert response.status_code == 400
+    assert swept["id"] in response.json()["detail"]
+    assert run(server.db.uploads.find_one, {"id": kept["id"]})["ref_count"] == 0